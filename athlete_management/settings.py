@@ -44,10 +44,13 @@ INSTALLED_APPS = [
 
 MIDDLEWARE = [
     'django.middleware.security.SecurityMiddleware',
+    'core.staticfiles.StaticFilesMiddleware',
+    'core.routing.ReadYourWritesMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
     'django.contrib.auth.middleware.AuthenticationMiddleware',
+    'core.tenancy.TenantMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
 ]
@@ -84,6 +87,17 @@ DATABASES = {
     )
 }
 
+# Optional read replica for analytics and reports (see core.routing)
+REPLICA_DATABASE_URL = config('REPLICA_DATABASE_URL', default='')
+if REPLICA_DATABASE_URL:
+    DATABASES['replica'] = dj_database_url.parse(REPLICA_DATABASE_URL, conn_max_age=600)
+    DATABASES['replica']['TEST'] = {'MIRROR': 'default'}
+
+DATABASE_ROUTERS = ['core.routing.ReplicaRouter']
+REPLICA_HEALTH_CHECK_SECONDS = config('REPLICA_HEALTH_CHECK_SECONDS', default=30.0, cast=float)
+REPLICA_MAX_LAG_SECONDS = config('REPLICA_MAX_LAG_SECONDS', default=30.0, cast=float)
+READ_YOUR_WRITES_SECONDS = config('READ_YOUR_WRITES_SECONDS', default=10.0, cast=float)
+
 
 # Password validation
 # https://docs.djangoproject.com/en/4.2/ref/settings/#auth-password-validators
@@ -122,6 +136,13 @@ USE_TZ = True
 STATIC_URL = 'static/'
 STATIC_ROOT = BASE_DIR / 'staticfiles'
 STATICFILES_DIRS = [BASE_DIR / 'static']
+# collectstatic writes content-hashed names plus .gz/.br copies; core.staticfiles.StaticFilesMiddleware
+# serves them, with immutable caching for hashed names and STATIC_MAX_AGE seconds for the rest
+STORAGES = {
+    'default': {'BACKEND': 'django.core.files.storage.FileSystemStorage'},
+    'staticfiles': {'BACKEND': 'core.staticfiles.CompressedManifestStaticFilesStorage'},
+}
+STATIC_MAX_AGE = config('STATIC_MAX_AGE', default=60, cast=int)
 
 # Media files (uploads)
 MEDIA_URL = 'media/'
@@ -141,6 +162,21 @@ EMAIL_HOST_USER = config('EMAIL_HOST_USER', default='')
 EMAIL_HOST_PASSWORD = config('EMAIL_HOST_PASSWORD', default='')
 DEFAULT_FROM_EMAIL = config('DEFAULT_FROM_EMAIL', default='TAILWIND Coaching <mehul@mehulved.com>')
 
+# Engagement tracking: events are buffered per worker and written in batches
+ENGAGEMENT_BUFFER_SIZE = config('ENGAGEMENT_BUFFER_SIZE', default=500, cast=int)
+ENGAGEMENT_FLUSH_SECONDS = config('ENGAGEMENT_FLUSH_SECONDS', default=5.0, cast=float)
+
+# Workout archival (see core.archive): age horizon, and grace period after an athlete cancels
+WORKOUT_ARCHIVE_DAYS = config('WORKOUT_ARCHIVE_DAYS', default=730, cast=int)
+WORKOUT_ARCHIVE_CANCELLED_DAYS = config('WORKOUT_ARCHIVE_CANCELLED_DAYS', default=180, cast=int)
+
+# Subscription lifecycle (see core.lifecycle): renewal payments are created this many days ahead
+SUBSCRIPTION_RENEWAL_LEAD_DAYS = config('SUBSCRIPTION_RENEWAL_LEAD_DAYS', default=7, cast=int)
+
+# Cohort benchmarks (see core.cohorts): window length, and smallest cohort given a percentile table
+COHORT_WINDOW_WEEKS = config('COHORT_WINDOW_WEEKS', default=12, cast=int)
+COHORT_MIN_SIZE = config('COHORT_MIN_SIZE', default=5, cast=int)
+
 # Security Settings (for production)
 if not DEBUG:
     SECURE_SSL_REDIRECT = True
@@ -1,16 +1,107 @@
-from django.contrib import admin
+from django import forms
+from django.contrib import admin, messages
+from django.contrib.admin.utils import flatten_fieldsets, unquote
+from django.core.exceptions import ValidationError
+from django.http import FileResponse, Http404
+from django.urls import path, reverse
+from django.utils.html import format_html, format_html_join
+from . import archive, cohorts, ics, reviews, search
 from .models import (
     Athlete, BillingPlan, AthleteSubscription, Payment,
-    InvoiceTemplate, Invoice, EmailSettings, Workout, WorkoutCompletion
+    InvoiceTemplate, Invoice, InvoiceLine, EmailSettings, Workout, WorkoutCompletion,
+    ChurnRiskScore, BillingChange, PaymentReminder, EngagementDaily, Tenant, ArchivedWorkout, ArchivedWorkoutDay,
+    CohortBenchmark, ReviewSession, AthleteGoal,
 )
+from .invoicing import issue_invoices, mark_payments_paid, store_pdf
+from .routing import use_replica
+from .tenancy import current_tenant_id
+
+
+class ReplicaReadMixin:
+    """Serve the changelist of read-only analytics models from the read replica when available"""
+
+    def changelist_view(self, request, extra_context=None):
+        if request.method != 'GET':
+            return super().changelist_view(request, extra_context)
+        with use_replica():
+            response = super().changelist_view(request, extra_context)
+            # The rows are only fetched when the template renders
+            if hasattr(response, 'render'):
+                response.render()
+        return response
+
+
+class TenantAdminMixin:
+    """
+    Ask unscoped users (superusers) which tenant a new top-level record
+    belongs to; everyone else creates records in their own tenant
+    """
+
+    def _picks_tenant(self, obj):
+        return obj is None and current_tenant_id() is None
+
+    def get_fieldsets(self, request, obj=None):
+        fieldsets = super().get_fieldsets(request, obj)
+        if self._picks_tenant(obj):
+            fieldsets = [('Coach', {'fields': ['tenant']}), *fieldsets]
+        return fieldsets
+
+    def get_form(self, request, obj=None, **kwargs):
+        # fields=None is get_fields() asking for the model's own fields
+        if self._picks_tenant(obj) and kwargs.get('fields', ()) is not None:
+            # tenant is not editable on the model, so it is a plain form field set in save_model
+            tenants = Tenant.objects.all()
+            fields = kwargs['fields'] if 'fields' in kwargs else flatten_fieldsets(self.get_fieldsets(request, obj))
+            kwargs['fields'] = [name for name in fields if name != 'tenant']
+            kwargs['form'] = type('TenantForm', (kwargs.get('form', self.form),), {
+                'tenant': forms.ModelChoiceField(
+                    tenants, initial=tenants[0] if len(tenants) == 1 else None, label="Tenant",
+                ),
+            })
+        return super().get_form(request, obj, **kwargs)
+
+    def save_model(self, request, obj, form, change):
+        if 'tenant' in form.cleaned_data:
+            obj.tenant = form.cleaned_data['tenant']
+        super().save_model(request, obj, form, change)
+
+
+@admin.register(Tenant)
+class TenantAdmin(admin.ModelAdmin):
+    list_display = ['name', 'slug', 'created_at']
+    search_fields = ['name', 'slug']
+    prepopulated_fields = {'slug': ('name',)}
+    filter_horizontal = ['users']
+
+
+class FullTextSearchMixin:
+    """
+    Match the changelist search box against the full-text index (core.search)
+    in addition to the plain search_fields, which should only list short
+    columns such as names and titles.
+    """
+    search_kind = None
+
+    def get_search_results(self, request, queryset, search_term):
+        matches, may_have_duplicates = super().get_search_results(request, queryset, search_term)
+        if search_term:
+            ids = search.search_ids(search_term, self.search_kind)
+            if ids:
+                matches |= queryset.filter(pk__in=ids)
+        return matches, may_have_duplicates
 
 
 @admin.register(Athlete)
-class AthleteAdmin(admin.ModelAdmin):
-    list_display = ['name', 'email', 'contact_number', 'created_at']
+class AthleteAdmin(TenantAdminMixin, FullTextSearchMixin, admin.ModelAdmin):
+    list_display = [
+        'name', 'email', 'contact_number', 'outstanding_balance', 'last_completed', 'next_workout',
+        'active_plan', 'churn_risk_score', 'created_at',
+    ]
+    list_select_related = ['churn_risk', 'summary__active_subscription__billing_plan']
     search_fields = ['name', 'email', 'contact_number']
+    search_kind = 'ATHLETE'
     list_filter = ['created_at']
-    readonly_fields = ['created_at', 'updated_at']
+    readonly_fields = ['created_at', 'updated_at', 'calendar_feed', 'workout_history', 'cohort_placement']
     fieldsets = (
         ('Basic Information', {
             'fields': ('user', 'name', 'email', 'contact_number', 'address')
@@ -18,15 +109,100 @@ class AthleteAdmin(admin.ModelAdmin):
         ('Profile', {
             'fields': ('profile', 'goals', 'fitness_evaluation')
         }),
+        ('Calendar', {
+            'fields': ('calendar_feed',)
+        }),
+        ('Training History', {
+            'fields': ('workout_history',),
+            'classes': ('collapse',)
+        }),
+        ('Cohort Benchmarks', {
+            'fields': ('cohort_placement',),
+            'classes': ('collapse',)
+        }),
         ('Timestamps', {
             'fields': ('created_at', 'updated_at'),
             'classes': ('collapse',)
         }),
     )
 
+    @admin.display(description='Workout calendar feed')
+    def calendar_feed(self, obj):
+        if obj.pk is None:
+            return '-'
+        url = ics.feed_url(obj.tenant_id, obj.pk)
+        return format_html('<a href="{}">{}</a>', url, url)
+
+    @admin.display(description='Recent workouts (including archived)')
+    def workout_history(self, obj):
+        if obj.pk is None:
+            return '-'
+        entries = archive.history(obj.pk, limit=100)
+        if not entries:
+            return '-'
+        rows = format_html_join('', '<tr><td>{}</td><td>{}</td><td>{}</td><td>{}</td><td>{}</td></tr>', (
+            (
+                entry.date, entry.title, entry.status.title(), entry.completion_quality or '-',
+                'Archived' if entry.archived else '',
+            )
+            for entry in entries
+        ))
+        return format_html('<table>{}</table>', rows)
+
+    @admin.display(description='Standing among similar athletes (all workouts)')
+    def cohort_placement(self, obj):
+        if obj.pk is None:
+            return '-'
+        placements = cohorts.placement(obj)
+        if not placements:
+            return '-'
+        labels = dict(CohortBenchmark.METRIC_CHOICES)
+        rows = format_html_join('', '<tr><td>{}</td><td>{}</td><td>{}</td><td>{}</td></tr>', (
+            (
+                labels[entry.metric], entry.value,
+                '-' if entry.rank is None else f"ahead of {entry.rank:g}%",
+                '-' if entry.median is None else f"median {entry.median:g} (n={entry.sample_size})",
+            )
+            for entry in placements
+        ))
+        return format_html('<table>{}</table>', rows)
+
+    @admin.display(description='Outstanding', ordering='summary__outstanding_balance')
+    def outstanding_balance(self, obj):
+        summary = getattr(obj, 'summary', None)
+        if summary is None or not summary.pending_payments:
+            return '-'
+        return f"₹{summary.outstanding_balance} ({summary.pending_payments})"
+
+    @admin.display(description='Last completed', ordering='summary__last_completed_date')
+    def last_completed(self, obj):
+        summary = getattr(obj, 'summary', None)
+        return summary.last_completed_date if summary and summary.last_completed_date else '-'
+
+    @admin.display(description='Next workout', ordering='summary__next_workout_date')
+    def next_workout(self, obj):
+        summary = getattr(obj, 'summary', None)
+        if summary is None or summary.next_workout_date is None:
+            return '-'
+        return f"{summary.next_workout_date:%d %b} - {summary.next_workout_title}"
+
+    @admin.display(description='Plan', ordering='summary__active_subscription__billing_plan__name')
+    def active_plan(self, obj):
+        summary = getattr(obj, 'summary', None)
+        if summary is None or summary.active_subscription is None:
+            return '-'
+        return summary.active_subscription.billing_plan.name
+
+    @admin.display(description='Churn risk', ordering='churn_risk__score')
+    def churn_risk_score(self, obj):
+        risk = getattr(obj, 'churn_risk', None)
+        if risk is None:
+            return '-'
+        return f"{risk.score:.0f} ({risk.get_risk_level_display()})"
+
 
 @admin.register(BillingPlan)
-class BillingPlanAdmin(admin.ModelAdmin):
+class BillingPlanAdmin(TenantAdminMixin, admin.ModelAdmin):
     list_display = ['name', 'plan_type', 'service_level', 'billing_period', 'hsn_sac', 'base_price', 'is_active']
     list_filter = ['plan_type', 'service_level', 'billing_period', 'is_active']
     search_fields = ['name', 'hsn_sac']
@@ -53,12 +229,15 @@ class AthleteSubscriptionAdmin(admin.ModelAdmin):
     list_display = ['athlete', 'billing_plan', 'final_price', 'start_date', 'end_date', 'status']
     list_filter = ['status', 'start_date', 'billing_plan']
     search_fields = ['athlete__name', 'billing_plan__name']
-    readonly_fields = ['final_price', 'created_at', 'updated_at']
+    readonly_fields = ['final_price', 'paused_from', 'renewed_through', 'created_at', 'updated_at']
     date_hierarchy = 'start_date'
     fieldsets = (
         ('Subscription', {
             'fields': ('athlete', 'billing_plan', 'start_date', 'end_date', 'status')
         }),
+        ('Lifecycle', {
+            'fields': ('resume_on', 'paused_from', 'renewed_through')
+        }),
         ('Pricing & Discounts', {
             'fields': ('custom_discount_percent', 'custom_discount_amount', 'final_price')
         }),
@@ -84,7 +263,7 @@ class PaymentAdmin(admin.ModelAdmin):
             'fields': ('subscription', 'amount', 'months_covered')
         }),
         ('Dates', {
-            'fields': ('due_date', 'payment_date')
+            'fields': ('due_date', 'payment_date', 'period_start', 'period_end')
         }),
         ('Status & Method', {
             'fields': ('status', 'payment_method', 'transaction_id')
@@ -100,15 +279,41 @@ class PaymentAdmin(admin.ModelAdmin):
     
     actions = ['mark_as_paid']
     
+    def save_model(self, request, obj, form, change):
+        super().save_model(request, obj, form, change)
+        # Marking a single payment as paid issues its invoice too
+        if obj.status == 'PAID' and not Invoice.objects.filter(payment=obj).exists():
+            try:
+                issue_invoices([obj])
+            except ValidationError as e:
+                self.message_user(request, ' '.join(e.messages), messages.WARNING)
+    
     def mark_as_paid(self, request, queryset):
-        from django.utils import timezone
-        updated = queryset.update(status='PAID', payment_date=timezone.now().date())
-        self.message_user(request, f'{updated} payment(s) marked as paid.')
+        updated, invoices, uninvoiced = mark_payments_paid(queryset)
+        self.message_user(request, f'{updated} payment(s) marked as paid, {len(invoices)} invoice(s) generated.')
+        if uninvoiced:
+            self.message_user(
+                request,
+                f'No default invoice template is configured; {uninvoiced} paid payment(s) were not invoiced.',
+                messages.WARNING,
+            )
     mark_as_paid.short_description = "Mark selected payments as paid"
 
 
+@admin.register(PaymentReminder)
+class PaymentReminderAdmin(admin.ModelAdmin):
+    list_display = ['payment', 'kind', 'claimed_at', 'sent_at']
+    list_filter = ['kind', 'sent_at']
+    search_fields = ['payment__subscription__athlete__name']
+    list_select_related = ['payment__subscription__athlete']
+    readonly_fields = ['payment', 'kind', 'claim', 'claimed_at', 'sent_at']
+
+    def has_add_permission(self, request):
+        return False
+
+
 @admin.register(InvoiceTemplate)
-class InvoiceTemplateAdmin(admin.ModelAdmin):
+class InvoiceTemplateAdmin(TenantAdminMixin, admin.ModelAdmin):
     list_display = ['company_name', 'company_gstin', 'company_pan', 'is_default']
     readonly_fields = ['created_at', 'updated_at']
     fieldsets = (
@@ -134,12 +339,24 @@ class InvoiceTemplateAdmin(admin.ModelAdmin):
     )
 
 
+class InvoiceLineInline(admin.TabularInline):
+    model = InvoiceLine
+    fields = ['position', 'description', 'hsn_sac', 'quantity', 'rate', 'amount', 'taxable_amount', 'tax_amount']
+    readonly_fields = fields
+    extra = 0
+    can_delete = False
+
+    def has_add_permission(self, request, obj=None):
+        return False
+
+
 @admin.register(Invoice)
 class InvoiceAdmin(admin.ModelAdmin):
+    inlines = [InvoiceLineInline]
     list_display = ['invoice_number', 'customer_name', 'invoice_date', 'total_amount', 'status']
     list_filter = ['status', 'invoice_date']
     search_fields = ['invoice_number', 'customer_name', 'customer_email']
-    readonly_fields = ['invoice_number', 'pdf_generated_at', 'emailed_at', 'created_at', 'updated_at']
+    readonly_fields = ['invoice_number', 'pdf_download', 'pdf_generated_at', 'emailed_at', 'created_at', 'updated_at']
     date_hierarchy = 'invoice_date'
     fieldsets = (
         ('Invoice Details', {
@@ -166,7 +383,7 @@ class InvoiceAdmin(admin.ModelAdmin):
             'fields': ('payment_terms',)
         }),
         ('PDF & Email', {
-            'fields': ('pdf_file', 'pdf_generated_at', 'emailed_at')
+            'fields': ('pdf_file', 'pdf_download', 'pdf_generated_at', 'emailed_at')
         }),
         ('Timestamps', {
             'fields': ('created_at', 'updated_at'),
@@ -174,9 +391,31 @@ class InvoiceAdmin(admin.ModelAdmin):
         }),
     )
 
+    def get_urls(self):
+        return [
+            path('<path:object_id>/pdf/', self.admin_site.admin_view(self.download_pdf), name='core_invoice_pdf'),
+        ] + super().get_urls()
+
+    @admin.display(description='Download')
+    def pdf_download(self, obj):
+        if obj.pk is None:
+            return '-'
+        return format_html('<a href="{}">PDF</a>', reverse('admin:core_invoice_pdf', args=[obj.pk]))
+
+    def download_pdf(self, request, object_id):
+        """The invoice PDF as an attachment, rendered first if the queue has not got to it yet"""
+        invoice = self.get_object(request, unquote(object_id))
+        if invoice is None or not self.has_view_permission(request, invoice):
+            raise Http404("Unknown invoice")
+        if not invoice.pdf_file:
+            store_pdf(invoice)
+        return FileResponse(
+            invoice.pdf_file.open('rb'), as_attachment=True, filename=invoice.pdf_file.name.rsplit('/', 1)[-1],
+        )
+
 
 @admin.register(EmailSettings)
-class EmailSettingsAdmin(admin.ModelAdmin):
+class EmailSettingsAdmin(TenantAdminMixin, admin.ModelAdmin):
     list_display = ['provider', 'from_email', 'from_name', 'is_active']
     readonly_fields = ['created_at', 'updated_at']
     fieldsets = (
@@ -197,10 +436,11 @@ class EmailSettingsAdmin(admin.ModelAdmin):
 
 
 @admin.register(Workout)
-class WorkoutAdmin(admin.ModelAdmin):
+class WorkoutAdmin(FullTextSearchMixin, admin.ModelAdmin):
     list_display = ['athlete', 'date', 'workout_type', 'title', 'status']
     list_filter = ['status', 'workout_type', 'date']
-    search_fields = ['athlete__name', 'title', 'description']
+    search_fields = ['athlete__name', 'title']
+    search_kind = 'WORKOUT'
     readonly_fields = ['created_at', 'updated_at']
     date_hierarchy = 'date'
     fieldsets = (
@@ -224,10 +464,11 @@ class WorkoutAdmin(admin.ModelAdmin):
 
 
 @admin.register(WorkoutCompletion)
-class WorkoutCompletionAdmin(admin.ModelAdmin):
+class WorkoutCompletionAdmin(FullTextSearchMixin, admin.ModelAdmin):
     list_display = ['workout', 'completion_quality', 'actual_date', 'reviewed_at']
     list_filter = ['completion_quality', 'actual_date']
-    search_fields = ['workout__athlete__name', 'workout__title', 'athlete_comments']
+    search_fields = ['workout__athlete__name', 'workout__title']
+    search_kind = 'COMPLETION'
     readonly_fields = ['created_at', 'updated_at']
     fieldsets = (
         ('Workout', {
@@ -247,3 +488,200 @@ class WorkoutCompletionAdmin(admin.ModelAdmin):
             'classes': ('collapse',)
         }),
     )
+
+
+@admin.register(ChurnRiskScore)
+class ChurnRiskScoreAdmin(ReplicaReadMixin, admin.ModelAdmin):
+    list_display = ['athlete', 'score', 'risk_level', 'explanation', 'computed_at']
+    list_filter = ['risk_level']
+    search_fields = ['athlete__name']
+    readonly_fields = ['athlete', 'score', 'risk_level', 'features', 'explanation', 'computed_at']
+
+    def has_add_permission(self, request):
+        return False
+
+
+@admin.register(BillingChange)
+class BillingChangeAdmin(ReplicaReadMixin, admin.ModelAdmin):
+    list_display = ['changed_at', 'record_type', 'record_id', 'action', 'changes']
+    list_filter = ['record_type', 'action']
+    search_fields = ['=record_id']
+    date_hierarchy = 'changed_at'
+    readonly_fields = ['record_type', 'record_id', 'action', 'changes', 'changed_at']
+
+    def has_add_permission(self, request):
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        return False
+
+    def has_delete_permission(self, request, obj=None):
+        return False
+
+
+@admin.register(ArchivedWorkout)
+class ArchivedWorkoutAdmin(admin.ModelAdmin):
+    list_display = ['date', 'athlete', 'title', 'workout_type', 'status', 'completion_quality', 'actual_distance', 'archived_at']
+    list_filter = ['status', 'workout_type']
+    search_fields = ['athlete__name', 'title']
+    date_hierarchy = 'date'
+    list_select_related = ['athlete']
+    exclude = ['data']
+    readonly_fields = [
+        'athlete', 'date', 'workout_type', 'title', 'status', 'target_distance', 'completion_quality',
+        'actual_date', 'actual_distance', 'actual_duration', 'actual_tss', 'archived_at',
+    ]
+    actions = ['restore_workouts']
+
+    def has_add_permission(self, request):
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        return False
+
+    def has_delete_permission(self, request, obj=None):
+        # Deleting would leave the daily totals behind; restore and delete the live workout instead
+        return False
+
+    def restore_workouts(self, request, queryset):
+        restored, skipped = archive.restore(queryset)
+        message = f'{restored} workout(s) restored.'
+        if skipped:
+            message += f' {skipped} left archived: a newer workout has the same athlete, date and type.'
+        self.message_user(request, message, messages.WARNING if skipped else messages.SUCCESS)
+    restore_workouts.short_description = "Restore selected workouts"
+
+
+@admin.register(ArchivedWorkoutDay)
+class ArchivedWorkoutDayAdmin(ReplicaReadMixin, admin.ModelAdmin):
+    list_display = [
+        'date', 'athlete', 'workouts', 'completed', 'skipped', 'planned_distance', 'actual_distance',
+        'actual_duration', 'actual_tss',
+    ]
+    search_fields = ['athlete__name']
+    date_hierarchy = 'date'
+    list_select_related = ['athlete']
+    readonly_fields = list_display
+
+    def has_add_permission(self, request):
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        return False
+
+
+@admin.register(EngagementDaily)
+class EngagementDailyAdmin(ReplicaReadMixin, admin.ModelAdmin):
+    list_display = ['date', 'athlete', 'event_type', 'count']
+    list_filter = ['event_type']
+    search_fields = ['athlete__name']
+    date_hierarchy = 'date'
+    list_select_related = ['athlete']
+    readonly_fields = ['athlete', 'date', 'event_type', 'count']
+
+    def has_add_permission(self, request):
+        return False
+
+
+@admin.register(CohortBenchmark)
+class CohortBenchmarkAdmin(ReplicaReadMixin, admin.ModelAdmin):
+    list_display = ['plan_type', 'service_level', 'workout_type', 'metric', 'sample_size', 'median', 'computed_at']
+    list_filter = ['plan_type', 'service_level', 'metric', 'workout_type']
+    readonly_fields = [
+        'plan_type', 'service_level', 'workout_type', 'metric', 'sample_size', 'percentiles', 'computed_at',
+    ]
+
+    @admin.display(description='Median')
+    def median(self, obj):
+        return obj.percentiles[50]
+
+    def has_add_permission(self, request):
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        return False
+
+
+@admin.register(ReviewSession)
+class ReviewSessionAdmin(admin.ModelAdmin):
+    list_display = [
+        'athlete', 'period', 'period_start', 'completion_rate', 'total_tss', 'review_date', 'next_review_date',
+    ]
+    list_filter = ['period', 'period_start']
+    search_fields = ['athlete__name']
+    date_hierarchy = 'period_start'
+    list_select_related = ['athlete']
+    readonly_fields = ['athlete', 'period', 'period_start', 'period_end', 'snapshot', 'computed_at']
+    fieldsets = (
+        ('Period', {
+            'fields': ('athlete', 'period', 'period_start', 'period_end', 'computed_at')
+        }),
+        ('Metrics', {
+            'fields': ('snapshot',)
+        }),
+        ('Review Call', {
+            'fields': ('coach', 'review_date', 'discussion_notes', 'action_items', 'goals_set', 'next_review_date')
+        }),
+    )
+
+    @staticmethod
+    def _with_delta(obj, name):
+        value = obj.metrics_snapshot.get(name)
+        if value is None:
+            return '-'
+        delta = obj.deltas.get(name)
+        if delta is None:
+            return f"{value:g}"
+        return f"{value:g} ({'→ same' if delta == 0 else f'↑ +{delta:g}' if delta > 0 else f'↓ {delta:g}'})"
+
+    @admin.display(description='Completion %')
+    def completion_rate(self, obj):
+        return self._with_delta(obj, 'completion_rate')
+
+    @admin.display(description='TSS')
+    def total_tss(self, obj):
+        return self._with_delta(obj, 'tss')
+
+    def snapshot(self, obj):
+        if not obj.metrics_snapshot:
+            return '-'
+        rows = format_html_join('', '<tr><td>{}</td><td>{}</td></tr>', (
+            (label, self._with_delta(obj, name))
+            for name, label in reviews.LABELS.items() if name in obj.metrics_snapshot
+        ))
+        types = obj.metrics_snapshot.get('types', {})
+        if types:
+            labels = dict(Workout.WORKOUT_TYPE_CHOICES)
+            rows += format_html(
+                '<tr><td>Completed by type</td><td>{}</td></tr>',
+                ', '.join(f"{labels.get(name, name)} {count}" for name, count in types.items()),
+            )
+        return format_html('<table>{}</table>', rows)
+
+    def has_add_permission(self, request):
+        return False
+
+
+@admin.register(AthleteGoal)
+class AthleteGoalAdmin(admin.ModelAdmin):
+    list_display = ['athlete', 'description', 'progress_metric', 'progress', 'target_date', 'status']
+    list_filter = ['status', 'goal_type', 'progress_metric']
+    search_fields = ['athlete__name', 'description']
+    list_select_related = ['athlete']
+    readonly_fields = ['current_value', 'total', 'streak', 'streak_end', 'created_at', 'updated_at']
+    fieldsets = (
+        ('Goal', {
+            'fields': ('athlete', 'goal_type', 'description', 'status')
+        }),
+        ('Target', {
+            'fields': ('progress_metric', 'target_value', 'start_date', 'target_date')
+        }),
+        ('Progress', {
+            'fields': ('current_value', 'total', 'streak', 'streak_end', 'updated_at'),
+            'classes': ('collapse',)
+        }),
+    )
+
+    @admin.display(description='Progress')
+    def progress(self, obj):
+        return f"{obj.current_value:g} / {obj.target_value:g}"
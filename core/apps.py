@@ -4,3 +4,9 @@ from django.apps import AppConfig
 class CoreConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'core'
+
+    def ready(self):
+        from django.contrib.auth.signals import user_logged_in
+
+        from .engagement import track_login
+        user_logged_in.connect(track_login, dispatch_uid='core.engagement.track_login')
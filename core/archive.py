@@ -0,0 +1,252 @@
+"""
+Tiered archival of old workouts.
+
+Workouts dated before the archive horizon (WORKOUT_ARCHIVE_DAYS), and all
+workouts of athletes whose subscriptions have all been cancelled for
+WORKOUT_ARCHIVE_CANCELLED_DAYS, are moved with their completions into
+ArchivedWorkout. The columns used by listings and totals stay columns;
+everything else is kept as one zlib-compressed JSON blob. Rows keep their
+original id, so a restore puts back exactly what was archived.
+
+ArchivedWorkoutDay holds per-athlete daily totals of the archived rows, and
+`history()` merges live and archived workouts so an athlete's history reads
+the same before and after archival.
+
+Each batch is moved in one transaction: insert archive rows, drop the
+workouts' search entries, delete the workouts (and, by cascade, their
+completions), then recount the affected days and athlete summaries.
+"""
+import json
+import zlib
+from collections import defaultdict, namedtuple
+from datetime import timedelta
+from functools import reduce
+from operator import or_
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Case, Count, DateTimeField, DecimalField, Max, Q, Sum, Value, When
+from django.db.models.functions import Coalesce
+from django.utils import timezone
+
+from .backup import ExactJSONEncoder
+from .models import ArchivedWorkout, ArchivedWorkoutDay, Athlete, SearchEntry, Workout, WorkoutCompletion
+from .search import entry_for, index_entries
+from .summary import refresh_athletes
+
+# Fields kept as ArchivedWorkout columns; the rest go into the compressed blob
+WORKOUT_COLUMNS = ('date', 'workout_type', 'title', 'status', 'target_distance')
+COMPLETION_COLUMNS = ('completion_quality', 'actual_date', 'actual_distance', 'actual_duration', 'actual_tss')
+# Not stored at all: recovered from the archive row itself
+DERIVED_FIELDS = {'id', 'tenant_id', 'athlete_id', 'workout_id'}
+
+HistoryEntry = namedtuple('HistoryEntry', [
+    'id', 'date', 'workout_type', 'title', 'status', 'completion_quality', 'actual_distance',
+    'actual_duration', 'archived',
+])
+
+
+def _blob_fields(model, columns):
+    return [
+        field for field in model._meta.concrete_fields
+        if field.attname not in columns and field.attname not in DERIVED_FIELDS
+    ]
+
+
+def _pack(instance, fields):
+    return {field.attname: getattr(instance, field.attname) for field in fields}
+
+
+def _unpack(values, fields):
+    return {field.attname: field.to_python(values[field.attname]) for field in fields if field.attname in values}
+
+
+def archived_row(workout, now):
+    """ArchivedWorkout for a workout with its completion (if any) loaded"""
+    completion = getattr(workout, 'completion', None)
+    data = {
+        'workout': _pack(workout, _blob_fields(Workout, WORKOUT_COLUMNS)),
+        'completion': (
+            dict(_pack(completion, _blob_fields(WorkoutCompletion, COMPLETION_COLUMNS)), id=completion.pk)
+            if completion else None
+        ),
+    }
+    return ArchivedWorkout(
+        id=workout.pk,
+        tenant_id=workout.tenant_id,
+        athlete_id=workout.athlete_id,
+        **{name: getattr(workout, name) for name in WORKOUT_COLUMNS},
+        **{name: getattr(completion, name) for name in COMPLETION_COLUMNS} if completion else {},
+        data=zlib.compress(json.dumps(data, cls=ExactJSONEncoder).encode()),
+        archived_at=now,
+    )
+
+
+def unpack(archived):
+    """(Workout, WorkoutCompletion or None) rebuilt from an archive row, unsaved"""
+    data = json.loads(zlib.decompress(bytes(archived.data)))
+    workout = Workout(
+        id=archived.pk,
+        tenant_id=archived.tenant_id,
+        athlete_id=archived.athlete_id,
+        **{name: getattr(archived, name) for name in WORKOUT_COLUMNS},
+        **_unpack(data['workout'], _blob_fields(Workout, WORKOUT_COLUMNS)),
+    )
+    completion = None
+    if data['completion'] is not None:
+        completion = WorkoutCompletion(
+            id=data['completion']['id'],
+            tenant_id=archived.tenant_id,
+            workout=workout,
+            **{name: getattr(archived, name) for name in COMPLETION_COLUMNS},
+            **_unpack(data['completion'], _blob_fields(WorkoutCompletion, COMPLETION_COLUMNS)),
+        )
+    return workout, completion
+
+
+def candidates(today=None, horizon_days=None, cancelled_days=None):
+    """Workouts due for archival: older than the horizon, or of long-cancelled athletes"""
+    today = today or timezone.localdate()
+    horizon_days = horizon_days or getattr(settings, 'WORKOUT_ARCHIVE_DAYS', 730)
+    cancelled_days = cancelled_days or getattr(settings, 'WORKOUT_ARCHIVE_CANCELLED_DAYS', 180)
+    cancelled = Athlete.objects.annotate(
+        open_subscriptions=Count('subscriptions', filter=~Q(subscriptions__status='CANCELLED')),
+        last_change=Max('subscriptions__updated_at'),
+    ).filter(open_subscriptions=0, last_change__lt=timezone.now() - timedelta(days=cancelled_days))
+    return Workout.objects.filter(
+        Q(date__lt=today - timedelta(days=horizon_days)) | Q(athlete__in=cancelled.values('pk'))
+    )
+
+
+def _day_filter(keys):
+    dates = defaultdict(set)
+    for athlete_id, day in keys:
+        dates[athlete_id].add(day)
+    return reduce(or_, (Q(athlete_id=athlete_id, date__in=days) for athlete_id, days in dates.items()))
+
+
+def refresh_days(keys):
+    """Recount ArchivedWorkoutDay for the given (athlete_id, date) pairs"""
+    if not keys:
+        return 0
+    days = _day_filter(keys)
+    totals = ArchivedWorkout.objects.filter(days).values('tenant_id', 'athlete_id', 'date').annotate(
+        total=Count('pk'),
+        done=Count('pk', filter=Q(status='COMPLETED')),
+        skipped_count=Count('pk', filter=Q(status='SKIPPED')),
+        planned=Coalesce(Sum('target_distance'), Value(0), output_field=DecimalField(max_digits=8, decimal_places=2)),
+        distance=Coalesce(Sum('actual_distance'), Value(0), output_field=DecimalField(max_digits=8, decimal_places=2)),
+        duration=Coalesce(Sum('actual_duration'), Value(0)),
+        tss=Coalesce(Sum('actual_tss'), Value(0)),
+    ).order_by()
+    rows = [
+        ArchivedWorkoutDay(
+            tenant_id=row['tenant_id'], athlete_id=row['athlete_id'], date=row['date'],
+            workouts=row['total'], completed=row['done'], skipped=row['skipped_count'],
+            planned_distance=row['planned'], actual_distance=row['distance'],
+            actual_duration=row['duration'], actual_tss=row['tss'],
+        )
+        for row in totals
+    ]
+    ArchivedWorkoutDay.objects.filter(days).delete()
+    ArchivedWorkoutDay.objects.bulk_create(rows)
+    return len(rows)
+
+
+def _batches(queryset, batch_size):
+    """Successive pk-ordered batches of a queryset, safe to use while its rows are moved away"""
+    last = None
+    while True:
+        page = queryset if last is None else queryset.filter(pk__gt=last)
+        batch = list(page.order_by('pk')[:batch_size])
+        if not batch:
+            return
+        yield batch
+        last = batch[-1].pk
+
+
+def archive(queryset, batch_size=500):
+    """Move the queryset's workouts (with completions) into the archive; returns how many moved"""
+    moved = 0
+    for workouts in _batches(queryset.select_related('completion'), batch_size):
+        now = timezone.now()
+        ids = [workout.pk for workout in workouts]
+        completion_ids = [workout.completion.pk for workout in workouts if hasattr(workout, 'completion')]
+        with transaction.atomic():
+            ArchivedWorkout.objects.bulk_create([archived_row(workout, now) for workout in workouts])
+            SearchEntry.objects.filter(
+                Q(kind='WORKOUT', object_id__in=ids) | Q(kind='COMPLETION', object_id__in=completion_ids)
+            ).delete()
+            Workout._base_manager.filter(pk__in=ids).delete()
+            refresh_days({(workout.athlete_id, workout.date) for workout in workouts})
+            refresh_athletes({workout.athlete_id for workout in workouts})
+        moved += len(workouts)
+    return moved
+
+
+def _set_created_at(model, created):
+    """bulk_create stamps auto_now_add fields; put the original {pk: created_at} back in one UPDATE"""
+    if created:
+        model._base_manager.filter(pk__in=list(created)).update(created_at=Case(
+            *[When(pk=pk, then=Value(created_at)) for pk, created_at in created.items()],
+            output_field=DateTimeField(),
+        ))
+
+
+def restore(queryset, batch_size=500):
+    """
+    Move archived workouts back into the live tables. Rows whose slot (athlete,
+    date, type) has since been taken by a new workout stay archived. Returns
+    (restored, skipped).
+    """
+    restored = skipped = 0
+    for batch in _batches(queryset, batch_size):
+        taken = set(Workout._base_manager.filter(_day_filter({(row.athlete_id, row.date) for row in batch})).values_list(
+            'athlete_id', 'date', 'workout_type'
+        ))
+        rows = [row for row in batch if (row.athlete_id, row.date, row.workout_type) not in taken]
+        skipped += len(batch) - len(rows)
+        if not rows:
+            continue
+        pairs = [unpack(row) for row in rows]
+        workouts = [workout for workout, _ in pairs]
+        completions = [completion for _, completion in pairs if completion is not None]
+        created = {model: {instance.pk: instance.created_at for instance in instances}
+                   for model, instances in ((Workout, workouts), (WorkoutCompletion, completions))}
+        with transaction.atomic():
+            Workout._base_manager.bulk_create(workouts)
+            WorkoutCompletion._base_manager.bulk_create(completions)
+            for model, times in created.items():
+                _set_created_at(model, times)
+            ArchivedWorkout.objects.filter(pk__in=[row.pk for row in rows]).delete()
+            index_entries([entry_for(instance) for instance in workouts + completions])
+            refresh_days({(row.athlete_id, row.date) for row in rows})
+            refresh_athletes({row.athlete_id for row in rows})
+        restored += len(rows)
+    return restored, skipped
+
+
+def history(athlete_id, start=None, end=None, limit=None):
+    """
+    An athlete's workouts, newest first, live and archived alike, as
+    HistoryEntry tuples (two queries, no blob decoding).
+    """
+    live = Workout.objects.filter(athlete_id=athlete_id)
+    archived = ArchivedWorkout.objects.filter(athlete_id=athlete_id)
+    if start:
+        live, archived = live.filter(date__gte=start), archived.filter(date__gte=start)
+    if end:
+        live, archived = live.filter(date__lte=end), archived.filter(date__lte=end)
+    live = live.order_by('-date', '-pk').values_list(
+        'pk', 'date', 'workout_type', 'title', 'status', 'completion__completion_quality',
+        'completion__actual_distance', 'completion__actual_duration',
+    )
+    archived = archived.order_by('-date', '-pk').values_list(
+        'pk', 'date', 'workout_type', 'title', 'status', 'completion_quality', 'actual_distance', 'actual_duration',
+    )
+    if limit:
+        live, archived = live[:limit], archived[:limit]
+    entries = [HistoryEntry(*row, archived=False) for row in live]
+    entries += [HistoryEntry(*row[:5], row[5] or None, *row[6:], archived=True) for row in archived]
+    entries.sort(key=lambda entry: (entry.date, entry.id), reverse=True)
+    return entries[:limit] if limit else entries
@@ -0,0 +1,216 @@
+"""
+Append-only change log for billing records.
+
+Every save of a Payment, Invoice or AthleteSubscription appends a
+BillingChange row: the full field values when the record is created and a
+{field: [old, new]} diff on each later change. Values are stored in their
+JSON form (dates and decimals as strings).
+
+Set-based updates go through `audited_update()` (or `audited_update_rows()`
+when each row gets its own values), which logs the diff for all affected rows
+with a single read and a single insert. Inside `batch()` all
+entries are buffered and written with one bulk insert when the block exits.
+
+`state_at()` rebuilds a record as of any point in time from its most recent
+full snapshot plus the diffs after it, reading only that record's entries
+through the (record_type, record_id, changed_at) index.
+"""
+import contextvars
+from collections import defaultdict
+from contextlib import contextmanager
+
+from django.db import transaction
+from django.db.models import Case, Value, When
+from django.db.models.fields.files import FieldFile
+from django.utils import timezone
+
+from .models import AthleteSubscription, BillingChange, Invoice, Payment
+
+RECORD_TYPES = {
+    Payment: 1,
+    Invoice: 2,
+    AthleteSubscription: 3,
+}
+
+CREATED, UPDATED, DELETED, SNAPSHOT = 1, 2, 3, 4
+
+# Bookkeeping columns that are not worth a log entry on their own
+IGNORED_FIELDS = {'id', 'created_at', 'updated_at'}
+
+_buffer = contextvars.ContextVar('billing_change_buffer', default=None)
+
+
+def tracked_fields(model):
+    return [field for field in model._meta.concrete_fields if field.attname not in IGNORED_FIELDS]
+
+
+def _value(instance, field):
+    value = getattr(instance, field.attname)
+    if isinstance(value, FieldFile):
+        return value.name or ''
+    return value
+
+
+def _values(instance):
+    return {field.attname: _value(instance, field) for field in tracked_fields(type(instance))}
+
+
+def _write(entries):
+    if not entries:
+        return
+    buffer = _buffer.get()
+    if buffer is not None:
+        buffer.extend(entries)
+    else:
+        BillingChange.objects.bulk_create(entries)
+
+
+@contextmanager
+def batch():
+    """Buffer all log entries written inside the block and insert them at once"""
+    if _buffer.get() is not None:
+        yield
+        return
+    buffer = []
+    token = _buffer.set(buffer)
+    try:
+        yield
+        BillingChange.objects.bulk_create(buffer, batch_size=1000)
+    finally:
+        _buffer.reset(token)
+
+
+def _entry(instance_or_model, record_id, action, changes, changed_at=None, tenant_id=None):
+    model = instance_or_model if isinstance(instance_or_model, type) else type(instance_or_model)
+    return BillingChange(
+        tenant_id=tenant_id or instance_or_model.tenant_id,
+        record_type=RECORD_TYPES[model],
+        record_id=record_id,
+        action=action,
+        changes=changes,
+        changed_at=changed_at or timezone.now(),
+    )
+
+
+def record_save(instance, created):
+    """Log a save of a billing record (called from BillingAuditMixin.save)"""
+    current = _values(instance)
+    loaded = getattr(instance, '_loaded_values', None)
+    if created or loaded is None:
+        entry = _entry(instance, instance.pk, CREATED if created else SNAPSHOT, current)
+    else:
+        diff = {
+            name: [loaded[name], value]
+            for name, value in current.items()
+            if name in loaded and loaded[name] != value
+        }
+        if not diff:
+            return
+        entry = _entry(instance, instance.pk, UPDATED, diff)
+    instance._loaded_values = current
+    _write([entry])
+
+
+def record_created(instances):
+    """Log records inserted with bulk_create (which bypasses save())"""
+    now = timezone.now()
+    _write([_entry(instance, instance.pk, CREATED, _values(instance), changed_at=now) for instance in instances])
+
+
+def record_delete(instance):
+    _write([_entry(instance, instance.pk, DELETED, {})])
+
+
+def _touch(model, now):
+    """updated_at for set-based updates, which skip auto_now (incremental backups select rows by it)"""
+    return {'updated_at': now} if any(field.name == 'updated_at' for field in model._meta.concrete_fields) else {}
+
+
+def audited_update(queryset, **values):
+    """
+    queryset.update(**values) with the change logged for every affected row.
+
+    Values must be plain literals (not expressions) so the diff can be
+    computed. Returns the number of rows updated.
+    """
+    model = queryset.model
+    fields = {model._meta.get_field(name).attname: value for name, value in values.items()}
+    with transaction.atomic():
+        rows = list(queryset.select_for_update().values('pk', 'tenant_id', *fields))
+        now = timezone.now()
+        entries = []
+        for row in rows:
+            diff = {name: [row[name], value] for name, value in fields.items() if row[name] != value}
+            if diff:
+                entries.append(_entry(model, row['pk'], UPDATED, diff, changed_at=now, tenant_id=row['tenant_id']))
+        updated = queryset.model.objects.filter(pk__in=[row['pk'] for row in rows]).update(
+            **values, **_touch(model, now)
+        )
+        _write(entries)
+    return updated
+
+
+def audited_update_rows(model, values):
+    """
+    Per-row literal updates, {pk: {field: value}}, written with one
+    CASE-based UPDATE per field and the diff logged for every changed row.
+    Returns the number of rows changed.
+    """
+    if not values:
+        return 0
+    fields = {}
+    for row_values in values.values():
+        for name in row_values:
+            field = model._meta.get_field(name)
+            fields[field.attname] = field
+    with transaction.atomic():
+        rows = list(model._base_manager.filter(pk__in=list(values)).select_for_update().values(
+            'pk', 'tenant_id', *fields
+        ))
+        now = timezone.now()
+        entries, changed = [], defaultdict(dict)
+        for row in rows:
+            diff = {
+                attname: [row[attname], value]
+                for attname, value in ((fields[name].attname, value) for name, value in values[row['pk']].items())
+                if row[attname] != value
+            }
+            if diff:
+                entries.append(_entry(model, row['pk'], UPDATED, diff, changed_at=now, tenant_id=row['tenant_id']))
+                for attname, (_, value) in diff.items():
+                    changed[attname][row['pk']] = value
+        for attname, by_pk in changed.items():
+            # One WHEN per distinct value, not per row: batches mostly share a handful of values
+            by_value = defaultdict(list)
+            for pk, value in by_pk.items():
+                by_value[value].append(pk)
+            model._base_manager.filter(pk__in=list(by_pk)).update(**{attname: Case(
+                *[When(pk__in=pks, then=Value(value)) for value, pks in by_value.items()],
+                output_field=fields[attname],
+            )}, **_touch(model, now))
+        _write(entries)
+    return len(entries)
+
+
+def history(model, record_id):
+    return BillingChange.objects.filter(
+        record_type=RECORD_TYPES[model], record_id=record_id
+    ).order_by('changed_at', 'id')
+
+
+def state_at(model, record_id, at):
+    """
+    Field values of a record as they were at `at`, or None if it did not
+    exist (or had been deleted) at that time.
+    """
+    entries = history(model, record_id).filter(changed_at__lte=at)
+    base = entries.filter(action__in=[CREATED, SNAPSHOT, DELETED]).order_by('-changed_at', '-id').first()
+    if base is None or base.action == DELETED:
+        return None
+    state = dict(base.changes)
+    for change in entries.filter(action=UPDATED).filter(
+        changed_at__gte=base.changed_at
+    ).exclude(changed_at=base.changed_at, id__lt=base.id).values_list('changes', flat=True):
+        for name, (_, new) in change.items():
+            state[name] = new
+    return state
@@ -0,0 +1,418 @@
+"""
+Streaming, incremental backups and parallel restore.
+
+A backup is a directory holding one gzip NDJSON file per model plus a
+manifest.json. Each model is read in primary-key order, `chunk_size` rows at
+a time (keyset pagination), and written straight to its file, so memory use
+does not grow with the dataset. All models are read in one transaction
+(REPEATABLE READ on PostgreSQL), so the backup is a consistent snapshot.
+
+Incremental backups only contain rows whose watermark column (updated_at and
+friends, see WATERMARK_FIELDS) changed since the previous backup started,
+minus a small overlap for transactions that were in flight; models without
+one are copied whole. They also list every primary key still present, so
+restores can drop rows deleted in between.
+
+Invoice PDFs are stored once per content hash under `<output>/blobs/`, shared
+by all backups; each manifest carries the full {file name: (size, sha256)}
+index.
+
+Restoring replays the newest full backup and the incrementals after it,
+bulk-inserting each model's rows in batches (an incremental first prunes
+the rows deleted since the previous backup and replaces the changed ones).
+A restore that fails part-way empties the database again, so it can be
+retried. Models are grouped into levels
+by foreign-key dependency and the models of a level are loaded in parallel,
+each on its own connection (one at a time on SQLite, which allows a single
+writer).
+"""
+import gzip
+import hashlib
+import json
+import shutil
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+from pathlib import Path
+
+from django.apps import apps
+from django.core.exceptions import ValidationError
+from django.core.files.storage import default_storage
+from django.core.management.color import no_style
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import connection, transaction
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+
+MANIFEST = 'manifest.json'
+BLOBS = 'blobs'
+
+# Rebuilt by `migrate` (or not worth keeping) rather than restored
+SKIPPED_MODELS = {'contenttypes.contenttype', 'auth.permission', 'sessions.session', 'admin.logentry'}
+
+# Rows created by migrations; a restore replaces them with the backup's
+SEEDED_MODELS = {'core.tenant'}
+
+# Column that moves whenever a row changes, checked in this order
+WATERMARK_FIELDS = ('updated_at', 'computed_at', 'changed_at', 'timestamp', 'archived_at')
+
+# Rewind the watermark to catch rows saved by transactions still open when the last backup started
+WATERMARK_OVERLAP = timedelta(minutes=5)
+
+
+class ExactJSONEncoder(DjangoJSONEncoder):
+    """DjangoJSONEncoder that keeps datetimes to the microsecond (it truncates them to milliseconds)"""
+
+    def default(self, o):
+        if isinstance(o, datetime):
+            return o.isoformat()
+        return super().default(o)
+
+
+def backup_models():
+    """Concrete models to back up, parents before children"""
+    models = [
+        model for model in apps.get_models(include_auto_created=True)
+        if model._meta.managed and not model._meta.proxy and model._meta.label_lower not in SKIPPED_MODELS
+    ]
+    return [model for level in dependency_levels(models) for model in level]
+
+
+def dependency_levels(models):
+    """Group models so each only references models of earlier levels"""
+    remaining = set(models)
+    levels = []
+    while remaining:
+        level = [
+            model for model in remaining
+            if not any(
+                field.related_model in remaining and field.related_model is not model
+                for field in model._meta.concrete_fields if field.is_relation
+            )
+        ]
+        if not level:
+            # A foreign-key cycle: load the rest one by one in a final level
+            level = list(remaining)
+        levels.append(sorted(level, key=lambda model: model._meta.label_lower))
+        remaining.difference_update(level)
+    return levels
+
+
+def watermark_field(model):
+    names = {field.attname for field in model._meta.concrete_fields}
+    return next((name for name in WATERMARK_FIELDS if name in names), None)
+
+
+def _file_name(model, suffix='ndjson.gz'):
+    return f"{model._meta.label_lower}.{suffix}"
+
+
+def _sha256(path):
+    digest = hashlib.sha256()
+    with open(path, 'rb') as handle:
+        for block in iter(lambda: handle.read(1 << 20), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def _chunks(queryset, chunk_size):
+    """Rows of a values_list queryset (pk first) in pk order, one chunk per query"""
+    last = None
+    while True:
+        page = queryset if last is None else queryset.filter(pk__gt=last)
+        rows = list(page.order_by('pk')[:chunk_size])
+        if not rows:
+            return
+        yield rows
+        last = rows[-1][0]
+
+
+def dump_model(model, path, since=None, chunk_size=2000):
+    """Write the model's rows (changed since `since`, if given) to gzip NDJSON; returns the row count"""
+    fields = [field.attname for field in model._meta.concrete_fields]
+    fields.insert(0, fields.pop(fields.index(model._meta.pk.attname)))
+    queryset = model._base_manager.all()
+    if since is not None:
+        queryset = queryset.filter(**{f'{watermark_field(model)}__gt': since})
+    count = 0
+    with gzip.open(path, 'wt', encoding='utf-8') as handle:
+        for rows in _chunks(queryset.values_list(*fields), chunk_size):
+            handle.writelines(json.dumps(dict(zip(fields, row)), cls=ExactJSONEncoder) + '\n' for row in rows)
+            count += len(rows)
+    return count
+
+
+def dump_pks(model, path, chunk_size=2000):
+    with gzip.open(path, 'wt', encoding='utf-8') as handle:
+        for rows in _chunks(model._base_manager.values_list('pk'), chunk_size):
+            handle.writelines(f"{pk}\n" for pk, in rows)
+
+
+def backup_files(blob_dir, index, since=None):
+    """
+    Store invoice PDFs in the content-addressed blob store; returns the
+    updated {name: [size, sha256]} index. Only invoices changed since `since`
+    are re-read; a blob already stored is never written again.
+    """
+    from .models import Invoice
+
+    index = dict(index)
+    invoices = Invoice._base_manager.exclude(pdf_file='').exclude(pdf_file__isnull=True)
+    if since is not None:
+        invoices = invoices.filter(updated_at__gt=since)
+    else:
+        index = {}
+    stored = 0
+    for name in invoices.values_list('pdf_file', flat=True).iterator():
+        if not default_storage.exists(name):
+            continue
+        digest = hashlib.sha256()
+        with default_storage.open(name, 'rb') as handle:
+            for block in handle.chunks():
+                digest.update(block)
+        sha = digest.hexdigest()
+        blob = blob_dir / sha[:2] / sha
+        if not blob.exists():
+            blob.parent.mkdir(parents=True, exist_ok=True)
+            with default_storage.open(name, 'rb') as source, open(blob, 'wb') as target:
+                shutil.copyfileobj(source, target)
+            stored += 1
+        index[name] = [default_storage.size(name), sha]
+    return index, stored
+
+
+def latest_manifest(output_dir):
+    manifests = sorted(Path(output_dir).glob(f'*/{MANIFEST}'))
+    if not manifests:
+        return None
+    return json.loads(manifests[-1].read_text())
+
+
+def backup(output_dir, incremental=False, chunk_size=2000):
+    """Write a full or incremental backup under output_dir; returns its manifest"""
+    from django.contrib.auth.models import Permission
+
+    output_dir = Path(output_dir)
+    started = timezone.now()
+    base = latest_manifest(output_dir) if incremental else None
+    if incremental and base is None:
+        incremental = False
+    since = parse_datetime(base['started_at']) - WATERMARK_OVERLAP if incremental else None
+
+    name = f"{started:%Y%m%dT%H%M%S}-{'incr' if incremental else 'full'}"
+    target = output_dir / name
+    target.mkdir(parents=True)
+    manifest = {
+        'name': name,
+        'kind': 'incremental' if incremental else 'full',
+        'base': base['name'] if incremental else None,
+        'started_at': started.isoformat(),
+        'models': {},
+        # Permission ids differ between installs; restores remap them by codename
+        'permissions': {
+            pk: [app_label, codename]
+            for pk, app_label, codename in Permission.objects.values_list('pk', 'content_type__app_label', 'codename')
+        },
+    }
+    with transaction.atomic():
+        if connection.vendor == 'postgresql':
+            with connection.cursor() as cursor:
+                cursor.execute("SET TRANSACTION ISOLATION LEVEL REPEATABLE READ")
+        for model in backup_models():
+            model_since = since if since is not None and watermark_field(model) else None
+            path = target / _file_name(model)
+            rows = dump_model(model, path, model_since, chunk_size)
+            entry = {'file': path.name, 'rows': rows, 'sha256': _sha256(path), 'partial': model_since is not None}
+            if incremental:
+                pks = target / _file_name(model, 'pks.gz')
+                dump_pks(model, pks, chunk_size)
+                entry['pks'] = pks.name
+            manifest['models'][model._meta.label_lower] = entry
+
+    manifest['files'], manifest['blobs_stored'] = backup_files(
+        output_dir / BLOBS, base['files'] if incremental else {}, since,
+    )
+    manifest['finished_at'] = timezone.now().isoformat()
+    (target / MANIFEST).write_text(json.dumps(manifest, indent=2))
+    return manifest
+
+
+def backup_chain(path):
+    """Manifests (with their directories) to replay for a backup: its full base first"""
+    path = Path(path)
+    chain = []
+    while True:
+        manifest = json.loads((path / MANIFEST).read_text())
+        chain.insert(0, (path, manifest))
+        if manifest['base'] is None:
+            return chain
+        path = path.parent / manifest['base']
+
+
+def _decoders(model):
+    return {field.attname: field.to_python for field in model._meta.concrete_fields}
+
+
+def _permission_map(manifest):
+    from django.contrib.auth.models import Permission
+
+    current = {
+        (app_label, codename): pk
+        for pk, app_label, codename in Permission.objects.values_list('pk', 'content_type__app_label', 'codename')
+    }
+    return {int(pk): current.get(tuple(key)) for pk, key in manifest['permissions'].items()}
+
+
+def _rows(path):
+    with gzip.open(path, 'rt', encoding='utf-8') as handle:
+        for line in handle:
+            yield json.loads(line)
+
+
+def load_model(model, path, replace=False, batch_size=2000, permissions=None):
+    """
+    Bulk-insert a model's rows from a backup file; returns the row count.
+
+    With `replace` (incrementals) the stored rows with the same pks are
+    deleted first, all of them before any insert: updating rows in place, one
+    at a time, can move a row into a unique slot (say, a rescheduled
+    workout's date) still held by another row that has yet to move. Foreign
+    keys are checked at commit, so children survive the gap.
+    """
+    from django.contrib.auth.models import Permission
+
+    decoders = _decoders(model)
+    remap = [
+        field.attname for field in model._meta.concrete_fields
+        if field.is_relation and field.related_model is Permission
+    ]
+    pk = model._meta.pk
+    count = 0
+    try:
+        with transaction.atomic():
+            if replace:
+                incoming = [pk.to_python(row[pk.attname]) for row in _rows(path)]
+                for start in range(0, len(incoming), batch_size):
+                    model._base_manager.filter(pk__in=incoming[start:start + batch_size])._raw_delete(connection.alias)
+            batch = []
+            for values in _rows(path):
+                row = {name: decoders[name](value) for name, value in values.items() if name in decoders}
+                if remap:
+                    row.update((name, permissions.get(row[name])) for name in remap)
+                    if any(row[name] is None for name in remap):
+                        continue
+                batch.append(model(**row))
+                if len(batch) >= batch_size:
+                    model._base_manager.bulk_create(batch)
+                    count += len(batch)
+                    batch = []
+            model._base_manager.bulk_create(batch)
+            count += len(batch)
+    finally:
+        # Worker threads open their own connections; don't leave them behind
+        connection.close()
+    return count
+
+
+def prune_deleted(model, path, chunk_size=2000):
+    """Delete rows whose pk is not listed in the backup's pk file; returns how many were deleted"""
+    with gzip.open(path, 'rt', encoding='utf-8') as handle:
+        kept = {model._meta.pk.to_python(line.strip()) for line in handle if line.strip()}
+    gone = [pk for pk in model._base_manager.values_list('pk', flat=True).iterator() if pk not in kept]
+    for start in range(0, len(gone), chunk_size):
+        model._base_manager.filter(pk__in=gone[start:start + chunk_size]).delete()
+    return len(gone)
+
+
+def verify(path, manifest):
+    for label, entry in manifest['models'].items():
+        if _sha256(path / entry['file']) != entry['sha256']:
+            raise ValidationError(f"{path.name}/{entry['file']} is corrupt (checksum mismatch).")
+
+
+def restore_files(blob_dir, index):
+    """Copy missing PDFs of the restored invoices back into storage; returns how many were restored"""
+    from .models import Invoice
+
+    referenced = set(Invoice._base_manager.exclude(pdf_file='').values_list('pdf_file', flat=True))
+    restored = 0
+    for name, (_, sha) in index.items():
+        if name not in referenced or default_storage.exists(name):
+            continue
+        with open(blob_dir / sha[:2] / sha, 'rb') as blob:
+            default_storage.save(name, blob)
+        restored += 1
+    return restored
+
+
+def _clear(levels, seeded):
+    """Empty every backed-up model and put the seeded rows back"""
+    with transaction.atomic():
+        for level in reversed(levels):
+            for model in level:
+                model._base_manager.all()._raw_delete(connection.alias)
+        for instances in seeded.values():
+            if instances:
+                type(instances[0])._base_manager.bulk_create(instances)
+
+
+def restore(path, workers=4, batch_size=2000, progress=None):
+    """
+    Restore a backup (and the chain it builds on) into an empty database;
+    returns {'rows': total rows loaded, 'deleted': rows pruned, 'files': PDFs restored}.
+    """
+    chain = backup_chain(path)
+    models = {model._meta.label_lower: model for model in backup_models()}
+    non_empty = [
+        label for label, model in models.items() if label not in SEEDED_MODELS and model._base_manager.exists()
+    ]
+    if non_empty:
+        raise ValidationError(f"Refusing to restore into a database that has data ({', '.join(non_empty[:5])}).")
+    for directory, manifest in chain:
+        verify(directory, manifest)
+    seeded = {label: list(models[label]._base_manager.all()) for label in SEEDED_MODELS}
+    for label in SEEDED_MODELS:
+        models[label]._base_manager.all().delete()
+
+    if connection.vendor == 'sqlite':
+        workers = 1
+    levels = dependency_levels(list(models.values()))
+    rows = deleted = 0
+    try:
+        for position, (directory, manifest) in enumerate(chain):
+            if position > 0:
+                # Drop rows deleted since the previous backup, children first, before their slots are reused
+                for level in reversed(levels):
+                    for model in level:
+                        entry = manifest['models'].get(model._meta.label_lower)
+                        if entry and entry.get('pks'):
+                            deleted += prune_deleted(model, directory / entry['pks'])
+            permissions = _permission_map(manifest)
+            for level in levels:
+                jobs = [
+                    (model, directory / manifest['models'][model._meta.label_lower]['file'])
+                    for model in level if model._meta.label_lower in manifest['models']
+                ]
+                with ThreadPoolExecutor(max_workers=workers) as pool:
+                    futures = [
+                        pool.submit(load_model, model, file, position > 0, batch_size, permissions)
+                        for model, file in jobs
+                    ]
+                    for (model, _), future in zip(jobs, futures):
+                        loaded = future.result()
+                        rows += loaded
+                        if progress:
+                            progress(manifest['name'], model._meta.label_lower, loaded)
+
+        # Explicit pks were inserted: move sequences past them (PostgreSQL)
+        statements = connection.ops.sequence_reset_sql(no_style(), list(models.values()))
+        if statements:
+            with connection.cursor() as cursor:
+                for sql in statements:
+                    cursor.execute(sql)
+
+        files = restore_files(Path(path).parent / BLOBS, chain[-1][1]['files'])
+    except BaseException:
+        # Models load on connections of their own, so undo by hand: leave the database as it was
+        _clear(levels, seeded)
+        raise
+    return {'rows': rows, 'deleted': deleted, 'files': files}
@@ -0,0 +1,216 @@
+"""
+Churn-risk scoring for athletes.
+
+Features are extracted for every athlete in one pass: a handful of grouped
+queries (payments, subscriptions, workouts, completions) are merged into
+per-feature columns, which are then scored with a small logistic model.
+The weights are hand-tuned and live in WEIGHTS below so they can be
+adjusted without touching the pipeline.
+"""
+import math
+from datetime import timedelta
+
+from django.db.models import Count, F, Max, Q
+from django.utils import timezone
+
+from .models import (
+    Athlete, AthleteSubscription, ChurnRiskScore, Payment, Workout, WorkoutCompletion
+)
+from .routing import use_replica
+
+# Length of the engagement window compared against the one before it
+WINDOW_DAYS = 28
+
+BIAS = -3.0
+
+# Feature name -> (weight, explanation label)
+WEIGHTS = {
+    'overdue_payments': (2.0, "{overdue_payments} overdue payment(s)"),
+    'late_payment_ratio': (1.0, "{late_payment_pct}% of payments made late"),
+    'failed_payments': (0.8, "{failed_payments} failed payment(s)"),
+    'days_since_payment': (1.2, "No payment in {days_since_payment} days"),
+    'no_active_subscription': (2.5, "No active subscription"),
+    'paused_subscription': (0.8, "Subscription paused"),
+    'missed_workout_rate': (1.5, "Missed {missed_workout_pct}% of recent workouts"),
+    'completion_drop': (1.5, "Completion rate down {completion_drop_pct} points"),
+    'days_since_completion': (1.5, "No workout submitted in {days_since_completion} days"),
+    'no_planned_workouts': (0.7, "No workouts planned recently"),
+}
+
+# Explanation labels used when the athlete has never paid / never submitted
+NEVER_LABELS = {
+    'days_since_payment': "No payments recorded",
+    'days_since_completion': "No workouts submitted yet",
+}
+
+
+def _rate(done, assigned):
+    return done / assigned if assigned else None
+
+
+@use_replica()
+def extract_features(today=None):
+    """
+    Build the raw feature columns for all athletes.
+
+    Returns (athlete_ids, columns) where columns maps feature name to a list
+    aligned with athlete_ids.
+    """
+    today = today or timezone.now().date()
+    recent_start = today - timedelta(days=WINDOW_DAYS)
+    prior_start = recent_start - timedelta(days=WINDOW_DAYS)
+
+    athlete_ids = list(Athlete.objects.order_by('pk').values_list('pk', flat=True))
+
+    payments = {
+        row['subscription__athlete']: row
+        for row in Payment.objects.values('subscription__athlete').annotate(
+            overdue=Count('pk', filter=Q(status='PENDING', due_date__lt=today)),
+            paid=Count('pk', filter=Q(status='PAID')),
+            paid_late=Count('pk', filter=Q(status='PAID', payment_date__gt=F('due_date'))),
+            failed=Count('pk', filter=Q(status='FAILED')),
+            last_paid=Max('payment_date', filter=Q(status='PAID')),
+        ).order_by()
+    }
+    subscriptions = {
+        row['athlete']: row
+        for row in AthleteSubscription.objects.values('athlete').annotate(
+            active=Count('pk', filter=Q(status='ACTIVE')),
+            paused=Count('pk', filter=Q(status='PAUSED')),
+        ).order_by()
+    }
+    workouts = {
+        row['athlete']: row
+        for row in Workout.objects.filter(
+            date__gt=prior_start, date__lte=today
+        ).exclude(workout_type='REST').values('athlete').annotate(
+            recent=Count('pk', filter=Q(date__gt=recent_start)),
+            recent_done=Count('pk', filter=Q(date__gt=recent_start, status='COMPLETED')),
+            prior=Count('pk', filter=Q(date__lte=recent_start)),
+            prior_done=Count('pk', filter=Q(date__lte=recent_start, status='COMPLETED')),
+        ).order_by()
+    }
+    last_completion = dict(
+        WorkoutCompletion.objects.values('workout__athlete').annotate(
+            last=Max('created_at'),
+        ).order_by().values_list('workout__athlete', 'last')
+    )
+
+    columns = {name: [] for name in (
+        'overdue_payments', 'paid_payments', 'late_payments', 'failed_payments',
+        'days_since_payment', 'active_subscriptions', 'paused_subscriptions',
+        'recent_workouts', 'recent_completed', 'recent_rate', 'prior_rate',
+        'days_since_completion',
+    )}
+    empty = {}
+    for athlete_id in athlete_ids:
+        pay = payments.get(athlete_id, empty)
+        sub = subscriptions.get(athlete_id, empty)
+        work = workouts.get(athlete_id, empty)
+        last_paid = pay.get('last_paid')
+        last_done = last_completion.get(athlete_id)
+
+        columns['overdue_payments'].append(pay.get('overdue', 0))
+        columns['paid_payments'].append(pay.get('paid', 0))
+        columns['late_payments'].append(pay.get('paid_late', 0))
+        columns['failed_payments'].append(pay.get('failed', 0))
+        columns['days_since_payment'].append((today - last_paid).days if last_paid else None)
+        columns['active_subscriptions'].append(sub.get('active', 0))
+        columns['paused_subscriptions'].append(sub.get('paused', 0))
+        columns['recent_workouts'].append(work.get('recent', 0))
+        columns['recent_completed'].append(work.get('recent_done', 0))
+        columns['recent_rate'].append(_rate(work.get('recent_done', 0), work.get('recent', 0)))
+        columns['prior_rate'].append(_rate(work.get('prior_done', 0), work.get('prior', 0)))
+        columns['days_since_completion'].append(
+            (today - timezone.localtime(last_done).date()).days if last_done else None
+        )
+
+    return athlete_ids, columns
+
+
+def _normalize(raw):
+    """Map raw feature values for one athlete onto the 0-1 model inputs"""
+    recent_rate = raw['recent_rate']
+    prior_rate = raw['prior_rate']
+    paid = raw['paid_payments']
+    days_paid = raw['days_since_payment']
+    days_done = raw['days_since_completion']
+    return {
+        'overdue_payments': min(raw['overdue_payments'], 3) / 3,
+        'late_payment_ratio': raw['late_payments'] / paid if paid else 0.0,
+        'failed_payments': min(raw['failed_payments'], 2) / 2,
+        'days_since_payment': 1.0 if days_paid is None else min(days_paid, 90) / 90,
+        'no_active_subscription': 0.0 if raw['active_subscriptions'] else 1.0,
+        'paused_subscription': 1.0 if raw['paused_subscriptions'] and not raw['active_subscriptions'] else 0.0,
+        'missed_workout_rate': 0.0 if recent_rate is None else 1 - recent_rate,
+        'completion_drop': max(0.0, prior_rate - recent_rate) if None not in (recent_rate, prior_rate) else 0.0,
+        'days_since_completion': 1.0 if days_done is None else min(days_done, 30) / 30,
+        'no_planned_workouts': 0.0 if raw['recent_workouts'] else 1.0,
+    }
+
+
+def _explain(raw, inputs, contributions, limit=3):
+    labels = {
+        'overdue_payments': raw['overdue_payments'],
+        'late_payment_pct': round(inputs['late_payment_ratio'] * 100),
+        'failed_payments': raw['failed_payments'],
+        'days_since_payment': raw['days_since_payment'],
+        'missed_workout_pct': round(inputs['missed_workout_rate'] * 100),
+        'completion_drop_pct': round(inputs['completion_drop'] * 100),
+        'days_since_completion': raw['days_since_completion'],
+    }
+    top = sorted(
+        (item for item in contributions.items() if item[1] > 0),
+        key=lambda item: item[1],
+        reverse=True,
+    )[:limit]
+    return '; '.join(
+        NEVER_LABELS[name] if labels.get(name, 0) is None else WEIGHTS[name][1].format(**labels)
+        for name, _ in top
+    )
+
+
+def risk_level(score):
+    if score >= 60:
+        return 'HIGH'
+    if score >= 30:
+        return 'MEDIUM'
+    return 'LOW'
+
+
+def score_athletes(today=None):
+    """Extract features and score every athlete; returns unsaved ChurnRiskScore rows"""
+    athlete_ids, columns = extract_features(today)
+    tenants = dict(Athlete.objects.values_list('pk', 'tenant_id'))
+    now = timezone.now()
+    names = list(columns)
+    scores = []
+    for index, athlete_id in enumerate(athlete_ids):
+        raw = {name: columns[name][index] for name in names}
+        inputs = _normalize(raw)
+        contributions = {name: WEIGHTS[name][0] * value for name, value in inputs.items()}
+        z = BIAS + sum(contributions.values())
+        score = round(100 / (1 + math.exp(-z)), 1)
+        scores.append(ChurnRiskScore(
+            tenant_id=tenants[athlete_id],
+            athlete_id=athlete_id,
+            score=score,
+            risk_level=risk_level(score),
+            features=raw,
+            explanation=_explain(raw, inputs, contributions),
+            computed_at=now,
+        ))
+    return scores
+
+
+def update_churn_scores(today=None, batch_size=500):
+    """Score all athletes and upsert the results; returns the number of rows written"""
+    scores = score_athletes(today)
+    ChurnRiskScore.objects.bulk_create(
+        scores,
+        batch_size=batch_size,
+        update_conflicts=True,
+        unique_fields=['athlete'],
+        update_fields=['score', 'risk_level', 'features', 'explanation', 'computed_at'],
+    )
+    return len(scores)
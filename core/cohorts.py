@@ -0,0 +1,220 @@
+"""
+Cohort benchmarking ("Comparative Analytics").
+
+A cohort is a coach's athletes on the same plan type and service level
+(from their active subscription), per workout type and across all workout
+types. Over the last COHORT_WINDOW_WEEKS weeks every athlete gets:
+
+- VOLUME: completed distance per week (km), 0 for athletes with a plan but
+  no completions
+- TSS: completed training stress per week, likewise
+- PACE: minutes per km over completions with both distance and duration
+- ADHERENCE: completed / planned workouts, in percent (rest days excluded)
+
+The nightly job reads everything in three grouped queries and stores two
+things. Each cohort with at least COHORT_MIN_SIZE athletes gets a
+101-point percentile table per metric (CohortBenchmark). Each athlete gets
+their values and their rank within the cohort (AthleteBenchmark).
+`placement()` then answers "where does this athlete stand" with two
+unique-key lookups, and `rank()` places any other value against a stored
+table by a bisect over its 101 points, whatever the cohort size.
+
+Percentiles use the standard library's `statistics.quantiles` (inclusive
+method, i.e. linear interpolation between order statistics).
+"""
+import statistics
+from bisect import bisect_right
+from collections import defaultdict, namedtuple
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Count, Q, Sum
+from django.utils import timezone
+
+from .models import Athlete, AthleteBenchmark, CohortBenchmark, Workout, WorkoutCompletion
+from .routing import use_replica
+
+METRICS = [metric for metric, _ in CohortBenchmark.METRIC_CHOICES]
+# Metrics where a lower value is the better one
+LOWER_IS_BETTER = {'PACE'}
+ALL_WORKOUTS = ''
+
+Placement = namedtuple('Placement', ['metric', 'value', 'rank', 'sample_size', 'p25', 'median', 'p75'])
+
+
+def percentile_table(values):
+    """The 0th..100th percentiles of at least two values, as 101 floats"""
+    ordered = sorted(values)
+    cuts = statistics.quantiles(ordered, n=100, method='inclusive')
+    return [round(value, 4) for value in [ordered[0], *cuts, ordered[-1]]]
+
+
+def rank(table, value, metric=None):
+    """Percent of the cohort `value` is ahead of (0-100), from a 101-point percentile table"""
+    if value <= table[0]:
+        position = 0.0
+    elif value >= table[-1]:
+        position = 100.0
+    else:
+        index = bisect_right(table, value)
+        low, high = table[index - 1], table[index]
+        position = index - 1 + ((value - low) / (high - low) if high > low else 0)
+    return round(100 - position if metric in LOWER_IS_BETTER else position, 1)
+
+
+def _metrics(totals, weeks):
+    # An athlete with a plan but nothing completed ranks at 0, not out of the cohort
+    active = totals['planned'] or totals['completed']
+    return {
+        'VOLUME': float(totals['distance']) / weeks if active else None,
+        'TSS': totals['tss'] / weeks if active else None,
+        'PACE': totals['paced_minutes'] / float(totals['paced_distance']) if totals['paced_distance'] else None,
+        'ADHERENCE': 100 * totals['done'] / totals['planned'] if totals['planned'] else None,
+    }
+
+
+@use_replica()
+def athlete_metrics(today=None, weeks=None):
+    """
+    ({athlete_id: (tenant_id, plan_type, service_level)},
+     {(athlete_id, workout_type): {metric: value or None}}) for every athlete
+    with an active subscription, in three grouped queries
+    """
+    today = today or timezone.localdate()
+    weeks = weeks or getattr(settings, 'COHORT_WINDOW_WEEKS', 12)
+    window = (today - timedelta(weeks=weeks) + timedelta(days=1), today)
+
+    cohorts = {
+        athlete_id: (tenant_id, plan_type, service_level)
+        for athlete_id, tenant_id, plan_type, service_level in Athlete.objects.filter(
+            summary__active_subscription__isnull=False,
+        ).values_list(
+            'pk', 'tenant_id', 'summary__active_subscription__billing_plan__plan_type',
+            'summary__active_subscription__billing_plan__service_level',
+        )
+    }
+    totals = defaultdict(lambda: {
+        'planned': 0, 'done': 0, 'completed': 0, 'distance': 0, 'tss': 0, 'paced_minutes': 0, 'paced_distance': 0,
+    })
+    planned = Workout.objects.filter(date__range=window).exclude(workout_type='REST').values(
+        'athlete_id', 'workout_type',
+    ).annotate(
+        planned=Count('pk'), done=Count('pk', filter=Q(status='COMPLETED')),
+    ).order_by()
+    paced = Q(actual_distance__gt=0, actual_duration__isnull=False)
+    completed = WorkoutCompletion.objects.filter(workout__date__range=window).exclude(
+        workout__workout_type='REST',
+    ).values('workout__athlete_id', 'workout__workout_type').annotate(
+        completed=Count('pk'),
+        distance=Sum('actual_distance'),
+        tss=Sum('actual_tss'),
+        paced_minutes=Sum('actual_duration', filter=paced),
+        paced_distance=Sum('actual_distance', filter=paced),
+    ).order_by()
+
+    for row in planned:
+        if row['athlete_id'] in cohorts:
+            for key in ((row['athlete_id'], row['workout_type']), (row['athlete_id'], ALL_WORKOUTS)):
+                totals[key]['planned'] += row['planned']
+                totals[key]['done'] += row['done']
+    for row in completed:
+        athlete_id = row['workout__athlete_id']
+        if athlete_id in cohorts:
+            for key in ((athlete_id, row['workout__workout_type']), (athlete_id, ALL_WORKOUTS)):
+                for name in ('completed', 'distance', 'tss', 'paced_minutes', 'paced_distance'):
+                    totals[key][name] += row[name] or 0
+    return cohorts, {key: _metrics(values, weeks) for key, values in totals.items()}
+
+
+def compute_benchmarks(today=None, weeks=None):
+    """Unsaved (CohortBenchmark rows, AthleteBenchmark rows) for every cohort and athlete"""
+    cohorts, metrics = athlete_metrics(today, weeks)
+    min_size = getattr(settings, 'COHORT_MIN_SIZE', 5)
+    now = timezone.now()
+
+    samples = defaultdict(list)
+    for (athlete_id, workout_type), values in metrics.items():
+        for metric, value in values.items():
+            if value is not None:
+                samples[(*cohorts[athlete_id], workout_type, metric)].append(value)
+    tables = {
+        key: CohortBenchmark(
+            tenant_id=key[0], plan_type=key[1], service_level=key[2], workout_type=key[3], metric=key[4],
+            sample_size=len(values), percentiles=percentile_table(values), computed_at=now,
+        )
+        for key, values in samples.items() if len(values) >= min_size
+    }
+
+    athletes = []
+    for (athlete_id, workout_type), values in metrics.items():
+        cohort = cohorts[athlete_id]
+        ranks = {}
+        for metric, value in values.items():
+            table = tables.get((*cohort, workout_type, metric))
+            if value is not None and table is not None:
+                ranks[metric] = rank(table.percentiles, value, metric)
+        athletes.append(AthleteBenchmark(
+            tenant_id=cohort[0], athlete_id=athlete_id, workout_type=workout_type,
+            values={metric: round(value, 2) for metric, value in values.items() if value is not None},
+            ranks=ranks, computed_at=now,
+        ))
+    return list(tables.values()), athletes
+
+
+def update_benchmarks(today=None, weeks=None, batch_size=1000):
+    """Recompute and store every cohort table and athlete placement; returns (tables, athletes) written"""
+    tables, athletes = compute_benchmarks(today, weeks)
+    with transaction.atomic():
+        CohortBenchmark.objects.bulk_create(
+            tables, batch_size=batch_size, update_conflicts=True,
+            unique_fields=['tenant', 'plan_type', 'service_level', 'workout_type', 'metric'],
+            update_fields=['sample_size', 'percentiles', 'computed_at'],
+        )
+        AthleteBenchmark.objects.bulk_create(
+            athletes, batch_size=batch_size, update_conflicts=True,
+            unique_fields=['athlete', 'workout_type'],
+            update_fields=['values', 'ranks', 'computed_at'],
+        )
+        # Cohorts that shrank below the minimum, athletes who left theirs
+        if tables or athletes:
+            computed_at = (tables or athletes)[0].computed_at
+            CohortBenchmark.objects.filter(computed_at__lt=computed_at).delete()
+            AthleteBenchmark.objects.filter(computed_at__lt=computed_at).delete()
+        else:
+            CohortBenchmark.objects.all().delete()
+            AthleteBenchmark.objects.all().delete()
+    return len(tables), len(athletes)
+
+
+def placement(athlete, workout_type=ALL_WORKOUTS):
+    """
+    [Placement] per metric for an athlete in their cohort, from the nightly
+    tables (two indexed lookups); empty if the athlete has no benchmark yet
+    """
+    benchmark = AthleteBenchmark.objects.filter(
+        athlete=athlete, workout_type=workout_type,
+    ).select_related('athlete__summary__active_subscription__billing_plan').first()
+    if benchmark is None:
+        return []
+    subscription = benchmark.athlete.summary.active_subscription
+    if subscription is None:
+        return []
+    plan = subscription.billing_plan
+    tables = {
+        table.metric: table for table in CohortBenchmark.objects.filter(
+            tenant_id=benchmark.tenant_id, plan_type=plan.plan_type, service_level=plan.service_level,
+            workout_type=workout_type,
+        )
+    }
+    placements = []
+    for metric in METRICS:
+        table = tables.get(metric)
+        value = benchmark.values.get(metric)
+        if value is None:
+            continue
+        placements.append(Placement(
+            metric, value, benchmark.ranks.get(metric), table.sample_size if table else None,
+            *((table.percentiles[25], table.percentiles[50], table.percentiles[75]) if table else (None,) * 3),
+        ))
+    return placements
@@ -0,0 +1,238 @@
+"""
+Billing email rendering (HTML with a plain-text alternative).
+
+Rendering a full email means template inheritance, includes, company
+conditionals and CSS inlining, none of which depend on the recipient. So each
+email kind is rendered once per InvoiceTemplate version with placeholder
+slots for the per-message fields, its CSS is inlined, and the result is split
+into literal chunks and slots. Rendering a message is then just escaping the
+field values into the slots and joining.
+
+Compiled layouts are cached per process, keyed by the template's tenant, pk
+and updated_at, so saving the template recompiles it on next use.
+"""
+import html
+import re
+import threading
+from collections import OrderedDict, namedtuple
+
+from django.core.mail import EmailMultiAlternatives
+from django.template.defaultfilters import floatformat
+from django.template.loader import render_to_string
+from django.utils.dateformat import format as date_format
+from django.utils.safestring import mark_safe
+
+# kind: (template name without extension, subject, subject when there is no invoice yet)
+KINDS = {
+    'INVOICE_PAID': (
+        'emails/invoice_paid',
+        "Payment Received - Invoice {invoice_number}",
+        "Payment Received - {period}",
+    ),
+    'PAYMENT_DUE': (
+        'emails/payment_due',
+        "Invoice for {period} - Payment Due",
+        "Invoice for {period} - Payment Due",
+    ),
+    'PAYMENT_OVERDUE': (
+        'emails/payment_overdue',
+        "⚠️ Payment Overdue - Invoice {invoice_number}",
+        "⚠️ Payment Overdue - {period}",
+    ),
+    'INVOICE_CANCELLED': (
+        'emails/invoice_cancelled',
+        "Invoice Cancelled - {invoice_number}",
+        "Invoice Cancelled - {invoice_number}",
+    ),
+}
+
+# Per-message values; everything else in a layout is fixed per template version
+FIELDS = (
+    'athlete_name', 'invoice_number', 'amount', 'payment_date', 'due_date',
+    'days_overdue', 'service', 'period', 'cancellation_date', 'reason',
+)
+
+CACHE_SIZE = 64
+
+SLOT = re.compile(r'\x02(\w+)\x03')
+STYLE_BLOCK = re.compile(r'<style[^>]*>(.*?)</style>', re.S)
+CSS_RULE = re.compile(r'([^{}]+)\{([^}]*)\}')
+SIMPLE_SELECTOR = re.compile(r'^[a-zA-Z0-9]*(\.[\w-]+)*$')
+START_TAG = re.compile(r'<([a-zA-Z][a-zA-Z0-9]*)((?:\s[^<>]*?)?)(\s*/?)>')
+CLASS_ATTR = re.compile(r'\sclass="([^"]*)"')
+STYLE_ATTR = re.compile(r'\sstyle="([^"]*)"')
+
+Layout = namedtuple('Layout', ['subject', 'text', 'html'])
+RenderedEmail = namedtuple('RenderedEmail', ['subject', 'text', 'html'])
+
+_cache = OrderedDict()
+_lock = threading.Lock()
+
+
+def _slot(name):
+    return mark_safe(f'\x02{name}\x03')
+
+
+def _split(rendered):
+    """['literal', 'field', 'literal', ...] - odd positions are field names"""
+    return SLOT.split(rendered)
+
+
+def _fill(parts, values):
+    filled = list(parts)
+    filled[1::2] = [values[name] for name in parts[1::2]]
+    return ''.join(filled)
+
+
+def _matches(selector, tag, classes):
+    tag_name, *selector_classes = selector.split('.')
+    return (not tag_name or tag_name.lower() == tag) and classes.issuperset(selector_classes)
+
+
+def inline_css(document):
+    """
+    Copy <style> rules onto the style attribute of matching elements.
+
+    Handles tag, .class and tag.class selectors; any other rules are left in
+    a <style> block for clients that support one.
+    """
+    rules, leftover = [], []
+    for block in STYLE_BLOCK.findall(document):
+        for selectors, declarations in CSS_RULE.findall(block):
+            declarations = declarations.strip().rstrip(';').strip()
+            for selector in selectors.split(','):
+                selector = selector.strip()
+                if SIMPLE_SELECTOR.match(selector):
+                    rules.append((selector, declarations))
+                else:
+                    leftover.append(f"{selector} {{ {declarations} }}")
+    # Later, more specific rules win: order by (classes, has tag) keeping source order
+    rules.sort(key=lambda rule: (rule[0].count('.'), not rule[0].startswith('.')))
+
+    def apply(match):
+        tag, attrs, close = match.group(1), match.group(2), match.group(3)
+        class_attr = CLASS_ATTR.search(attrs)
+        classes = set(class_attr.group(1).split()) if class_attr else set()
+        styles = [declarations for selector, declarations in rules if _matches(selector, tag.lower(), classes)]
+        if not styles:
+            return match.group(0)
+        existing = STYLE_ATTR.search(attrs)
+        if existing:
+            styles.append(existing.group(1).strip().rstrip(';'))
+            attrs = STYLE_ATTR.sub('', attrs)
+        if not leftover:
+            attrs = CLASS_ATTR.sub('', attrs)
+        return f'<{tag}{attrs} style="{"; ".join(styles)}"{close}>'
+
+    blocks = [f"<style>{' '.join(leftover)}</style>" if leftover else '']
+    # Keep unsupported rules in place of the first block, drop the rest
+    document = STYLE_BLOCK.sub(lambda match: blocks.pop() if blocks else '', document)
+    return START_TAG.sub(apply, document)
+
+
+def _compile(kind, company, has_invoice):
+    name, subject, subject_without_invoice = KINDS[kind]
+    context = {'company': company, 'has_invoice': has_invoice}
+    context.update((field, _slot(field)) for field in FIELDS)
+    return Layout(
+        subject=subject if has_invoice else subject_without_invoice,
+        text=_split(render_to_string(f'{name}.txt', context)),
+        html=_split(inline_css(render_to_string(f'{name}.html', context))),
+    )
+
+
+def layout(kind, company, has_invoice=True):
+    """Compiled layout for an email kind and InvoiceTemplate (or None)"""
+    key = (
+        kind, company.tenant_id if company else None, company.pk if company else None,
+        company.updated_at if company else None, has_invoice,
+    )
+    with _lock:
+        compiled = _cache.get(key)
+        if compiled is not None:
+            _cache.move_to_end(key)
+            return compiled
+    compiled = _compile(kind, company, has_invoice)
+    with _lock:
+        _cache[key] = compiled
+        while len(_cache) > CACHE_SIZE:
+            _cache.popitem(last=False)
+    return compiled
+
+
+def clear_cache():
+    with _lock:
+        _cache.clear()
+
+
+def render_email(kind, company, has_invoice=True, **fields):
+    """Subject, plain-text and HTML body for one message; fields are plain (unescaped) strings"""
+    compiled = layout(kind, company, has_invoice)
+    values = dict.fromkeys(FIELDS, '')
+    values.update((name, str(value)) for name, value in fields.items())
+    escaped = {name: html.escape(value) for name, value in values.items()}
+    return RenderedEmail(compiled.subject.format(**values), _fill(compiled.text, values), _fill(compiled.html, escaped))
+
+
+def format_amount(amount):
+    return str(floatformat(amount, '-2g'))
+
+
+def format_date(value):
+    return date_format(value, 'jS F Y') if value else ''
+
+
+def format_days(days):
+    return f"{days} day{'' if days == 1 else 's'}"
+
+
+def invoice_paid_fields(invoice):
+    """Fields for the payment receipt; expects invoice.payment.subscription.billing_plan loaded"""
+    payment = invoice.payment
+    return {
+        'athlete_name': invoice.customer_name.split()[0],
+        'invoice_number': invoice.invoice_number,
+        'amount': format_amount(invoice.total_amount),
+        'payment_date': format_date(invoice.invoice_date),
+        'service': payment.subscription.billing_plan.name,
+        'period': payment.months_covered,
+    }
+
+
+def payment_reminder_fields(payment, today):
+    """Fields for due/overdue reminders; expects subscription athlete and billing_plan loaded"""
+    subscription = payment.subscription
+    invoice = getattr(payment, 'invoice', None)
+    return {
+        'athlete_name': subscription.athlete.name.split()[0],
+        'invoice_number': invoice.invoice_number if invoice else '',
+        'amount': format_amount(payment.amount),
+        'due_date': format_date(payment.due_date),
+        'days_overdue': format_days((today - payment.due_date).days),
+        'service': subscription.billing_plan.name,
+        'period': payment.months_covered,
+    }
+
+
+def invoice_cancelled_fields(invoice, reason, cancellation_date):
+    return {
+        'athlete_name': invoice.customer_name.split()[0],
+        'invoice_number': invoice.invoice_number,
+        'amount': format_amount(invoice.total_amount),
+        'cancellation_date': format_date(cancellation_date),
+        'reason': reason,
+    }
+
+
+def email_message(kind, company, settings, to, has_invoice=True, connection=None, **fields):
+    """EmailMultiAlternatives with the plain-text body and the HTML alternative"""
+    rendered = render_email(kind, company, has_invoice, **fields)
+    message = EmailMultiAlternatives(
+        subject=rendered.subject,
+        body=rendered.text,
+        from_email=f"{settings.from_name} <{settings.from_email}>",
+        to=[to],
+        connection=connection,
+    )
+    message.attach_alternative(rendered.html, 'text/html')
+    return message
@@ -0,0 +1,192 @@
+"""
+Athlete engagement tracking.
+
+`track()` only appends the event to an in-memory buffer in the current
+worker process; the buffer is written with one bulk_create when it reaches
+ENGAGEMENT_BUFFER_SIZE events or its oldest event is ENGAGEMENT_FLUSH_SECONDS
+old, and once more when the process exits. A daemon thread enforces the time
+limit when no new events arrive, and writes the batches that fill up while the
+tracking request is inside a transaction. SQLite has no flusher thread (it
+allows a single writer); such batches are written when the transaction
+commits, and the time limit is checked on the next event.
+
+Raw EngagementLog rows are rolled up into EngagementDaily counts per athlete,
+day and event type, after which old raw rows can be pruned
+(`manage.py rollup_engagement`).
+"""
+import atexit
+import logging
+import threading
+import time
+from datetime import datetime, timedelta
+
+from django.conf import settings
+from django.db import connection, transaction
+from django.db.models import Count, Min
+from django.db.models.functions import TruncDate
+from django.utils import timezone
+
+from .models import Athlete, EngagementDaily, EngagementLog
+from .tenancy import current_tenant_id
+
+logger = logging.getLogger(__name__)
+
+LOGIN, WORKOUT_VIEW, WORKOUT_SUBMIT = 1, 2, 3
+
+
+class EventBuffer:
+    """Thread-safe per-process buffer of unsaved EngagementLog rows"""
+
+    def __init__(self, max_size=500, max_age=5.0):
+        self.max_size = max_size
+        self.max_age = max_age
+        self._events = []
+        self._oldest = None
+        self._lock = threading.Lock()
+        self._flusher = None
+
+    def add(self, event):
+        with self._lock:
+            if not self._events:
+                self._oldest = time.monotonic()
+            self._events.append(event)
+            due = len(self._events) >= self.max_size or time.monotonic() - self._oldest >= self.max_age
+            # Inside a transaction the write would share its fate (and its
+            # rollback); it waits for the flusher or the commit instead
+            batch = self._take() if due and not connection.in_atomic_block else None
+            if connection.vendor == 'sqlite':
+                # SQLite allows one writer: a flusher thread's connection would
+                # fail with "database is locked" against the caller's transaction
+                if due and batch is None:
+                    transaction.on_commit(self.flush)
+            else:
+                self._start_flusher()
+        if batch:
+            self._write(batch)
+
+    def flush(self):
+        """Write everything buffered so far; returns the number of events written"""
+        with self._lock:
+            batch = self._take()
+        return self._write(batch)
+
+    def __len__(self):
+        return len(self._events)
+
+    def _take(self):
+        batch, self._events, self._oldest = self._events, [], None
+        return batch
+
+    def _write(self, batch):
+        if not batch:
+            return 0
+        try:
+            # A savepoint of its own, so a failed insert cannot break a surrounding transaction
+            with transaction.atomic():
+                _set_tenants(batch)
+                EngagementLog.objects.bulk_create(batch, batch_size=1000)
+        except Exception:
+            # Engagement data is best-effort: never fail the caller over it
+            logger.exception("Dropped %d engagement events", len(batch))
+            return 0
+        return len(batch)
+
+    def _start_flusher(self):
+        if self._flusher is None or not self._flusher.is_alive():
+            self._flusher = threading.Thread(target=self._flush_stale, name='engagement-flush', daemon=True)
+            self._flusher.start()
+
+    def _flush_stale(self):
+        while True:
+            time.sleep(self.max_age)
+            with self._lock:
+                stale = self._oldest is not None and time.monotonic() - self._oldest >= self.max_age
+                batch = self._take() if stale else None
+            if batch:
+                self._write(batch)
+                # This thread has its own connection; don't hold it between flushes
+                connection.close()
+
+
+buffer = EventBuffer(
+    max_size=getattr(settings, 'ENGAGEMENT_BUFFER_SIZE', 500),
+    max_age=getattr(settings, 'ENGAGEMENT_FLUSH_SECONDS', 5.0),
+)
+atexit.register(buffer.flush)
+
+
+def _set_tenants(batch):
+    """Fill in tenants for events tracked outside a tenant scope, with one query"""
+    missing = {event.athlete_id for event in batch if event.tenant_id is None}
+    if missing:
+        tenants = dict(Athlete.unscoped.filter(pk__in=missing).values_list('pk', 'tenant_id'))
+        for event in batch:
+            if event.tenant_id is None:
+                event.tenant_id = tenants.get(event.athlete_id)
+
+
+def track(athlete_id, event_type, tenant_id=None, **metadata):
+    """Record an engagement event for an athlete (buffered)"""
+    buffer.add(EngagementLog(
+        tenant_id=tenant_id or current_tenant_id(), athlete_id=athlete_id, event_type=event_type,
+        timestamp=timezone.now(), metadata=metadata,
+    ))
+
+
+def flush():
+    return buffer.flush()
+
+
+def track_login(sender, request, user, **kwargs):
+    """user_logged_in receiver: logs logins by athletes (coaches have no Athlete profile)"""
+    athlete = Athlete.unscoped.filter(user=user).values_list('pk', 'tenant_id').first()
+    if athlete is not None:
+        track(athlete[0], LOGIN, tenant_id=athlete[1])
+
+
+def _day_start(day):
+    return timezone.make_aware(datetime.combine(day, datetime.min.time()))
+
+
+def rollup(start, end):
+    """
+    Recount EngagementDaily for the days start..end (inclusive) from the raw
+    log. Whole days are recounted, so running it again is harmless. Returns
+    the number of daily rows written.
+    """
+    counts = EngagementLog.objects.filter(
+        timestamp__gte=_day_start(start), timestamp__lt=_day_start(end + timedelta(days=1)),
+    ).annotate(day=TruncDate('timestamp')).values('tenant_id', 'athlete_id', 'day', 'event_type').annotate(
+        total=Count('id')
+    ).order_by()
+    rows = [
+        EngagementDaily(
+            tenant_id=row['tenant_id'], athlete_id=row['athlete_id'], date=row['day'],
+            event_type=row['event_type'], count=row['total'],
+        )
+        for row in counts
+    ]
+    EngagementDaily.objects.bulk_create(
+        rows,
+        batch_size=1000,
+        update_conflicts=True,
+        unique_fields=['athlete', 'date', 'event_type'],
+        update_fields=['count'],
+    )
+    return len(rows)
+
+
+def prune(before):
+    """
+    Delete raw events from days before `before` (a date), rolling those days
+    up first. Returns (daily_rows_written, events_deleted).
+    """
+    cutoff = _day_start(before)
+    old = EngagementLog.objects.filter(timestamp__lt=cutoff)
+    first = old.aggregate(first=Min('timestamp'))['first']
+    if first is None:
+        return 0, 0
+    with transaction.atomic():
+        written = rollup(timezone.localtime(first).date(), before - timedelta(days=1))
+        deleted, _ = old.delete()
+    return written, deleted
@@ -0,0 +1,265 @@
+"""
+Athlete goal progress (AthleteGoal).
+
+A goal counts the completions dated (actual_date, else the workout's date)
+between its start_date and target_date, archived ones included, and tracks
+one of:
+
+- DISTANCE: total distance;
+- LONG_RUN: the longest single session;
+- WEEKLY_TSS: total TSS divided by the weeks elapsed in the window;
+- STREAK: the longest run of consecutive days with a completion.
+
+Each goal stores a small running state: the window's distance or TSS
+`total`, and the `streak` of active days ending on the latest one,
+`streak_end`. Saving, editing or deleting a WorkoutCompletion moves that
+state by the difference between the old and the new values. This costs one
+locked read of the athlete's open goals and one UPDATE, however long the
+history is.
+
+Three changes cannot be applied as a difference: lowering or removing the
+longest session, removing an active day, and back-filling a day before the
+latest run. These re-read the athlete's history for the affected goals
+only, in two grouped queries.
+
+Status follows the progress: ACHIEVED at the target, AT_RISK when behind a
+straight line from nothing on start_date to the target on target_date (less
+AT_RISK_RATIO slack), or when a STREAK can no longer reach its target in
+the days left. ABANDONED is set by hand and freezes the goal.
+
+Moving a completion to another workout, rescheduling workouts, cascading
+deletes and bulk updates bypass the hooks, and WEEKLY_TSS and statuses
+also move as days pass. `manage.py recompute_goal_progress` therefore runs
+nightly: it rebuilds every open goal from the history, reports the goals
+whose running state had drifted and repairs them.
+"""
+import math
+from collections import defaultdict, namedtuple
+from datetime import timedelta
+from decimal import ROUND_HALF_UP, Decimal
+
+from django.db import transaction
+from django.db.models import Max, Sum
+from django.db.models.functions import Coalesce
+from django.utils import timezone
+
+from .models import AthleteGoal, ArchivedWorkout, WorkoutCompletion
+
+# Slack below the straight-line expected progress before a goal is AT_RISK
+AT_RISK_RATIO = Decimal('0.9')
+
+# Fields that decide which completions a goal counts
+WINDOW_FIELDS = ('progress_metric', 'start_date', 'target_date')
+# Running state (and what follows from it) written by the hooks and the recompute
+STATE_FIELDS = ['total', 'streak', 'streak_end', 'current_value', 'status']
+
+# One completion's contribution
+Entry = namedtuple('Entry', ['day', 'distance', 'tss'])
+# One athlete-day of history
+Day = namedtuple('Day', ['day', 'distance', 'tss', 'longest'])
+
+GoalCheck = namedtuple('GoalCheck', ['checked', 'drifted', 'updated'])
+
+
+def _decimal(value):
+    return Decimal(value).quantize(Decimal('0.01'), rounding=ROUND_HALF_UP)
+
+
+def counts(goal, entry):
+    """Whether a completion on entry.day falls in the goal's window"""
+    return entry is not None and goal.start_date <= entry.day and (
+        goal.target_date is None or entry.day <= goal.target_date
+    )
+
+
+def _entry(day, distance, tss):
+    return Entry(day, distance or Decimal(0), tss or 0)
+
+
+def refresh(goal, today=None):
+    """Set current_value (for metrics derived from `total`) and status from the running state"""
+    today = today or timezone.localdate()
+    if goal.progress_metric == 'DISTANCE':
+        goal.current_value = _decimal(goal.total)
+    elif goal.progress_metric == 'WEEKLY_TSS':
+        last = min(today, goal.target_date) if goal.target_date else today
+        weeks = max(math.ceil(((last - goal.start_date).days + 1) / 7), 1)
+        goal.current_value = _decimal(Decimal(goal.total) / weeks)
+    if goal.status == 'ABANDONED':
+        return
+    target = Decimal(goal.target_value)
+    if goal.current_value >= target:
+        goal.status = 'ACHIEVED'
+    elif goal.target_date is None or today < goal.start_date:
+        goal.status = 'ON_TRACK'
+    elif goal.progress_metric == 'STREAK':
+        live = goal.streak if goal.streak_end and goal.streak_end >= today - timedelta(days=1) else 0
+        days_left = max((goal.target_date - today).days + 1, 0)
+        goal.status = 'AT_RISK' if live + days_left < target else 'ON_TRACK'
+    else:
+        days = (goal.target_date - goal.start_date).days + 1
+        elapsed = min((today - goal.start_date).days + 1, days)
+        expected = target * elapsed / days
+        goal.status = 'AT_RISK' if goal.current_value < expected * AT_RISK_RATIO else 'ON_TRACK'
+
+
+def _apply(goal, old, new):
+    """Move the goal's running state from `old` to `new` (Entry or None); False if that needs the history"""
+    metric = goal.progress_metric
+    if metric in ('DISTANCE', 'WEEKLY_TSS'):
+        field = 'distance' if metric == 'DISTANCE' else 'tss'
+        goal.total += (getattr(new, field) if new else 0) - (getattr(old, field) if old else 0)
+        return True
+    if metric == 'LONG_RUN':
+        if old is not None and old.distance >= goal.current_value and (new is None or new.distance < old.distance):
+            return False
+        if new is not None and new.distance > goal.current_value:
+            goal.current_value = new.distance
+        return True
+    # STREAK only depends on which days are active
+    if old is not None:
+        return new is not None and new.day == old.day
+    if goal.streak_end is not None and new.day <= goal.streak_end:
+        # Already active if inside the latest run; anything earlier may join two runs
+        return new.day > goal.streak_end - timedelta(days=goal.streak)
+    goal.streak = goal.streak + 1 if goal.streak_end and new.day == goal.streak_end + timedelta(days=1) else 1
+    goal.streak_end = new.day
+    goal.current_value = max(goal.current_value, goal.streak)
+    return True
+
+
+def history(athlete_ids, start):
+    """{athlete_id: [Day] in date order} from the live and archived completions on or after `start`"""
+    days = {}
+    live = WorkoutCompletion.unscoped.filter(workout__athlete_id__in=athlete_ids).annotate(
+        day=Coalesce('actual_date', 'workout__date'),
+    ).filter(day__gte=start).values('workout__athlete_id', 'day').annotate(
+        distance=Sum('actual_distance'), tss=Sum('actual_tss'), longest=Max('actual_distance'),
+    ).order_by()
+    archived = ArchivedWorkout.unscoped.filter(athlete_id__in=athlete_ids).exclude(completion_quality='').annotate(
+        day=Coalesce('actual_date', 'date'),
+    ).filter(day__gte=start).values('athlete_id', 'day').annotate(
+        distance=Sum('actual_distance'), tss=Sum('actual_tss'), longest=Max('actual_distance'),
+    ).order_by()
+    for athlete_field, rows in (('workout__athlete_id', live), ('athlete_id', archived)):
+        for row in rows:
+            key = (row[athlete_field], row['day'])
+            distance, tss, longest = row['distance'] or Decimal(0), row['tss'] or 0, row['longest'] or Decimal(0)
+            if key in days:
+                seen = days[key]
+                distance, tss, longest = seen.distance + distance, seen.tss + tss, max(seen.longest, longest)
+            days[key] = Day(row['day'], distance, tss, longest)
+    by_athlete = defaultdict(list)
+    for (athlete_id, _), day in sorted(days.items(), key=lambda item: item[1].day):
+        by_athlete[athlete_id].append(day)
+    return by_athlete
+
+
+def _rebuild(goal, days, today):
+    metric = goal.progress_metric
+    total, longest, streak, streak_end, best = Decimal(0), Decimal(0), 0, None, 0
+    for day in days:
+        if not counts(goal, day):
+            continue
+        total += day.distance if metric == 'DISTANCE' else day.tss
+        longest = max(longest, day.longest)
+        streak = streak + 1 if streak_end and day.day == streak_end + timedelta(days=1) else 1
+        streak_end, best = day.day, max(best, streak)
+    # Only the state the metric's hooks maintain is kept
+    goal.total = total if metric in ('DISTANCE', 'WEEKLY_TSS') else Decimal(0)
+    goal.streak, goal.streak_end = (streak, streak_end) if metric == 'STREAK' else (0, None)
+    if metric == 'LONG_RUN':
+        goal.current_value = longest
+    elif metric == 'STREAK':
+        goal.current_value = best
+    refresh(goal, today)
+
+
+def rebuild(goals, today=None):
+    """Recompute the running state of (unsaved) goals from the full history"""
+    goals = list(goals)
+    if not goals:
+        return
+    today = today or timezone.localdate()
+    days = history({goal.athlete_id for goal in goals}, min(goal.start_date for goal in goals))
+    for goal in goals:
+        _rebuild(goal, days.get(goal.athlete_id, []), today)
+
+
+def apply_change(athlete_id, old, new, today=None):
+    """Move the athlete's open goals from one completion Entry to another (either may be None)"""
+    if old == new:
+        return
+    today = today or timezone.localdate()
+    with transaction.atomic():
+        goals = list(AthleteGoal.unscoped.select_for_update().filter(athlete_id=athlete_id).exclude(status='ABANDONED'))
+        changed, stale = [], []
+        for goal in goals:
+            before, after = (old if counts(goal, old) else None), (new if counts(goal, new) else None)
+            if before is None and after is None:
+                continue
+            if _apply(goal, before, after):
+                refresh(goal, today)
+            else:
+                stale.append(goal)
+            changed.append(goal)
+        rebuild(stale, today)
+        AthleteGoal.unscoped.bulk_update(changed, STATE_FIELDS)
+
+
+def completion_saved(completion, created):
+    """Move goal progress for a saved completion (called from WorkoutCompletion.save)"""
+    workout = completion.workout
+    loaded = getattr(completion, '_loaded_values', None)
+    new = _entry(completion.actual_date or workout.date, completion.actual_distance, completion.actual_tss)
+    fields = ('workout_id', 'actual_date', 'actual_distance', 'actual_tss')
+    if created:
+        apply_change(workout.athlete_id, None, new)
+    elif loaded is None or any(name not in loaded for name in fields) or loaded['workout_id'] != workout.pk:
+        # Nothing to diff against: rebuild this athlete's goals
+        with transaction.atomic():
+            goals = list(AthleteGoal.unscoped.select_for_update().filter(
+                athlete_id=workout.athlete_id,
+            ).exclude(status='ABANDONED'))
+            rebuild(goals)
+            AthleteGoal.unscoped.bulk_update(goals, STATE_FIELDS)
+    else:
+        old = _entry(loaded['actual_date'] or workout.date, loaded['actual_distance'], loaded['actual_tss'])
+        apply_change(workout.athlete_id, old, new)
+    completion._loaded_values = {name: getattr(completion, name) for name in fields}
+
+
+def completion_deleted(completion, workout):
+    """Take a deleted completion out of goal progress (called from WorkoutCompletion.delete)"""
+    loaded = getattr(completion, '_loaded_values', None) or {}
+    apply_change(workout.athlete_id, _entry(
+        loaded.get('actual_date', completion.actual_date) or workout.date,
+        loaded.get('actual_distance', completion.actual_distance),
+        loaded.get('actual_tss', completion.actual_tss),
+    ), None)
+
+
+def recompute(repair=True, today=None, batch_size=1000):
+    """Rebuild every open goal from the history; returns a GoalCheck of goals checked, drifted and updated"""
+    today = today or timezone.localdate()
+    goals = list(AthleteGoal.unscoped.exclude(status='ABANDONED'))
+    if not goals:
+        return GoalCheck(0, 0, 0)
+    days = history(
+        AthleteGoal.unscoped.exclude(status='ABANDONED').values('athlete_id'),
+        min(goal.start_date for goal in goals),
+    )
+    drifted, updated = 0, []
+    for goal in goals:
+        before = {name: getattr(goal, name) for name in STATE_FIELDS}
+        stored_value = goal.current_value
+        _rebuild(goal, days.get(goal.athlete_id, []), today)
+        if (goal.total, goal.streak, goal.streak_end) != (before['total'], before['streak'], before['streak_end']) or (
+            goal.progress_metric in ('LONG_RUN', 'STREAK') and goal.current_value != stored_value
+        ):
+            drifted += 1
+        if any(getattr(goal, name) != value for name, value in before.items()):
+            updated.append(goal)
+    if repair:
+        AthleteGoal.unscoped.bulk_update(updated, STATE_FIELDS, batch_size=batch_size)
+    return GoalCheck(len(goals), drifted, len(updated))
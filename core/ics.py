@@ -0,0 +1,156 @@
+"""
+iCalendar (RFC 5545) feed of an athlete's workouts.
+
+Feed URLs carry a signed tenant and athlete id, so they can be handed to
+calendar apps without a login. A feed covers a fixed window around today and is read with
+one range query on (athlete, date). The serialized feed is cached under a
+version derived from the window's row count and latest Workout.updated_at,
+so any edit, reschedule or delete produces a new version; that version is
+also the ETag, letting polling clients get 304s without the feed being
+rebuilt or even read from the cache.
+"""
+import hashlib
+from datetime import timedelta, timezone as dt_timezone
+
+from django.core import signing
+from django.core.cache import cache
+from django.db.models import Count, Max
+from django.urls import reverse
+from django.utils import timezone
+
+from .models import Athlete, Workout
+from .tenancy import cache_key
+
+SIGNING_SALT = 'core.ics.workout-feed'
+
+# Past and future days included in a feed
+PAST_DAYS = 30
+FUTURE_DAYS = 180
+
+CACHE_TIMEOUT = 24 * 60 * 60
+
+STATUS_MARKERS = {
+    'COMPLETED': '✓ ',
+    'SKIPPED': '✗ ',
+}
+
+
+def feed_token(tenant_id, athlete_id):
+    return signing.Signer(salt=SIGNING_SALT).sign(f'{tenant_id}-{athlete_id}')
+
+
+def athlete_for_token(token):
+    """(tenant id, athlete id) from a feed token, or None if the signature does not match"""
+    try:
+        tenant_id, athlete_id = signing.Signer(salt=SIGNING_SALT).unsign(token).split('-')
+        return int(tenant_id), int(athlete_id)
+    except (signing.BadSignature, ValueError):
+        return None
+
+
+def feed_url(tenant_id, athlete_id):
+    return reverse('workout-feed', args=[feed_token(tenant_id, athlete_id)])
+
+
+def window(today=None):
+    today = today or timezone.localdate()
+    return today - timedelta(days=PAST_DAYS), today + timedelta(days=FUTURE_DAYS)
+
+
+def feed_version(athlete_id, start, end):
+    """(etag, last_modified) for the athlete's workouts in the window"""
+    stats = Workout.objects.filter(athlete_id=athlete_id, date__range=(start, end)).aggregate(
+        count=Count('pk'), last_modified=Max('updated_at'),
+    )
+    last_modified = stats['last_modified']
+    raw = f"{athlete_id}:{start}:{stats['count']}:{last_modified.timestamp() if last_modified else 0}"
+    return hashlib.sha1(raw.encode()).hexdigest(), last_modified
+
+
+def _escape(text):
+    return (
+        str(text).replace('\\', '\\\\').replace(';', '\\;').replace(',', '\\,')
+        .replace('\r\n', '\\n').replace('\n', '\\n')
+    )
+
+
+def _fold(line):
+    """Split a content line into 75-octet chunks joined by CRLF + space"""
+    encoded = line.encode('utf-8')
+    if len(encoded) <= 75:
+        return line
+    chunks, current = [], b''
+    for char in line:
+        octets = char.encode('utf-8')
+        if len(current) + len(octets) > (75 if not chunks else 74):
+            chunks.append(current.decode('utf-8'))
+            current = b''
+        current += octets
+    chunks.append(current.decode('utf-8'))
+    return '\r\n '.join(chunks)
+
+
+def _description(workout):
+    lines = [workout.get_workout_type_display()]
+    if workout.target_distance:
+        lines.append(f"Distance: {workout.target_distance.normalize():f} km")
+    if workout.target_duration:
+        lines.append(f"Duration: {workout.target_duration} min")
+    if workout.target_tss:
+        lines.append(f"TSS: {workout.target_tss}")
+    lines.append(f"Status: {workout.get_status_display()}")
+    if workout.description:
+        lines += ['', workout.description]
+    return '\n'.join(lines)
+
+
+def _event(workout, stamp):
+    return [
+        'BEGIN:VEVENT',
+        f'UID:workout-{workout.pk}@tailwind',
+        f'DTSTAMP:{stamp}',
+        f'LAST-MODIFIED:{workout.updated_at.astimezone(dt_timezone.utc):%Y%m%dT%H%M%SZ}',
+        f'DTSTART;VALUE=DATE:{workout.date:%Y%m%d}',
+        f'DTEND;VALUE=DATE:{workout.date + timedelta(days=1):%Y%m%d}',
+        f'SUMMARY:{_escape(STATUS_MARKERS.get(workout.status, "") + workout.title)}',
+        f'DESCRIPTION:{_escape(_description(workout))}',
+        f'STATUS:{"CANCELLED" if workout.status == "SKIPPED" else "CONFIRMED"}',
+        'TRANSP:TRANSPARENT',
+        'END:VEVENT',
+    ]
+
+
+def render_feed(athlete, start, end):
+    """Serialized VCALENDAR for the athlete's workouts dated start..end"""
+    workouts = Workout.objects.filter(athlete=athlete, date__range=(start, end)).only(
+        'date', 'workout_type', 'title', 'description', 'target_distance', 'target_duration',
+        'target_tss', 'status', 'updated_at',
+    ).order_by('date', 'pk')
+    stamp = f'{timezone.now().astimezone(dt_timezone.utc):%Y%m%dT%H%M%SZ}'
+    lines = [
+        'BEGIN:VCALENDAR',
+        'VERSION:2.0',
+        'PRODID:-//TAILWIND//Workout Plan//EN',
+        'CALSCALE:GREGORIAN',
+        'METHOD:PUBLISH',
+        f'X-WR-CALNAME:{_escape(f"TAILWIND - {athlete.name}")}',
+        'REFRESH-INTERVAL;VALUE=DURATION:PT1H',
+        'X-PUBLISHED-TTL:PT1H',
+    ]
+    for workout in workouts:
+        lines += _event(workout, stamp)
+    lines.append('END:VCALENDAR')
+    return ('\r\n'.join(_fold(line) for line in lines) + '\r\n').encode('utf-8')
+
+
+def cached_feed(athlete_id, start, end, etag):
+    """Feed bytes for a version, rendering and caching it on a miss; None if the athlete is gone"""
+    key = cache_key('ics', athlete_id, etag)
+    feed = cache.get(key)
+    if feed is None:
+        athlete = Athlete.objects.filter(pk=athlete_id).only('name').first()
+        if athlete is None:
+            return None
+        feed = render_feed(athlete, start, end)
+        cache.set(key, feed, CACHE_TIMEOUT)
+    return feed
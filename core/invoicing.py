@@ -0,0 +1,385 @@
+"""
+Invoice generation.
+
+Marking payments as PAID issues their invoices in bulk: invoice numbers are
+reserved as a block from InvoiceSequence, the default template and the
+customer/plan data are each read once, and all Invoice rows (plus their
+InvoiceLine rows) are inserted with bulk_create inside the same transaction
+as the status change.
+
+PDF rendering and email delivery happen afterwards, outside the request:
+invoices with no pdf_generated_at / emailed_at form the work queues drained
+by `process_invoice_queue()` (`manage.py process_invoice_queue`).
+"""
+from collections import defaultdict
+from contextlib import ExitStack
+from decimal import Decimal, ROUND_HALF_UP
+
+from django.core.exceptions import ValidationError
+from django.core.files.base import ContentFile
+from django.core.mail import get_connection
+from django.db import transaction
+from django.db.models import F
+from django.utils import timezone
+
+from . import audit
+from .emails import email_message, invoice_paid_fields
+from .models import EmailSettings, Invoice, InvoiceLine, InvoiceSequence, InvoiceTemplate, Payment
+from .summary import refresh_athletes
+from .tenancy import current_tenant_id
+
+CENT = Decimal('0.01')
+
+ONES = [
+    '', 'One', 'Two', 'Three', 'Four', 'Five', 'Six', 'Seven', 'Eight', 'Nine', 'Ten',
+    'Eleven', 'Twelve', 'Thirteen', 'Fourteen', 'Fifteen', 'Sixteen', 'Seventeen', 'Eighteen', 'Nineteen',
+]
+TENS = ['', '', 'Twenty', 'Thirty', 'Forty', 'Fifty', 'Sixty', 'Seventy', 'Eighty', 'Ninety']
+
+
+def _money(value):
+    return Decimal(value).quantize(CENT, rounding=ROUND_HALF_UP)
+
+
+def _below_thousand(number):
+    words = []
+    if number >= 100:
+        words += [ONES[number // 100], 'Hundred']
+        number %= 100
+    if number >= 20:
+        words.append(TENS[number // 10])
+        number %= 10
+    if number:
+        words.append(ONES[number])
+    return words
+
+
+def _number_words(number):
+    """Words for a whole number using the Indian system (thousand, lakh, crore)"""
+    if number == 0:
+        return ['Zero']
+    words = []
+    crores, number = divmod(number, 10 ** 7)
+    if crores:
+        words += _number_words(crores) + ['Crore']
+    lakhs, number = divmod(number, 10 ** 5)
+    if lakhs:
+        words += _below_thousand(lakhs) + ['Lakh']
+    thousands, number = divmod(number, 1000)
+    if thousands:
+        words += _below_thousand(thousands) + ['Thousand']
+    return words + _below_thousand(number)
+
+
+def amount_in_words(amount):
+    """e.g. Decimal('5000') -> 'Five Thousand Rupees Only'"""
+    amount = _money(amount)
+    rupees = int(amount)
+    paise = int((amount - rupees) * 100)
+    text = ' '.join(_number_words(rupees)) + ' Rupees'
+    if paise:
+        text += ' and ' + ' '.join(_number_words(paise)) + ' Paise'
+    return text + ' Only'
+
+
+def calculate_invoice_amounts(subtotal, discount_percent, discount_flat, template):
+    """Discounts and GST for an invoice; GST is only charged with a valid GSTIN"""
+    subtotal = _money(subtotal)
+    discount_amount = _money(subtotal * Decimal(discount_percent) / 100 + Decimal(discount_flat))
+    taxable_amount = max(subtotal - discount_amount, Decimal('0.00'))
+    amounts = {
+        'subtotal': subtotal,
+        'discount_percent': Decimal(discount_percent),
+        'discount_amount': discount_amount,
+        'taxable_amount': taxable_amount,
+        'cgst_rate': Decimal('0'), 'cgst_amount': Decimal('0'),
+        'sgst_rate': Decimal('0'), 'sgst_amount': Decimal('0'),
+        'igst_rate': Decimal('0'), 'igst_amount': Decimal('0'),
+    }
+    if template.include_gst and template.company_gstin and len(template.company_gstin) == 15:
+        # Intra-state supply: split GST equally into CGST and SGST
+        half_rate = Decimal(template.gst_rate) / 2
+        amounts['cgst_rate'] = amounts['sgst_rate'] = half_rate
+        amounts['cgst_amount'] = amounts['sgst_amount'] = _money(taxable_amount * half_rate / 100)
+    amounts['total_amount'] = taxable_amount + amounts['cgst_amount'] + amounts['sgst_amount'] + amounts['igst_amount']
+    return amounts
+
+
+def allocate_invoice_numbers(tenant_id, invoice_date, count):
+    """Reserve `count` consecutive INV-YYYY-MM-XXXX numbers in the tenant's series for the month of invoice_date"""
+    year, month = invoice_date.year, invoice_date.month
+    prefix = f"INV-{year}-{month:02d}-"
+    sequences = InvoiceSequence.unscoped.filter(tenant_id=tenant_id, year=year, month=month)
+    with transaction.atomic():
+        sequence = sequences.select_for_update().first()
+        if sequence is None:
+            # Continue after any invoices numbered before the sequence existed
+            existing = Invoice.unscoped.filter(
+                tenant_id=tenant_id, invoice_number__startswith=prefix
+            ).values_list('invoice_number', flat=True)
+            start = max((int(number[len(prefix):]) for number in existing if number[len(prefix):].isdigit()), default=0)
+            InvoiceSequence.unscoped.get_or_create(
+                tenant_id=tenant_id, year=year, month=month, defaults={'last_number': start}
+            )
+            sequence = sequences.select_for_update().get()
+        first = sequence.last_number + 1
+        InvoiceSequence.unscoped.filter(pk=sequence.pk).update(last_number=F('last_number') + count)
+    return [f"{prefix}{number:04d}" for number in range(first, first + count)]
+
+
+def default_templates(tenant_ids, required=True):
+    """{tenant_id: default InvoiceTemplate} for the given tenants; ValidationError if one has none and `required`"""
+    tenant_ids = set(tenant_ids)
+    templates = {
+        template.tenant_id: template
+        for template in InvoiceTemplate.unscoped.filter(tenant_id__in=tenant_ids, is_default=True)
+    }
+    if required and len(templates) < len(tenant_ids):
+        raise ValidationError("No default invoice template is configured.")
+    return templates
+
+
+def default_template(tenant_id=None):
+    tenant_id = tenant_id or current_tenant_id()
+    return default_templates([tenant_id])[tenant_id]
+
+
+def build_invoice(payment, template, invoice_number):
+    """
+    Unsaved Invoice for a paid payment. Expects payment.subscription.athlete and
+    payment.subscription.billing_plan to be loaded.
+    """
+    subscription = payment.subscription
+    athlete = subscription.athlete
+    plan = subscription.billing_plan
+    invoice_date = payment.payment_date or timezone.now().date()
+
+    if payment.amount == subscription.final_price:
+        rate, discount_percent, discount_flat = plan.base_price, subscription.custom_discount_percent, subscription.custom_discount_amount
+    else:
+        # Amount agreed outside the plan price: bill it as-is
+        rate, discount_percent, discount_flat = payment.amount, 0, 0
+    amounts = calculate_invoice_amounts(rate, discount_percent, discount_flat, template)
+
+    return Invoice(
+        tenant_id=payment.tenant_id,
+        payment=payment,
+        template=template,
+        invoice_number=invoice_number,
+        invoice_date=invoice_date,
+        due_date=payment.due_date,
+        company_name=template.company_name,
+        company_address=template.company_address,
+        company_gstin=template.company_gstin,
+        company_pan=template.company_pan,
+        company_email=template.company_email,
+        company_phone=template.company_phone,
+        customer_name=athlete.name,
+        customer_email=athlete.email,
+        customer_phone=athlete.contact_number,
+        customer_address=athlete.address,
+        line_items=[{
+            'description': f"{plan.get_plan_type_display()} {plan.get_service_level_display()} - {payment.months_covered}",
+            'hsn_sac': plan.hsn_sac,
+            'quantity': 1,
+            'rate': str(_money(rate)),
+            'amount': str(_money(rate)),
+        }],
+        amount_in_words=amount_in_words(amounts['total_amount']),
+        payment_terms=template.terms_and_conditions,
+        status='PAID',
+        **amounts,
+    )
+
+
+def invoice_lines(invoice, billing_plan_id=None):
+    """
+    Unsaved InvoiceLine rows for an invoice's line_items. The invoice-level
+    taxable amount and GST are split across lines in proportion to their
+    amounts, with the rounding remainder on the last line.
+    """
+    items = invoice.line_items or []
+    amounts = [_money(str(item.get('amount', 0))) for item in items]
+    gross = sum(amounts)
+    tax_total = invoice.cgst_amount + invoice.sgst_amount + invoice.igst_amount
+    taxable_left, tax_left = _money(invoice.taxable_amount), _money(tax_total)
+    lines = []
+    for position, (item, amount) in enumerate(zip(items, amounts), 1):
+        if position == len(items):
+            taxable, tax = taxable_left, tax_left
+        else:
+            share = amount / gross if gross else Decimal('0')
+            taxable, tax = _money(invoice.taxable_amount * share), _money(tax_total * share)
+            taxable_left -= taxable
+            tax_left -= tax
+        lines.append(InvoiceLine(
+            tenant_id=invoice.tenant_id,
+            invoice=invoice,
+            position=position,
+            invoice_date=invoice.invoice_date,
+            billing_plan_id=billing_plan_id,
+            description=str(item.get('description', ''))[:500],
+            hsn_sac=item.get('hsn_sac', ''),
+            quantity=Decimal(str(item.get('quantity', 1))),
+            rate=_money(str(item.get('rate', 0))),
+            amount=amount,
+            taxable_amount=taxable,
+            tax_amount=tax,
+        ))
+    return lines
+
+
+def sync_invoice_lines(invoices):
+    """Rewrite the InvoiceLine rows of saved invoices from their line_items JSON"""
+    invoices = [invoice for invoice in invoices if invoice.pk is not None]
+    if not invoices:
+        return
+    plans = dict(
+        Payment.objects.filter(pk__in=[invoice.payment_id for invoice in invoices])
+        .values_list('pk', 'subscription__billing_plan_id')
+    )
+    with transaction.atomic():
+        InvoiceLine.objects.filter(invoice__in=invoices).delete()
+        InvoiceLine.objects.bulk_create(
+            [line for invoice in invoices for line in invoice_lines(invoice, plans.get(invoice.payment_id))],
+            batch_size=1000,
+        )
+
+
+def issue_invoices(payments, templates=None):
+    """
+    Create invoices for paid payments in bulk, each on its tenant's default
+    template (or `templates`, {tenant_id: template}); returns the created invoices.
+    """
+    payments = list(payments)
+    if not payments:
+        return []
+    templates = templates or default_templates(payment.tenant_id for payment in payments)
+
+    by_month = defaultdict(list)
+    for payment in payments:
+        invoice_date = payment.payment_date or timezone.now().date()
+        by_month[(payment.tenant_id, invoice_date.year, invoice_date.month)].append((invoice_date, payment))
+
+    invoices = []
+    with transaction.atomic(), audit.batch():
+        for (tenant_id, _, _), entries in by_month.items():
+            numbers = allocate_invoice_numbers(tenant_id, entries[0][0], len(entries))
+            invoices += [
+                build_invoice(payment, templates[tenant_id], number)
+                for number, (_, payment) in zip(numbers, entries)
+            ]
+        Invoice.objects.bulk_create(invoices, batch_size=500)
+        InvoiceLine.objects.bulk_create(
+            [
+                line for invoice in invoices
+                for line in invoice_lines(invoice, invoice.payment.subscription.billing_plan_id)
+            ],
+            batch_size=1000,
+        )
+        audit.record_created(invoices)
+    return invoices
+
+
+def mark_payments_paid(queryset, payment_date=None):
+    """
+    Mark payments as PAID and issue invoices for any that don't have one, in a
+    single transaction. Payments of tenants without a default template are
+    marked paid but left uninvoiced. Returns (payments_updated,
+    invoices_created, payments_uninvoiced).
+    """
+    payment_date = payment_date or timezone.now().date()
+    with transaction.atomic(), audit.batch():
+        # Pin the selection first: the queryset may filter on the status being changed
+        selected = queryset.model.objects.filter(pk__in=list(queryset.values_list('pk', flat=True)))
+        templates = default_templates(selected.values_list('tenant_id', flat=True).distinct(), required=False)
+        updated = audit.audited_update(
+            selected.exclude(status='PAID'), status='PAID', payment_date=payment_date
+        )
+        uninvoiced = selected.filter(status='PAID', invoice__isnull=True)
+        payments = uninvoiced.filter(
+            tenant_id__in=list(templates)
+        ).select_related('subscription__athlete', 'subscription__billing_plan')
+        invoices = issue_invoices(payments, templates)
+        # Whatever is still uninvoiced had no template to issue from
+        skipped = uninvoiced.count()
+        refresh_athletes(selected.values_list('subscription__athlete_id', flat=True))
+    return updated, invoices, skipped
+
+
+def active_email_settings():
+    """{tenant_id: active EmailSettings} for the current tenant, or every tenant in jobs"""
+    return {settings.tenant_id: settings for settings in EmailSettings.objects.filter(is_active=True)}
+
+
+def email_connection(settings):
+    """Mail connection configured from the active EmailSettings"""
+    return get_connection(
+        host=settings.smtp_host,
+        port=settings.smtp_port,
+        username=settings.smtp_username,
+        password=settings.smtp_password,
+        use_tls=settings.smtp_use_tls,
+    )
+
+
+def store_pdf(invoice):
+    """Render an invoice's PDF and save it to pdf_file"""
+    from .pdf import render_invoice_pdf
+
+    invoice.pdf_file.save(
+        f"invoice_{invoice.invoice_number}.pdf", ContentFile(render_invoice_pdf(invoice)), save=False
+    )
+    invoice.pdf_generated_at = timezone.now()
+    invoice.save(update_fields=['pdf_file', 'pdf_generated_at', 'updated_at'])
+
+
+def generate_pdfs(limit=100):
+    """Render PDFs for invoices that don't have one yet; returns how many were made"""
+    done = 0
+    pending = Invoice.objects.filter(pdf_generated_at__isnull=True).order_by('created_at')
+    for invoice in pending.select_related('template')[:limit]:
+        store_pdf(invoice)
+        done += 1
+    return done
+
+
+def send_invoice_emails(limit=100):
+    """Email paid invoices that have a PDF but were not sent yet; returns how many were sent"""
+    settings_by_tenant = active_email_settings()
+    if not settings_by_tenant:
+        return 0
+
+    sent = 0
+    pending = Invoice.objects.filter(
+        status='PAID', emailed_at__isnull=True, pdf_generated_at__isnull=False, tenant_id__in=settings_by_tenant,
+    ).select_related('payment__subscription__billing_plan', 'template').order_by('created_at')
+    connections = {}
+    with ExitStack() as stack:
+        for invoice in pending[:limit]:
+            settings = settings_by_tenant[invoice.tenant_id]
+            if invoice.tenant_id not in connections:
+                # One connection per tenant's mail server, opened on first use
+                connections[invoice.tenant_id] = stack.enter_context(email_connection(settings))
+            connection = connections[invoice.tenant_id]
+            with transaction.atomic():
+                # Claim the row so overlapping runs don't send it twice
+                claimed = audit.audited_update(
+                    Invoice.objects.filter(pk=invoice.pk, emailed_at__isnull=True), emailed_at=timezone.now()
+                )
+                if not claimed:
+                    continue
+                message = email_message(
+                    'INVOICE_PAID', invoice.template, settings, invoice.customer_email,
+                    connection=connection, **invoice_paid_fields(invoice),
+                )
+                with invoice.pdf_file.open('rb') as pdf:
+                    message.attach(f"invoice_{invoice.invoice_number}.pdf", pdf.read(), 'application/pdf')
+                message.send()
+                sent += 1
+    return sent
+
+
+def process_invoice_queue(limit=100):
+    """Drain the PDF and email queues; returns (pdfs_generated, emails_sent)"""
+    return generate_pdfs(limit), send_invoice_emails(limit)
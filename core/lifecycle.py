@@ -0,0 +1,216 @@
+"""
+Daily subscription lifecycle.
+
+`run(today)` moves every subscription through its states, in this order:
+
+1. pauses: a subscription set to PAUSED gets paused_from = today;
+2. resumes: PAUSED subscriptions whose resume_on has come, and ones a coach
+   set back to ACTIVE by hand, become ACTIVE. The paid days that the pause
+   left unused are credited, so billing restarts on the resume date shifted
+   by that credit. For a subscription never renewed, the paid days are those
+   of the sign-up period the pause began in;
+3. expiries: ACTIVE or PAUSED subscriptions past their end_date are
+   CANCELLED;
+4. renewals: every ACTIVE subscription gets a PENDING Payment for each
+   MONTHLY or QUARTERLY period that starts within
+   SUBSCRIPTION_RENEWAL_LEAD_DAYS, due on the period's first day. A period
+   cut short by end_date is prorated by days. Periods run on from
+   renewed_through. A subscription that was never renewed is billed from its
+   first period starting today or later: a period already under way is
+   assumed to have been charged at sign-up.
+
+Each step is one audited UPDATE (or one CASE-based UPDATE per changed field)
+plus, for renewals, one INSERT per batch. Prices come from the stored
+final_price rather than a per-row billing_plan fetch. Payments are unique
+per (subscription, period_start) and renewed_through only moves forward,
+so re-running a day changes nothing. A payment without a period (entered
+by hand) counts as billing the period its due date falls in.
+"""
+import calendar
+from collections import defaultdict, namedtuple
+from datetime import date, timedelta
+from decimal import ROUND_HALF_UP, Decimal
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import F, Q
+from django.utils import timezone
+
+from . import audit
+from .models import AthleteSubscription, Payment
+from .summary import refresh_athletes
+
+PERIOD_MONTHS = {'MONTHLY': 1, 'QUARTERLY': 3}
+
+LifecycleResult = namedtuple('LifecycleResult', ['paused', 'resumed', 'expired', 'renewed', 'payments'])
+
+
+def add_months(day, months):
+    """`day` moved by whole months, clamped to the end of shorter months"""
+    month = day.month - 1 + months
+    year, month = day.year + month // 12, month % 12 + 1
+    return date(year, month, min(day.day, calendar.monthrange(year, month)[1]))
+
+
+def period_label(start, end):
+    """months_covered text: 'February 2026', 'Jan-Mar 2026' or 'Dec 2025-Feb 2026'"""
+    if (start.year, start.month) == (end.year, end.month):
+        return f"{start:%B %Y}"
+    if start.year == end.year:
+        return f"{start:%b}-{end:%b %Y}"
+    return f"{start:%b %Y}-{end:%b %Y}"
+
+
+def signup_period_end(start_date, months, day):
+    """Last day of the period, counted from start_date, that contains `day` (the one charged at sign-up)"""
+    start = start_date
+    while add_months(start, months) <= day:
+        start = add_months(start, months)
+    return add_months(start, months) - timedelta(days=1)
+
+
+def billing_periods(subscription, today, horizon):
+    """
+    (period_start, period_end, amount, notes) for each period of a subscription
+    values row due by `horizon`, plus the new renewed_through
+    """
+    months = PERIOD_MONTHS[subscription['billing_plan__billing_period']]
+    end_date = subscription['end_date']
+    cursor = subscription['renewed_through']
+    start = cursor + timedelta(days=1) if cursor else subscription['start_date']
+    if cursor is None:
+        # Never renewed: the period under way was charged at sign-up
+        while start < today:
+            start = add_months(start, months)
+    periods = []
+    while start <= horizon and (end_date is None or start <= end_date):
+        period_end = add_months(start, months) - timedelta(days=1)
+        amount, notes = subscription['final_price'], ''
+        if end_date is not None and end_date < period_end:
+            days, full_days = (end_date - start).days + 1, (period_end - start).days + 1
+            amount = (amount * days / full_days).quantize(Decimal('0.01'), rounding=ROUND_HALF_UP)
+            notes = f"Prorated: {days} of {full_days} days"
+            period_end = end_date
+        periods.append((start, period_end, amount, notes))
+        start = period_end + timedelta(days=1)
+    return periods, start - timedelta(days=1)
+
+
+def _batches(queryset, batch_size):
+    last = 0
+    while True:
+        rows = list(queryset.filter(pk__gt=last).order_by('pk')[:batch_size])
+        if not rows:
+            return
+        yield rows
+        last = rows[-1]['pk']
+
+
+def record_pauses(today):
+    pausing = AthleteSubscription.objects.filter(status='PAUSED', paused_from__isnull=True)
+    athlete_ids = set(pausing.values_list('athlete_id', flat=True))
+    return audit.audited_update(pausing, paused_from=today), athlete_ids
+
+
+def resume_subscriptions(today):
+    """Reactivate due and hand-resumed pauses, crediting paid days the pause left unused"""
+    resuming = list(AthleteSubscription.objects.filter(
+        Q(status='PAUSED', resume_on__lte=today) | Q(status='ACTIVE', paused_from__isnull=False)
+    ).values(
+        'pk', 'athlete_id', 'paused_from', 'resume_on', 'renewed_through', 'start_date', 'end_date',
+        'billing_plan__billing_period',
+    ))
+    values = {}
+    for row in resuming:
+        resumed_on = min(row['resume_on'] or today, today)
+        paused_from = row['paused_from'] or resumed_on
+        paid_until = row['renewed_through']
+        if paid_until is None and paused_from >= row['start_date']:
+            # Never renewed: the period under way when the pause began was charged at sign-up
+            paid_until = signup_period_end(
+                row['start_date'], PERIOD_MONTHS[row['billing_plan__billing_period']], paused_from,
+            )
+            if row['end_date'] is not None:
+                paid_until = min(paid_until, row['end_date'])
+        credit = max((paid_until - paused_from).days + 1, 0) if paid_until else 0
+        restart = resumed_on - timedelta(days=1) + timedelta(days=credit)
+        paid_until = max(paid_until, restart) if paid_until else restart
+        values[row['pk']] = {
+            'status': 'ACTIVE', 'paused_from': None, 'resume_on': None, 'renewed_through': paid_until,
+        }
+    audit.audited_update_rows(AthleteSubscription, values)
+    return len(values), {row['athlete_id'] for row in resuming}
+
+
+def expire_subscriptions(today):
+    expiring = AthleteSubscription.objects.filter(status__in=['ACTIVE', 'PAUSED'], end_date__lt=today)
+    athlete_ids = set(expiring.values_list('athlete_id', flat=True))
+    return audit.audited_update(expiring, status='CANCELLED'), athlete_ids
+
+
+def renew_subscriptions(today, lead_days=None, batch_size=1000):
+    """Insert the PENDING payments for periods starting by today + lead_days; returns (subscriptions billed, payments)"""
+    if lead_days is None:
+        lead_days = getattr(settings, 'SUBSCRIPTION_RENEWAL_LEAD_DAYS', 7)
+    horizon = today + timedelta(days=lead_days)
+    due = AthleteSubscription.objects.filter(
+        Q(renewed_through__isnull=True) | Q(renewed_through__lt=horizon),
+        Q(end_date__isnull=True) | Q(renewed_through__isnull=True) | Q(renewed_through__lt=F('end_date')),
+        status='ACTIVE', paused_from__isnull=True, start_date__lte=horizon,
+    ).values(
+        'pk', 'tenant_id', 'athlete_id', 'start_date', 'end_date', 'renewed_through', 'final_price',
+        'billing_plan__billing_period',
+    )
+    renewed = created = 0
+    for rows in _batches(due, batch_size):
+        payments, cursors = [], {}
+        for row in rows:
+            periods, renewed_through = billing_periods(row, today, horizon)
+            if renewed_through != row['renewed_through']:
+                cursors[row['pk']] = {'renewed_through': renewed_through}
+            payments += [
+                Payment(
+                    tenant_id=row['tenant_id'], subscription_id=row['pk'], amount=amount, due_date=start,
+                    status='PENDING', months_covered=period_label(start, end), period_start=start,
+                    period_end=end, notes=notes,
+                )
+                for start, end, amount, notes in periods if amount > 0
+            ]
+        with transaction.atomic(), audit.batch():
+            first = min((payment.period_start for payment in payments), default=today)
+            billed, legacy = set(), defaultdict(list)
+            for subscription_id, period_start, due_date in Payment.objects.filter(
+                Q(period_start__gte=first) | Q(period_start__isnull=True, due_date__gte=first),
+                subscription_id__in=cursors,
+            ).values_list('subscription_id', 'period_start', 'due_date'):
+                if period_start is None:
+                    # Entered by hand (or before renewals existed): bills the period it falls due in
+                    legacy[subscription_id].append(due_date)
+                else:
+                    billed.add((subscription_id, period_start))
+            payments = [
+                payment for payment in payments
+                if (payment.subscription_id, payment.period_start) not in billed and not any(
+                    payment.period_start <= due_date <= payment.period_end
+                    for due_date in legacy[payment.subscription_id]
+                )
+            ]
+            Payment.objects.bulk_create(payments)
+            audit.record_created(payments)
+            audit.audited_update_rows(AthleteSubscription, cursors)
+            refresh_athletes({row['athlete_id'] for row in rows if row['pk'] in cursors})
+        renewed += len({payment.subscription_id for payment in payments})
+        created += len(payments)
+    return renewed, created
+
+
+def run(today=None, lead_days=None, batch_size=1000):
+    """One daily pass over every subscription; returns a LifecycleResult of counts"""
+    today = today or timezone.localdate()
+    with transaction.atomic(), audit.batch():
+        paused, paused_athletes = record_pauses(today)
+        resumed, resumed_athletes = resume_subscriptions(today)
+        expired, expired_athletes = expire_subscriptions(today)
+        refresh_athletes(paused_athletes | resumed_athletes | expired_athletes)
+    renewed, payments = renew_subscriptions(today, lead_days, batch_size)
+    return LifecycleResult(paused, resumed, expired, renewed, payments)
@@ -0,0 +1,485 @@
+"""
+Local load testing: how much coach and athlete traffic one deployment serves.
+
+`manage.py loadtest` measures the app end to end without any external
+service:
+
+1. it prepares a scratch database (a temporary SQLite file unless
+   --database-url points elsewhere): migrations, collectstatic and a coach
+   with N athletes, each with a subscription, monthly payments (the past
+   ones paid and invoiced), four months of workouts with completions, and
+   a goal;
+2. it serves the app through each entry point in a process of its own: the
+   WSGI application on a threaded wsgiref server, and the ASGI application
+   on the small asyncio HTTP/1.1 server below. On SQLite both handle one
+   request at a time (see serve_wsgi);
+3. concurrent virtual users replay a weighted mix of SCENARIOS. Each user is
+   a thread with its own signed-in session, opening a connection per
+   request;
+4. it reports throughput and p50/p95/p99 latency per scenario, and checks
+   them against the SLOs. The SLOs cover p95/p99 latency, the error rate,
+   and the most SQL queries any one request ran. Queries are counted
+   server-side by QueryCountMiddleware and returned in an X-Query-Count
+   header.
+
+The servers run the project settings with DEBUG off, except for the HTTPS
+redirect and secure cookies: TLS is the proxy's job. DEFAULT_SLOS can be
+overridden per scenario with settings.LOADTEST_SLOS. Absolute numbers
+depend on the machine and the database, so compare runs on the same
+hardware. SQLite serializes writers, so run against PostgreSQL
+(--database-url) before trusting the tail latency under concurrency.
+"""
+import asyncio
+import contextlib
+import http.client
+import random
+import secrets
+import statistics
+import threading
+import time
+from collections import deque, namedtuple
+from datetime import timedelta
+from decimal import Decimal
+from http import HTTPStatus
+from http.cookies import SimpleCookie
+from socketserver import ThreadingMixIn
+from urllib.parse import unquote, urlencode
+from wsgiref.simple_server import WSGIRequestHandler, WSGIServer, make_server
+
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.db import connection
+from django.utils import timezone
+
+ENTRY_POINTS = {
+    'wsgi': 'athlete_management.wsgi.application',
+    'asgi': 'athlete_management.asgi.application',
+}
+
+# Scenario -> share of the traffic
+WEIGHTS = {
+    'admin_changelist': 35,
+    'calendar': 30,
+    'submit_completion': 15,
+    'mark_paid': 10,
+    'invoice_pdf': 10,
+}
+
+DEFAULT_SLOS = {
+    'admin_changelist': {'p95_ms': 600, 'p99_ms': 1000, 'queries': 12},
+    'calendar': {'p95_ms': 400, 'p99_ms': 800, 'queries': 3},
+    'submit_completion': {'p95_ms': 500, 'p99_ms': 1000, 'queries': 35},
+    'mark_paid': {'p95_ms': 500, 'p99_ms': 1000, 'queries': 35},
+    'invoice_pdf': {'p95_ms': 500, 'p99_ms': 1000, 'queries': 12},
+}
+MAX_ERROR_RATE = 0.0
+
+CHANGELISTS = [
+    '/admin/core/athlete/',
+    '/admin/core/athlete/?q=Athlete+1',
+    '/admin/core/payment/?status__exact=PENDING',
+    '/admin/core/workout/?status__exact=UPCOMING',
+    '/admin/core/workoutcompletion/',
+    '/admin/core/invoice/',
+]
+
+WORKOUT_TYPES = ['EASY', 'TEMPO', 'EASY', 'INTERVALS', 'EASY', 'LONG_RUN', 'REST']
+
+Response = namedtuple('Response', ['status', 'headers', 'body', 'seconds', 'queries'])
+Result = namedtuple('Result', ['scenario', 'seconds', 'ok', 'queries'])
+Stats = namedtuple('Stats', [
+    'scenario', 'requests', 'errors', 'throughput', 'p50_ms', 'p95_ms', 'p99_ms', 'max_queries',
+])
+
+
+# Server side
+
+class QueryCountMiddleware:
+    """Return the number of SQL queries a request ran in an X-Query-Count header"""
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        count = 0
+
+        def counter(execute, sql, params, many, context):
+            nonlocal count
+            count += 1
+            return execute(sql, params, many, context)
+
+        with connection.execute_wrapper(counter):
+            response = self.get_response(request)
+        response['X-Query-Count'] = str(count)
+        return response
+
+
+def use_workdir(workdir):
+    """Keep uploads (invoice PDFs) and collected static files inside the load test's directory"""
+    settings.MEDIA_ROOT = str(workdir / 'media')
+    settings.STATIC_ROOT = str(workdir / 'static')
+
+
+def configure_server():
+    """Settings for a plain-HTTP local server with query counting"""
+    settings.SECURE_SSL_REDIRECT = False
+    settings.SESSION_COOKIE_SECURE = False
+    settings.CSRF_COOKIE_SECURE = False
+    settings.MIDDLEWARE = ['core.loadtest.QueryCountMiddleware', *settings.MIDDLEWARE]
+
+
+class _ThreadingWSGIServer(ThreadingMixIn, WSGIServer):
+    daemon_threads = True
+    request_queue_size = 256
+
+
+class _QuietHandler(WSGIRequestHandler):
+    def log_message(self, format, *args):
+        pass
+
+
+def serve_wsgi(application, host, port):
+    """
+    Serve a WSGI application, a thread per request. On SQLite requests are
+    handled one at a time: Django 4.2 cannot open SQLite transactions as
+    IMMEDIATE, so concurrent ones that read and then write fail with
+    "database is locked" instead of waiting for each other
+    """
+    server_class = WSGIServer if connection.vendor == 'sqlite' else _ThreadingWSGIServer
+    make_server(host, port, application, server_class, _QuietHandler).serve_forever()
+
+
+async def _asgi_connection(application, lock, reader, writer):
+    try:
+        request_line = await reader.readline()
+        if not request_line:
+            return
+        method, target, version = request_line.decode('latin-1').rstrip('\r\n').split(' ', 2)
+        headers = []
+        while True:
+            line = await reader.readline()
+            if line in (b'\r\n', b'\n', b''):
+                break
+            name, _, value = line.decode('latin-1').partition(':')
+            headers.append((name.strip().lower().encode('latin-1'), value.strip().encode('latin-1')))
+        length = int(dict(headers).get(b'content-length', b'0'))
+        body = await reader.readexactly(length) if length else b''
+        path, _, query = target.partition('?')
+        scope = {
+            'type': 'http', 'asgi': {'version': '3.0'}, 'http_version': version.partition('/')[2],
+            'method': method, 'scheme': 'http', 'path': unquote(path), 'raw_path': path.encode('latin-1'),
+            'query_string': query.encode('latin-1'), 'root_path': '', 'headers': headers,
+            'client': writer.get_extra_info('peername')[:2], 'server': writer.get_extra_info('sockname')[:2],
+        }
+        messages = deque([{'type': 'http.request', 'body': body, 'more_body': False}])
+        start, chunks = {}, []
+
+        async def receive():
+            return messages.popleft() if messages else {'type': 'http.disconnect'}
+
+        async def send(message):
+            if message['type'] == 'http.response.start':
+                start.update(message)
+            elif message['type'] == 'http.response.body':
+                chunks.append(message.get('body', b''))
+
+        async with lock:
+            await application(scope, receive, send)
+        content = b''.join(chunks)
+        status = start['status']
+        lines = [f"HTTP/1.1 {status} {HTTPStatus(status).phrase}".encode('latin-1')]
+        lines += [name + b': ' + value for name, value in start.get('headers', []) if name.lower() != b'content-length']
+        lines += [f"Content-Length: {len(content)}".encode('latin-1'), b'Connection: close']
+        writer.write(b'\r\n'.join(lines) + b'\r\n\r\n' + content)
+        await writer.drain()
+    finally:
+        writer.close()
+
+
+def serve_asgi(application, host, port):
+    """Serve an ASGI application over HTTP/1.1, one request per connection (and one at a time on SQLite)"""
+    async def main():
+        lock = asyncio.Lock() if connection.vendor == 'sqlite' else contextlib.nullcontext()
+        server = await asyncio.start_server(
+            lambda reader, writer: _asgi_connection(application, lock, reader, writer), host, port, backlog=256,
+        )
+        async with server:
+            await server.serve_forever()
+    asyncio.run(main())
+
+
+# Data
+
+def seed(athletes=50, today=None, seed=1):
+    """Fill an empty database with a coach and their athletes; returns the fixture the scenarios draw on"""
+    from . import ics, search, summary
+    from .invoicing import mark_payments_paid
+    from .lifecycle import add_months
+    from .models import (
+        Athlete, AthleteGoal, AthleteSubscription, BillingPlan, Invoice, InvoiceTemplate, Payment, Tenant, Workout,
+        WorkoutCompletion,
+    )
+    from .tenancy import use_tenant
+
+    today = today or timezone.localdate()
+    rng = random.Random(seed)
+    tenant = Tenant.objects.order_by('pk').first()
+    password = secrets.token_urlsafe(16)
+    coach = User.objects.create_superuser('loadtest', 'loadtest@example.com', password)
+    tenant.users.add(coach)
+    start = today - timedelta(days=90)
+
+    with use_tenant(tenant):
+        InvoiceTemplate.objects.create(
+            company_address="Mumbai, Maharashtra", company_pan="ABCDE1234F", company_email="coach@example.com",
+            company_phone="9876543210", is_default=True,
+        )
+        plan = BillingPlan.objects.create(
+            name="Running Focus - Monthly", plan_type='RUNNING', service_level='FOCUS', billing_period='MONTHLY',
+            base_price=Decimal('5000'), description="Load test plan",
+        )
+        users = User.objects.bulk_create([
+            User(username=f'athlete{i}', email=f'athlete{i}@example.com') for i in range(athletes)
+        ])
+        roster = Athlete.objects.bulk_create([
+            Athlete(
+                tenant=tenant, user=user, name=f"Athlete {i}", email=user.email, contact_number='9876543210',
+                address="Mumbai",
+            )
+            for i, user in enumerate(users)
+        ])
+        subscriptions = AthleteSubscription.objects.bulk_create([
+            AthleteSubscription(
+                tenant=tenant, athlete=athlete, billing_plan=plan, start_date=start, final_price=plan.base_price,
+            )
+            for athlete in roster
+        ])
+        payments = []
+        for subscription in subscriptions:
+            for month in range(9):
+                period_start = add_months(start, month)
+                payments.append(Payment(
+                    tenant=tenant, subscription=subscription, amount=subscription.final_price, due_date=period_start,
+                    months_covered=f"{period_start:%B %Y}", period_start=period_start,
+                    period_end=add_months(period_start, 1) - timedelta(days=1),
+                ))
+        Payment.objects.bulk_create(payments)
+
+        workouts = Workout.objects.bulk_create([
+            Workout(
+                tenant=tenant, athlete=athlete, date=start + timedelta(days=day),
+                workout_type=WORKOUT_TYPES[day % len(WORKOUT_TYPES)], title=f"Day {day}",
+                description="Load test workout", target_distance=Decimal(rng.randint(5, 20)),
+                status='UPCOMING' if start + timedelta(days=day) >= today else rng.choice(
+                    ['COMPLETED'] * 4 + ['SKIPPED']
+                ),
+            )
+            for athlete in roster for day in range(121)
+        ])
+        WorkoutCompletion.objects.bulk_create([
+            WorkoutCompletion(
+                tenant=tenant, workout=workout, completion_quality='GOOD', actual_date=workout.date,
+                actual_distance=workout.target_distance, actual_duration=int(workout.target_distance * 6),
+                actual_tss=int(workout.target_distance * 8), athlete_comments="Felt good",
+            )
+            for workout in workouts if workout.status == 'COMPLETED'
+        ])
+        for athlete in roster:
+            AthleteGoal.objects.create(
+                athlete=athlete, goal_type='FITNESS', description="Run 600 km", progress_metric='DISTANCE',
+                start_date=start, target_date=today + timedelta(days=30), target_value=Decimal('600'),
+            )
+        mark_payments_paid(Payment.objects.filter(due_date__lt=today))
+        summary.rebuild()
+        search.rebuild_index()
+
+        return {
+            'username': coach.username,
+            'password': password,
+            'feeds': [ics.feed_url(tenant.pk, athlete.pk) for athlete in roster],
+            'pending_payments': list(Payment.objects.filter(status='PENDING').values_list('pk', flat=True)),
+            'open_workouts': [
+                workout.pk for workout in workouts if workout.status == 'UPCOMING' and workout.workout_type != 'REST'
+            ],
+            'invoices': list(Invoice.objects.values_list('pk', flat=True)),
+        }
+
+
+# Client side
+
+class Session:
+    """One virtual user: plain-HTTP requests with its own cookie jar"""
+
+    def __init__(self, host, port):
+        self.host, self.port = host, port
+        self.cookies = {}
+        self.etags = {}
+
+    def request(self, method, path, data=None, headers=None, anonymous=False):
+        headers = dict(headers or {})
+        if self.cookies and not anonymous:
+            headers['Cookie'] = '; '.join(f'{name}={value}' for name, value in self.cookies.items())
+        body = None
+        if data is not None:
+            body = urlencode(data)
+            headers['Content-Type'] = 'application/x-www-form-urlencoded'
+        conn = http.client.HTTPConnection(self.host, self.port, timeout=60)
+        try:
+            started = time.perf_counter()
+            conn.request(method, path, body, headers)
+            response = conn.getresponse()
+            content = response.read()
+            seconds = time.perf_counter() - started
+        finally:
+            conn.close()
+        for header in response.headers.get_all('Set-Cookie') or []:
+            for name, morsel in SimpleCookie(header).items():
+                self.cookies[name] = morsel.value
+        return Response(response.status, response.headers, content, seconds, int(response.headers.get('X-Query-Count', 0)))
+
+    @property
+    def csrf_token(self):
+        return self.cookies.get('csrftoken', '')
+
+    def login(self, username, password):
+        self.request('GET', '/admin/login/')
+        response = self.request('POST', '/admin/login/', {
+            'username': username, 'password': password, 'csrfmiddlewaretoken': self.csrf_token, 'next': '/admin/',
+        })
+        return response.status == 302
+
+
+def admin_changelist(session, fixture, rng):
+    return session.request('GET', rng.choice(CHANGELISTS)), {200}
+
+
+def calendar(session, fixture, rng):
+    url = rng.choice(fixture['feeds'])
+    # Calendar clients revalidate what they already have
+    headers = {'If-None-Match': session.etags[url]} if url in session.etags else {}
+    response = session.request('GET', url, headers=headers, anonymous=True)
+    if response.headers.get('ETag'):
+        session.etags[url] = response.headers['ETag']
+    return response, {200, 304}
+
+
+def submit_completion(session, fixture, rng):
+    try:
+        workout_id = fixture['open_workouts'].popleft()
+    except IndexError:
+        return None, None
+    distance = rng.randint(5, 20)
+    return session.request('POST', '/admin/core/workoutcompletion/add/', {
+        'csrfmiddlewaretoken': session.csrf_token, 'workout': workout_id, 'athlete_link': '',
+        'actual_date': '', 'completion_quality': 'GOOD', 'actual_distance': distance,
+        'actual_duration': distance * 6, 'actual_tss': distance * 8, 'athlete_comments': "Felt good",
+        'coach_feedback': '', 'reviewed_at_0': '', 'reviewed_at_1': '', '_save': 'Save',
+    }), {302}
+
+
+def mark_paid(session, fixture, rng):
+    try:
+        payment_id = fixture['pending_payments'].popleft()
+    except IndexError:
+        return None, None
+    return session.request('POST', '/admin/core/payment/', {
+        'csrfmiddlewaretoken': session.csrf_token, 'action': 'mark_as_paid', '_selected_action': payment_id,
+        'index': 0,
+    }), {302}
+
+
+def invoice_pdf(session, fixture, rng):
+    return session.request('GET', f"/admin/core/invoice/{rng.choice(fixture['invoices'])}/pdf/"), {200}
+
+
+SCENARIOS = {
+    'admin_changelist': admin_changelist,
+    'calendar': calendar,
+    'submit_completion': submit_completion,
+    'mark_paid': mark_paid,
+    'invoice_pdf': invoice_pdf,
+}
+
+
+def run(host, port, fixture, users=4, duration=15, warmup=2, seed=1):
+    """
+    Replay the scenario mix from `users` concurrent sessions for `duration`
+    seconds after `warmup`; returns ([Result], measured seconds)
+    """
+    fixture = dict(fixture, pending_payments=deque(fixture['pending_payments']),
+                   open_workouts=deque(fixture['open_workouts']))
+    names, weights = list(WEIGHTS), list(WEIGHTS.values())
+    results, failures = [], []
+    window = {}
+
+    def start():
+        window['start'] = time.monotonic() + warmup
+        window['end'] = window['start'] + duration
+
+    ready = threading.Barrier(users, action=start)
+
+    def user(number):
+        rng = random.Random(seed * 1000 + number)
+        session = Session(host, port)
+        try:
+            if not session.login(fixture['username'], fixture['password']):
+                failures.append("login failed")
+        finally:
+            ready.wait()
+        if failures:
+            return
+        while time.monotonic() < window['end']:
+            name = rng.choices(names, weights)[0]
+            response, expected = SCENARIOS[name](session, fixture, rng)
+            if response is None:
+                continue
+            if time.monotonic() >= window['start']:
+                results.append(Result(name, response.seconds, response.status in expected, response.queries))
+
+    threads = [threading.Thread(target=user, args=(number,), daemon=True) for number in range(users)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    if failures:
+        raise RuntimeError(f"{len(failures)} virtual user(s) could not sign in")
+    return results, duration
+
+
+def summarize(results, seconds):
+    """[Stats] per scenario, in WEIGHTS order"""
+    stats = []
+    for name in WEIGHTS:
+        rows = [result for result in results if result.scenario == name]
+        if not rows:
+            continue
+        latencies = sorted(result.seconds * 1000 for result in rows)
+        cuts = statistics.quantiles(latencies, n=100, method='inclusive') if len(latencies) > 1 else latencies * 99
+        stats.append(Stats(
+            name, len(rows), sum(not result.ok for result in rows), len(rows) / seconds,
+            cuts[49], cuts[94], cuts[98], max(result.queries for result in rows),
+        ))
+    return stats
+
+
+def slos():
+    """DEFAULT_SLOS with settings.LOADTEST_SLOS applied per scenario"""
+    overrides = getattr(settings, 'LOADTEST_SLOS', {})
+    return {name: {**DEFAULT_SLOS.get(name, {}), **overrides.get(name, {})} for name in WEIGHTS}
+
+
+def violations(stats, limits=None):
+    """Human-readable SLO breaches for a list of Stats"""
+    limits = limits or slos()
+    found = []
+    for row in stats:
+        limit = limits.get(row.scenario, {})
+        error_rate = row.errors / row.requests
+        if error_rate > limit.get('error_rate', MAX_ERROR_RATE):
+            found.append(f"{row.scenario}: {row.errors} of {row.requests} request(s) failed")
+        for key in ('p95_ms', 'p99_ms'):
+            if key in limit and getattr(row, key) > limit[key]:
+                found.append(f"{row.scenario}: {key[:3]} {getattr(row, key):.0f}ms > {limit[key]}ms")
+        if 'queries' in limit and row.max_queries > limit['queries']:
+            found.append(f"{row.scenario}: {row.max_queries} queries in one request > {limit['queries']}")
+    return found
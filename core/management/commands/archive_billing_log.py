@@ -0,0 +1,80 @@
+import gzip
+import json
+from datetime import date, datetime, time
+from pathlib import Path
+
+from django.core.management.base import BaseCommand, CommandError
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import transaction
+from django.utils import timezone
+
+from core.audit import CREATED, DELETED, SNAPSHOT, UPDATED
+from core.models import BillingChange
+
+
+class Command(BaseCommand):
+    help = (
+        "Move billing change-log entries older than a cutoff into monthly gzip NDJSON files, "
+        "leaving one snapshot per record so point-in-time rebuilds keep working"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('before', type=date.fromisoformat, help="Archive entries before this date (YYYY-MM-DD)")
+        parser.add_argument('--output-dir', default='billing_archive', help="Directory for the archive files")
+
+    def handle(self, *args, **options):
+        cutoff = timezone.make_aware(datetime.combine(options['before'], time.min))
+        if cutoff > timezone.now():
+            raise CommandError("Cutoff must be in the past")
+        output_dir = Path(options['output_dir'])
+        output_dir.mkdir(parents=True, exist_ok=True)
+
+        old_entries = BillingChange.objects.filter(changed_at__lt=cutoff)
+        files = {}
+        states = {}
+        archived = 0
+        try:
+            for entry in old_entries.order_by('record_type', 'record_id', 'changed_at', 'id').iterator(chunk_size=5000):
+                month = entry.changed_at.strftime('%Y-%m')
+                if month not in files:
+                    files[month] = gzip.open(output_dir / f'billing-changes-{month}.ndjson.gz', 'at', encoding='utf-8')
+                files[month].write(json.dumps({
+                    'record_type': entry.record_type,
+                    'record_id': entry.record_id,
+                    'action': entry.action,
+                    'changes': entry.changes,
+                    'changed_at': entry.changed_at,
+                }, cls=DjangoJSONEncoder) + '\n')
+                archived += 1
+
+                # Fold the entries into each record's state as of the cutoff
+                key = (entry.record_type, entry.record_id)
+                if entry.action in (CREATED, SNAPSHOT):
+                    states[key] = (dict(entry.changes), entry.changed_at, entry.tenant_id)
+                elif entry.action == DELETED:
+                    states[key] = (None, entry.changed_at, entry.tenant_id)
+                elif entry.action == UPDATED and states.get(key, (None,))[0] is not None:
+                    state = states[key][0]
+                    for name, (_, new) in entry.changes.items():
+                        state[name] = new
+                    states[key] = (state, entry.changed_at, entry.tenant_id)
+        finally:
+            for handle in files.values():
+                handle.close()
+
+        snapshots = [
+            BillingChange(
+                tenant_id=tenant_id, record_type=record_type, record_id=record_id, action=SNAPSHOT,
+                changes=state, changed_at=changed_at,
+            )
+            for (record_type, record_id), (state, changed_at, tenant_id) in states.items()
+            if state is not None
+        ]
+        with transaction.atomic():
+            old_entries.delete()
+            BillingChange.objects.bulk_create(snapshots, batch_size=1000)
+
+        self.stdout.write(self.style.SUCCESS(
+            f"Archived {archived} entries to {output_dir} ({len(files)} month file(s)); "
+            f"kept {len(snapshots)} snapshot(s)"
+        ))
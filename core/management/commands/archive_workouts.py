@@ -0,0 +1,27 @@
+from django.core.management.base import BaseCommand
+
+from core.archive import archive, candidates
+
+
+class Command(BaseCommand):
+    help = (
+        "Move workouts older than the archive horizon, and those of long-cancelled athletes, "
+        "into the compressed archive tables (run nightly)"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--days', type=int, help="Archive workouts older than this many days (WORKOUT_ARCHIVE_DAYS)")
+        parser.add_argument(
+            '--cancelled-days', type=int,
+            help="Archive all workouts of athletes cancelled this many days ago (WORKOUT_ARCHIVE_CANCELLED_DAYS)",
+        )
+        parser.add_argument('--batch-size', type=int, default=500)
+        parser.add_argument('--dry-run', action='store_true', help="Only count the workouts that would move")
+
+    def handle(self, *args, **options):
+        workouts = candidates(horizon_days=options['days'], cancelled_days=options['cancelled_days'])
+        if options['dry_run']:
+            self.stdout.write(f"{workouts.count()} workout(s) would be archived")
+            return
+        moved = archive(workouts, options['batch_size'])
+        self.stdout.write(self.style.SUCCESS(f"Archived {moved} workout(s)"))
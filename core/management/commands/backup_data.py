@@ -0,0 +1,23 @@
+from django.core.management.base import BaseCommand
+
+from core.backup import backup
+
+
+class Command(BaseCommand):
+    help = (
+        "Stream every model to gzip NDJSON in primary-key order, with invoice PDFs stored once per "
+        "content hash; --incremental only writes rows changed since the last backup"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--output-dir', default='backups', help="Directory holding backups and the PDF blob store")
+        parser.add_argument('--incremental', action='store_true', help="Only rows changed since the latest backup")
+        parser.add_argument('--chunk-size', type=int, default=2000, help="Rows read per query")
+
+    def handle(self, *args, **options):
+        manifest = backup(options['output_dir'], options['incremental'], options['chunk_size'])
+        rows = sum(entry['rows'] for entry in manifest['models'].values())
+        self.stdout.write(self.style.SUCCESS(
+            f"Wrote {manifest['kind']} backup {manifest['name']}: {rows} row(s) from "
+            f"{len(manifest['models'])} model(s), {manifest['blobs_stored']} new PDF blob(s)"
+        ))
@@ -0,0 +1,63 @@
+import time
+from datetime import date, timedelta
+from decimal import Decimal
+
+from django.core.management.base import BaseCommand
+from django.template.loader import render_to_string
+
+from core import emails
+from core.models import InvoiceTemplate
+
+
+class Command(BaseCommand):
+    help = "Compare per-message cost of full template rendering with the compiled email layouts"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--count', type=int, default=10000, help="Messages to render")
+        parser.add_argument('--kind', default='PAYMENT_DUE', choices=sorted(emails.KINDS))
+
+    def handle(self, *args, **options):
+        count, kind = options['count'], options['kind']
+        company = InvoiceTemplate.objects.filter(is_default=True).first() or InvoiceTemplate(
+            company_address="Mumbai, Maharashtra", company_pan="ABCDE1234F",
+            company_email="coach@example.com", company_phone="9876543210",
+            bank_upi_id="coach@ybl", bank_account_number="1234567890", bank_ifsc="HDFC0001234",
+            bank_account_holder="Coach", bank_name="HDFC Bank",
+        )
+        due_date = date.today() + timedelta(days=3)
+        messages = [
+            {
+                'athlete_name': f"Athlete{i}",
+                'invoice_number': f"INV-2026-01-{i:04d}",
+                'amount': emails.format_amount(Decimal('5000') + i % 100),
+                'payment_date': emails.format_date(due_date),
+                'due_date': emails.format_date(due_date),
+                'days_overdue': emails.format_days(i % 30),
+                'service': "Marathon Training <Premium>",
+                'period': "January 2026",
+                'cancellation_date': emails.format_date(due_date),
+                'reason': "Duplicate",
+            }
+            for i in range(count)
+        ]
+        name = emails.KINDS[kind][0]
+
+        started = time.perf_counter()
+        for fields in messages:
+            context = {'company': company, 'has_invoice': True, **fields}
+            render_to_string(f'{name}.txt', context)
+            emails.inline_css(render_to_string(f'{name}.html', context))
+        full = time.perf_counter() - started
+
+        emails.clear_cache()
+        started = time.perf_counter()
+        for fields in messages:
+            emails.render_email(kind, company, **fields)
+        compiled = time.perf_counter() - started
+
+        for label, seconds in [("Full render", full), ("Compiled layout", compiled)]:
+            self.stdout.write(
+                f"{label:16} {seconds:8.3f}s total  {seconds / count * 1e6:8.1f}us/message  "
+                f"{count / seconds:10.0f} messages/s"
+            )
+        self.stdout.write(self.style.SUCCESS(f"Speedup: {full / compiled:.1f}x over {count} {kind} messages"))
@@ -0,0 +1,44 @@
+from django.conf import settings
+from django.core.exceptions import ValidationError
+from django.core.management.base import BaseCommand, CommandError
+
+from core.sitebuild import build
+
+
+class Command(BaseCommand):
+    help = (
+        "Build the docs/ marketing site for deployment: responsive AVIF/WebP images, minified and "
+        "fingerprinted CSS/JS, inlined critical CSS; only changed assets are rebuilt"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--source', default=str(settings.BASE_DIR / 'docs'), help="Site sources")
+        parser.add_argument('--output', default=str(settings.BASE_DIR / 'docs' / 'dist'), help="Build directory")
+        parser.add_argument('--force', action='store_true', help="Rebuild every asset, ignoring the build manifest")
+
+    def handle(self, *args, **options):
+        try:
+            reports = build(options['source'], options['output'], options['force'])
+        except ValidationError as exc:
+            raise CommandError(exc.messages[0])
+        width = max([len(report.name) for report in reports] + [5])
+        self.stdout.write(f"{'Asset':<{width}}  {'Original':>10}  {'Output':>10}  {'Saved':>6}  Status")
+        original = output = 0
+        for report in reports:
+            if report.status == 'removed':
+                self.stdout.write(f"{report.name:<{width}}  {'':>10}  {'':>10}  {'':>6}  removed (stale)")
+                continue
+            original += report.original_bytes
+            output += report.output_bytes
+            saved = 1 - report.output_bytes / report.original_bytes if report.original_bytes else 0
+            note = f" ({report.note})" if report.note else ''
+            self.stdout.write(
+                f"{report.name:<{width}}  {report.original_bytes:>10,}  {report.output_bytes:>10,}  "
+                f"{saved:>6.0%}  {report.status}{note}"
+            )
+        built = sum(report.status == 'built' for report in reports)
+        total = sum(report.status != 'removed' for report in reports)
+        self.stdout.write(self.style.SUCCESS(
+            f"Built {built} of {total} asset(s) into {options['output']}; "
+            f"{original - output:,} of {original:,} bytes saved"
+        ))
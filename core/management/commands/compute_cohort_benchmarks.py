@@ -0,0 +1,23 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from core.cohorts import update_benchmarks
+
+
+class Command(BaseCommand):
+    help = (
+        "Recompute the per-cohort percentile tables (weekly volume, TSS, pace, adherence) and every "
+        "athlete's placement in their cohort (run nightly)"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--weeks', type=int, help="Length of the window in weeks (COHORT_WINDOW_WEEKS)")
+
+    def handle(self, *args, **options):
+        started = time.monotonic()
+        tables, athletes = update_benchmarks(weeks=options['weeks'])
+        elapsed = time.monotonic() - started
+        self.stdout.write(self.style.SUCCESS(
+            f"Stored {tables} cohort table(s) and {athletes} athlete placement(s) in {elapsed:.2f}s"
+        ))
@@ -0,0 +1,38 @@
+from datetime import date
+
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from core import reports
+
+GROUPINGS = {
+    'hsn': (reports.revenue_by_hsn, 'hsn_sac', "HSN/SAC"),
+    'plan': (reports.revenue_by_plan, 'billing_plan__name', "Plan"),
+    'month': (reports.revenue_by_month, 'month', "Month"),
+}
+
+
+class Command(BaseCommand):
+    help = "Revenue and GST totals from invoice lines, grouped by HSN/SAC, plan or month"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--by', choices=sorted(GROUPINGS), default='hsn')
+        parser.add_argument('--start', type=date.fromisoformat, help="First invoice date (default: 1 April of this FY)")
+        parser.add_argument('--end', type=date.fromisoformat, help="Last invoice date (default: today)")
+
+    def handle(self, *args, **options):
+        today = timezone.localdate()
+        end = options['end'] or today
+        start = options['start'] or date(today.year if today.month >= 4 else today.year - 1, 4, 1)
+        report, key, label = GROUPINGS[options['by']]
+
+        self.stdout.write(f"{label:<30} {'Invoices':>8} {'Qty':>8} {'Gross':>14} {'Taxable':>14} {'Tax':>12}")
+        for row in report(start, end):
+            name = row[key]
+            if options['by'] == 'month':
+                name = f"{name:%b %Y}"
+            self.stdout.write(
+                f"{str(name or '-'):<30} {row['invoices']:>8} {row['quantity']:>8} "
+                f"{row['gross']:>14.2f} {row['taxable']:>14.2f} {row['tax']:>12.2f}"
+            )
+        self.stdout.write(self.style.SUCCESS(f"Invoices dated {start} to {end}"))
@@ -0,0 +1,181 @@
+import json
+import os
+import shutil
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+from django.conf import settings
+from django.core.management import call_command
+from django.core.management.base import BaseCommand, CommandError
+from django.utils.module_loading import import_string
+
+from core import loadtest
+from core.models import Athlete
+
+
+def _free_port(host):
+    with socket.socket() as sock:
+        sock.bind((host, 0))
+        return sock.getsockname()[1]
+
+
+def _wait_for_port(process, host, port, timeout=60):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if process.poll() is not None:
+            return False
+        try:
+            socket.create_connection((host, port), timeout=0.5).close()
+            return True
+        except OSError:
+            time.sleep(0.1)
+    return False
+
+
+class Command(BaseCommand):
+    help = (
+        "Load-test the app locally: seed a scratch database, serve it through the WSGI and ASGI entry "
+        "points and replay concurrent admin, payment, calendar, completion and invoice traffic; fails "
+        "when a latency, error or query-count SLO is missed"
+    )
+    requires_system_checks = []
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--entry', choices=sorted(loadtest.ENTRY_POINTS), action='append',
+            help="Entry point to test (repeatable; default both)",
+        )
+        parser.add_argument('--users', type=int, default=4, help="Concurrent virtual users")
+        parser.add_argument('--duration', type=float, default=15, help="Measured seconds per entry point")
+        parser.add_argument('--warmup', type=float, default=2, help="Unmeasured seconds before each run")
+        parser.add_argument('--athletes', type=int, default=50, help="Athletes to seed")
+        parser.add_argument('--seed', type=int, default=1, help="Random seed for the data and the traffic mix")
+        parser.add_argument(
+            '--database-url',
+            help="Empty scratch database to seed and test against (default: a temporary SQLite file)",
+        )
+        parser.add_argument('--workdir', help="Directory for the database, static and media files (default: temporary)")
+        parser.add_argument('--report', help="Also write the results as JSON to this file")
+        # Used by the harness for its child processes
+        parser.add_argument('--prepare', action='store_true', help="Internal: migrate and seed the scratch database")
+        parser.add_argument('--serve', choices=sorted(loadtest.ENTRY_POINTS), help="Internal: serve one entry point")
+        parser.add_argument('--host', default='127.0.0.1')
+        parser.add_argument('--port', type=int, default=8000)
+
+    def handle(self, *args, **options):
+        if options['prepare']:
+            return self.prepare(options)
+        if options['serve']:
+            return self.serve(options)
+
+        workdir = Path(options['workdir'] or tempfile.mkdtemp(prefix='loadtest-'))
+        workdir.mkdir(parents=True, exist_ok=True)
+        env = {
+            **os.environ,
+            'DATABASE_URL': options['database_url'] or f"sqlite:///{workdir / 'loadtest.sqlite3'}",
+            'DEBUG': 'False',
+            'ALLOWED_HOSTS': options['host'],
+            'REPLICA_DATABASE_URL': '',
+            'EMAIL_BACKEND': 'django.core.mail.backends.locmem.EmailBackend',
+        }
+        try:
+            fixture = self.run_prepare(workdir, env, options)
+            entries = options['entry'] or sorted(loadtest.ENTRY_POINTS)
+            limits = loadtest.slos()
+            report, breaches = {}, []
+            for index, entry in enumerate(entries):
+                # Each entry point gets its own share of the payments and workouts that writes use up
+                share = dict(fixture, **{
+                    key: fixture[key][index::len(entries)] for key in ('pending_payments', 'open_workouts')
+                })
+                stats = self.run_entry(entry, workdir, env, share, options)
+                found = loadtest.violations(stats, limits)
+                self.write_stats(entry, stats, options['users'])
+                for breach in found:
+                    self.stdout.write(self.style.ERROR(f"  SLO missed: {breach}"))
+                report[entry] = [row._asdict() for row in stats]
+                breaches += [f"{entry} {breach}" for breach in found]
+        finally:
+            if not options['workdir']:
+                shutil.rmtree(workdir, ignore_errors=True)
+
+        if options['report']:
+            Path(options['report']).write_text(json.dumps({'slos': limits, 'results': report}, indent=2))
+        if breaches:
+            raise CommandError(f"{len(breaches)} SLO(s) missed")
+        self.stdout.write(self.style.SUCCESS(
+            f"All SLOs met across {', '.join(entries)} with {options['users']} concurrent user(s)"
+        ))
+
+    def run_prepare(self, workdir, env, options):
+        self.stdout.write(f"Seeding {options['athletes']} athlete(s) into the scratch database...")
+        fixture_path = workdir / 'fixture.json'
+        result = subprocess.run(
+            [sys.executable, str(Path(settings.BASE_DIR) / 'manage.py'), 'loadtest', '--prepare',
+             '--workdir', str(workdir), '--athletes', str(options['athletes']), '--seed', str(options['seed'])],
+            env=env, capture_output=True, text=True,
+        )
+        if result.returncode:
+            raise CommandError(f"Preparing the load test failed:\n{result.stderr[-2000:]}")
+        return json.loads(fixture_path.read_text())
+
+    def run_entry(self, entry, workdir, env, fixture, options):
+        host = options['host']
+        port = _free_port(host)
+        server = subprocess.Popen(
+            [sys.executable, str(Path(settings.BASE_DIR) / 'manage.py'), 'loadtest', '--serve', entry,
+             '--workdir', str(workdir), '--host', host, '--port', str(port)],
+            env=env, stdout=subprocess.DEVNULL, stderr=subprocess.PIPE, text=True,
+        )
+        try:
+            if not _wait_for_port(server, host, port):
+                server.kill()
+                raise CommandError(f"The {entry} server did not start:\n{server.communicate()[1][-2000:]}")
+            self.stdout.write(f"Running {entry} for {options['duration']:g}s...")
+            try:
+                results, seconds = loadtest.run(
+                    host, port, fixture, options['users'], options['duration'], options['warmup'], options['seed'],
+                )
+            except RuntimeError as exc:
+                raise CommandError(str(exc))
+        finally:
+            server.terminate()
+            try:
+                server.wait(timeout=10)
+            except subprocess.TimeoutExpired:
+                server.kill()
+        return loadtest.summarize(results, seconds)
+
+    def write_stats(self, entry, stats, users):
+        total = sum(row.throughput for row in stats)
+        self.stdout.write(f"\n{entry.upper()} - {users} user(s), {total:.1f} req/s")
+        self.stdout.write(
+            f"{'Scenario':<18}  {'Requests':>8}  {'Errors':>6}  {'Req/s':>7}  {'p50 ms':>7}  {'p95 ms':>7}  "
+            f"{'p99 ms':>7}  {'Queries':>7}"
+        )
+        for row in stats:
+            self.stdout.write(
+                f"{row.scenario:<18}  {row.requests:>8}  {row.errors:>6}  {row.throughput:>7.1f}  "
+                f"{row.p50_ms:>7.1f}  {row.p95_ms:>7.1f}  {row.p99_ms:>7.1f}  {row.max_queries:>7}"
+            )
+
+    def prepare(self, options):
+        workdir = Path(options['workdir'])
+        loadtest.use_workdir(workdir)
+        call_command('migrate', interactive=False, verbosity=0)
+        if Athlete.unscoped.exists():
+            raise CommandError("The load test database must be empty")
+        call_command('collectstatic', interactive=False, verbosity=0)
+        fixture = loadtest.seed(options['athletes'], seed=options['seed'])
+        (workdir / 'fixture.json').write_text(json.dumps(fixture))
+
+    def serve(self, options):
+        loadtest.use_workdir(Path(options['workdir']))
+        loadtest.configure_server()
+        application = import_string(loadtest.ENTRY_POINTS[options['serve']])
+        serve = loadtest.serve_wsgi if options['serve'] == 'wsgi' else loadtest.serve_asgi
+        serve(application, options['host'], options['port'])
@@ -0,0 +1,14 @@
+from django.core.management.base import BaseCommand
+
+from core.invoicing import process_invoice_queue
+
+
+class Command(BaseCommand):
+    help = "Generate pending invoice PDFs and email paid invoices (run every few minutes)"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--limit', type=int, default=100, help="Maximum invoices per queue per run")
+
+    def handle(self, *args, **options):
+        pdfs, emails = process_invoice_queue(options['limit'])
+        self.stdout.write(self.style.SUCCESS(f"Generated {pdfs} PDF(s), sent {emails} email(s)"))
@@ -0,0 +1,14 @@
+from django.core.management.base import BaseCommand
+
+from core.summary import rebuild
+
+
+class Command(BaseCommand):
+    help = "Recompute every athlete's roster summary (run nightly so next-workout dates stay current)"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--chunk-size', type=int, default=1000, help="Athletes per refresh query")
+
+    def handle(self, *args, **options):
+        count = rebuild(chunk_size=options['chunk_size'])
+        self.stdout.write(self.style.SUCCESS(f"Rebuilt {count} athlete summary(ies)"))
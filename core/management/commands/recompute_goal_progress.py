@@ -0,0 +1,31 @@
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from core.goals import recompute
+
+
+class Command(BaseCommand):
+    help = (
+        "Rebuild every open athlete goal's progress from the full completion history, report goals whose "
+        "incrementally kept state had drifted and repair them (run nightly)"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--check', action='store_true', help="Only verify: change nothing and fail if any goal has drifted",
+        )
+
+    def handle(self, *args, **options):
+        started = time.monotonic()
+        result = recompute(repair=not options['check'])
+        elapsed = time.monotonic() - started
+        if options['check']:
+            if result.drifted:
+                raise CommandError(f"{result.drifted} of {result.checked} goal(s) have drifted from their history")
+            self.stdout.write(self.style.SUCCESS(f"All {result.checked} goal(s) match their history ({elapsed:.2f}s)"))
+            return
+        self.stdout.write(self.style.SUCCESS(
+            f"Checked {result.checked} goal(s): repaired {result.drifted} that had drifted, "
+            f"updated {result.updated} in {elapsed:.2f}s"
+        ))
@@ -0,0 +1,27 @@
+from datetime import date
+
+from django.core.management.base import BaseCommand
+
+from core.archive import restore
+from core.models import ArchivedWorkout
+
+
+class Command(BaseCommand):
+    help = "Move an athlete's archived workouts (optionally within a date range) back into the live tables"
+
+    def add_arguments(self, parser):
+        parser.add_argument('athlete', type=int, help="Athlete id")
+        parser.add_argument('--start', type=date.fromisoformat, help="First workout date (YYYY-MM-DD)")
+        parser.add_argument('--end', type=date.fromisoformat, help="Last workout date (YYYY-MM-DD)")
+        parser.add_argument('--batch-size', type=int, default=500)
+
+    def handle(self, *args, **options):
+        archived = ArchivedWorkout.objects.filter(athlete_id=options['athlete'])
+        if options['start']:
+            archived = archived.filter(date__gte=options['start'])
+        if options['end']:
+            archived = archived.filter(date__lte=options['end'])
+        restored, skipped = restore(archived, options['batch_size'])
+        self.stdout.write(self.style.SUCCESS(
+            f"Restored {restored} workout(s); {skipped} left archived because the slot is taken by a newer workout"
+        ))
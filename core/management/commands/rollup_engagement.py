@@ -0,0 +1,22 @@
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from core.engagement import prune, rollup
+
+
+class Command(BaseCommand):
+    help = "Roll engagement events up into daily per-athlete counts and prune old raw events (run daily)"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--days', type=int, default=2, help="Recount this many most recent days")
+        parser.add_argument('--keep-days', type=int, default=90, help="Keep raw events for this many days")
+
+    def handle(self, *args, **options):
+        today = timezone.localdate()
+        written = rollup(today - timedelta(days=options['days'] - 1), today)
+        pruned_days, deleted = prune(today - timedelta(days=options['keep_days']))
+        self.stdout.write(self.style.SUCCESS(
+            f"Wrote {written + pruned_days} daily count(s); pruned {deleted} raw event(s)"
+        ))
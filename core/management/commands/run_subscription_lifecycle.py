@@ -0,0 +1,27 @@
+from datetime import date
+
+from django.core.management.base import BaseCommand
+
+from core.lifecycle import run
+
+
+class Command(BaseCommand):
+    help = (
+        "Daily subscription lifecycle: record pauses, resume due pauses, expire subscriptions past "
+        "their end date and create the renewal payments for upcoming billing periods (safe to re-run)"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--date', type=date.fromisoformat, help="Run as of this day (YYYY-MM-DD; default today)")
+        parser.add_argument(
+            '--lead-days', type=int,
+            help="Bill periods starting within this many days (SUBSCRIPTION_RENEWAL_LEAD_DAYS)",
+        )
+        parser.add_argument('--batch-size', type=int, default=1000)
+
+    def handle(self, *args, **options):
+        result = run(options['date'], options['lead_days'], options['batch_size'])
+        self.stdout.write(self.style.SUCCESS(
+            f"Paused {result.paused}, resumed {result.resumed}, expired {result.expired} subscription(s); "
+            f"renewed {result.renewed} with {result.payments} new payment(s)"
+        ))
@@ -0,0 +1,15 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from core.churn import update_churn_scores
+
+
+class Command(BaseCommand):
+    help = "Recompute churn-risk scores for all athletes (run nightly)"
+
+    def handle(self, *args, **options):
+        started = time.monotonic()
+        count = update_churn_scores()
+        elapsed = time.monotonic() - started
+        self.stdout.write(self.style.SUCCESS(f"Scored {count} athlete(s) in {elapsed:.2f}s"))
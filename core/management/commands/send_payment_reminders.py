@@ -0,0 +1,23 @@
+from django.core.management.base import BaseCommand
+
+from core.reminders import DUE_LEAD_DAYS, OVERDUE_AFTER_DAYS, send_payment_reminders
+
+
+class Command(BaseCommand):
+    help = "Email payment-due and overdue reminders; each reminder is sent at most once (run daily)"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--lead-days', type=int, default=DUE_LEAD_DAYS,
+                            help="Days before the due date to send the due reminder")
+        parser.add_argument('--overdue-after', type=int, default=OVERDUE_AFTER_DAYS,
+                            help="Days after the due date to send the overdue reminder")
+        parser.add_argument('--dry-run', action='store_true', help="Only count the reminders that would be sent")
+
+    def handle(self, *args, **options):
+        count = send_payment_reminders(
+            lead_days=options['lead_days'],
+            overdue_after=options['overdue_after'],
+            dry_run=options['dry_run'],
+        )
+        verb = "Would send" if options['dry_run'] else "Sent"
+        self.stdout.write(self.style.SUCCESS(f"{verb} {count} reminder(s)"))
@@ -0,0 +1,42 @@
+from datetime import date
+
+from django.core.exceptions import ValidationError
+from django.core.management.base import BaseCommand, CommandError
+
+from core.models import Athlete
+from core.scheduling import reschedule_workouts
+
+
+class Command(BaseCommand):
+    help = "Shift a block of an athlete's upcoming workouts by N days (e.g. after an injury break)"
+
+    def add_arguments(self, parser):
+        parser.add_argument('athlete_id', type=int)
+        parser.add_argument('start_date', type=date.fromisoformat, help="First date to move (YYYY-MM-DD)")
+        parser.add_argument('days', type=int, help="Days to shift by (negative moves earlier)")
+        parser.add_argument('--end-date', type=date.fromisoformat, help="Last date to move (default: open-ended)")
+        parser.add_argument(
+            '--skip-conflicts', action='store_true',
+            help="Leave clashing workouts in place instead of aborting",
+        )
+
+    def handle(self, *args, **options):
+        try:
+            athlete = Athlete.objects.get(pk=options['athlete_id'])
+        except Athlete.DoesNotExist:
+            raise CommandError(f"Athlete {options['athlete_id']} does not exist")
+
+        try:
+            moved, skipped = reschedule_workouts(
+                athlete,
+                options['start_date'],
+                options['days'],
+                end_date=options['end_date'],
+                on_conflict='skip' if options['skip_conflicts'] else 'error',
+            )
+        except ValidationError as e:
+            raise CommandError('; '.join(e.messages))
+
+        self.stdout.write(self.style.SUCCESS(
+            f"Moved {moved} workout(s) for {athlete.name}; {skipped} left in place due to conflicts"
+        ))
@@ -0,0 +1,36 @@
+import time
+from datetime import date, timedelta
+
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from core.models import ReviewSession
+from core.reviews import period_bounds, update_snapshots
+
+PERIODS = [period for period, _ in ReviewSession.PERIOD_CHOICES]
+
+
+class Command(BaseCommand):
+    help = (
+        "Store every athlete's review snapshot (workouts, training load, payments and the change since "
+        "the previous period) for the week and/or month containing the given day (run nightly)"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--period', choices=PERIODS, action='append', help="WEEKLY or MONTHLY (repeatable; default both)",
+        )
+        parser.add_argument(
+            '--date', type=date.fromisoformat, help="A day in the period to snapshot (YYYY-MM-DD; default yesterday)",
+        )
+
+    def handle(self, *args, **options):
+        day = options['date'] or timezone.localdate() - timedelta(days=1)
+        for period in options['period'] or PERIODS:
+            started = time.monotonic()
+            written = update_snapshots(period, day)
+            elapsed = time.monotonic() - started
+            start, end = period_bounds(period, day)
+            self.stdout.write(self.style.SUCCESS(
+                f"Stored {written} {period.lower()} snapshot(s) for {start} to {end} in {elapsed:.2f}s"
+            ))
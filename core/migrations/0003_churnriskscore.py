@@ -0,0 +1,30 @@
+# Generated by Django 4.2.28 on 2026-10-19 10:57
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0002_emailsettings_invoicetemplate_workout_and_more'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ChurnRiskScore',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('score', models.FloatField(help_text='Churn probability (0-100)')),
+                ('risk_level', models.CharField(choices=[('LOW', 'Low'), ('MEDIUM', 'Medium'), ('HIGH', 'High')], max_length=10)),
+                ('features', models.JSONField(default=dict, help_text='Feature values used for scoring')),
+                ('explanation', models.TextField(blank=True, help_text='Top factors contributing to the score')),
+                ('computed_at', models.DateTimeField()),
+                ('athlete', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, related_name='churn_risk', to='core.athlete')),
+            ],
+            options={
+                'ordering': ['-score'],
+                'indexes': [models.Index(fields=['-score'], name='churn_score_idx')],
+            },
+        ),
+    ]
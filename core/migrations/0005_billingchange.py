@@ -0,0 +1,51 @@
+# Generated by Django 4.2.28 on 2026-10-19 11:01
+
+import django.core.serializers.json
+from django.db import migrations, models
+from django.db.models.fields.files import FieldFile
+from django.utils import timezone
+
+
+def snapshot_existing_records(apps, schema_editor):
+    """Give every existing billing record a starting snapshot in the change log"""
+    BillingChange = apps.get_model('core', 'BillingChange')
+    now = timezone.now()
+    for record_type, model_name in [(1, 'Payment'), (2, 'Invoice'), (3, 'AthleteSubscription')]:
+        model = apps.get_model('core', model_name)
+        fields = [f for f in model._meta.concrete_fields if f.attname not in ('id', 'created_at', 'updated_at')]
+        entries = []
+        for obj in model.objects.iterator():
+            changes = {}
+            for field in fields:
+                value = getattr(obj, field.attname)
+                changes[field.attname] = value.name or '' if isinstance(value, FieldFile) else value
+            entries.append(BillingChange(
+                record_type=record_type, record_id=obj.pk, action=4, changes=changes, changed_at=now,
+            ))
+        BillingChange.objects.bulk_create(entries, batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0004_searchentry'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='BillingChange',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('record_type', models.PositiveSmallIntegerField(choices=[(1, 'Payment'), (2, 'Invoice'), (3, 'Athlete Subscription')])),
+                ('record_id', models.PositiveBigIntegerField()),
+                ('action', models.PositiveSmallIntegerField(choices=[(1, 'Created'), (2, 'Updated'), (3, 'Deleted'), (4, 'Snapshot')])),
+                ('changes', models.JSONField(encoder=django.core.serializers.json.DjangoJSONEncoder, help_text='Full field values for Created/Snapshot, {field: [old, new]} for Updated')),
+                ('changed_at', models.DateTimeField(db_index=True)),
+            ],
+            options={
+                'ordering': ['-changed_at', '-id'],
+                'indexes': [models.Index(fields=['record_type', 'record_id', 'changed_at'], name='billing_change_record_idx')],
+            },
+        ),
+        migrations.RunPython(snapshot_existing_records, migrations.RunPython.noop),
+    ]
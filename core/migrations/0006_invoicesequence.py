@@ -0,0 +1,34 @@
+# Generated by Django 4.2.28 on 2026-10-19 11:03
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0005_billingchange'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='InvoiceSequence',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('year', models.PositiveSmallIntegerField()),
+                ('month', models.PositiveSmallIntegerField()),
+                ('last_number', models.PositiveIntegerField(default=0)),
+            ],
+        ),
+        migrations.AddIndex(
+            model_name='invoice',
+            index=models.Index(condition=models.Q(('pdf_generated_at__isnull', True)), fields=['created_at'], name='invoice_pdf_pending_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='invoice',
+            index=models.Index(condition=models.Q(('emailed_at__isnull', True)), fields=['created_at'], name='invoice_email_pending_idx'),
+        ),
+        migrations.AlterUniqueTogether(
+            name='invoicesequence',
+            unique_together={('year', 'month')},
+        ),
+    ]
@@ -0,0 +1,40 @@
+# Generated by Django 4.2.28 on 2026-10-19 11:04
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0006_invoicesequence'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='PaymentReminder',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('kind', models.CharField(choices=[('DUE', 'Payment Due'), ('OVERDUE', 'Overdue Payment Reminder')], max_length=10)),
+                ('claim', models.UUIDField(editable=False, help_text='Scheduler run that claimed this reminder')),
+                ('claimed_at', models.DateTimeField()),
+                ('sent_at', models.DateTimeField(blank=True, null=True)),
+            ],
+            options={
+                'ordering': ['-claimed_at'],
+            },
+        ),
+        migrations.AddIndex(
+            model_name='payment',
+            index=models.Index(fields=['status', 'due_date'], name='payment_status_due_idx'),
+        ),
+        migrations.AddField(
+            model_name='paymentreminder',
+            name='payment',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='reminders', to='core.payment'),
+        ),
+        migrations.AlterUniqueTogether(
+            name='paymentreminder',
+            unique_together={('payment', 'kind')},
+        ),
+    ]
@@ -0,0 +1,43 @@
+# Generated by Django 4.2.28 on 2026-10-19 11:09
+
+import django.core.serializers.json
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0007_paymentreminder'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='EngagementLog',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('event_type', models.PositiveSmallIntegerField(choices=[(1, 'Login'), (2, 'Workout View'), (3, 'Workout Submit')])),
+                ('timestamp', models.DateTimeField(db_index=True)),
+                ('metadata', models.JSONField(blank=True, default=dict, encoder=django.core.serializers.json.DjangoJSONEncoder)),
+                ('athlete', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to='core.athlete')),
+            ],
+            options={
+                'ordering': ['-timestamp'],
+            },
+        ),
+        migrations.CreateModel(
+            name='EngagementDaily',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('date', models.DateField()),
+                ('event_type', models.PositiveSmallIntegerField(choices=[(1, 'Login'), (2, 'Workout View'), (3, 'Workout Submit')])),
+                ('count', models.PositiveIntegerField(default=0)),
+                ('athlete', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='engagement_days', to='core.athlete')),
+            ],
+            options={
+                'verbose_name_plural': 'Engagement daily counts',
+                'ordering': ['-date', 'athlete'],
+                'unique_together': {('athlete', 'date', 'event_type')},
+            },
+        ),
+    ]
@@ -0,0 +1,66 @@
+# Generated by Django 4.2.28 on 2026-10-19 11:10
+
+from django.db import migrations, models
+import django.db.models.deletion
+from django.db.models import Count, Max, Min, Sum
+from django.db.models.functions import Coalesce
+from django.utils import timezone
+
+
+def populate_summaries(apps, schema_editor):
+    Athlete = apps.get_model('core', 'Athlete')
+    AthleteSummary = apps.get_model('core', 'AthleteSummary')
+    AthleteSubscription = apps.get_model('core', 'AthleteSubscription')
+    Payment = apps.get_model('core', 'Payment')
+    Workout = apps.get_model('core', 'Workout')
+    today = timezone.localdate()
+
+    summaries = {pk: AthleteSummary(athlete_id=pk) for pk in Athlete.objects.values_list('pk', flat=True)}
+    for row in Payment.objects.filter(status='PENDING').values('subscription__athlete').annotate(
+        total=Sum('amount'), count=Count('pk')
+    ).order_by():
+        summary = summaries[row['subscription__athlete']]
+        summary.outstanding_balance, summary.pending_payments = row['total'], row['count']
+    for row in Workout.objects.filter(status='COMPLETED').values('athlete').annotate(
+        last=Max(Coalesce('completion__actual_date', 'date'))
+    ).order_by():
+        summaries[row['athlete']].last_completed_date = row['last']
+    upcoming = Workout.objects.filter(status__in=['UPCOMING', 'RESCHEDULED'], date__gte=today)
+    for row in upcoming.values('athlete').annotate(next=Min('date')).order_by():
+        summaries[row['athlete']].next_workout_date = row['next']
+    for athlete_id, title in upcoming.order_by('-date', '-pk').values_list('athlete', 'title'):
+        # Descending order, so the last title seen per athlete is the next workout's
+        summaries[athlete_id].next_workout_title = title
+    for athlete_id, pk in AthleteSubscription.objects.filter(status='ACTIVE').order_by(
+        'start_date', 'pk'
+    ).values_list('athlete', 'pk'):
+        summaries[athlete_id].active_subscription_id = pk
+    AthleteSummary.objects.bulk_create(summaries.values(), batch_size=500)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0008_engagementlog'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='AthleteSummary',
+            fields=[
+                ('athlete', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='summary', serialize=False, to='core.athlete')),
+                ('outstanding_balance', models.DecimalField(decimal_places=2, default=0, help_text='Total of PENDING payments', max_digits=12)),
+                ('pending_payments', models.PositiveIntegerField(default=0)),
+                ('last_completed_date', models.DateField(blank=True, null=True)),
+                ('next_workout_date', models.DateField(blank=True, null=True)),
+                ('next_workout_title', models.CharField(blank=True, max_length=200)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('active_subscription', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to='core.athletesubscription')),
+            ],
+            options={
+                'verbose_name_plural': 'Athlete summaries',
+                'indexes': [models.Index(fields=['outstanding_balance'], name='summary_balance_idx'), models.Index(fields=['last_completed_date'], name='summary_last_completed_idx'), models.Index(fields=['next_workout_date'], name='summary_next_workout_idx')],
+            },
+        ),
+        migrations.RunPython(populate_summaries, migrations.RunPython.noop),
+    ]
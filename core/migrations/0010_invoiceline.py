@@ -0,0 +1,79 @@
+# Generated by Django 4.2.28 on 2026-10-19 11:13
+
+from django.db import migrations, models
+import django.db.models.deletion
+from decimal import Decimal, ROUND_HALF_UP
+
+CENT = Decimal('0.01')
+
+
+def _money(value):
+    return Decimal(str(value)).quantize(CENT, rounding=ROUND_HALF_UP)
+
+
+def backfill_lines(apps, schema_editor):
+    """Stream invoices in pk order and insert their lines in batches"""
+    Invoice = apps.get_model('core', 'Invoice')
+    InvoiceLine = apps.get_model('core', 'InvoiceLine')
+    rows = Invoice.objects.order_by('pk').values_list(
+        'pk', 'invoice_date', 'line_items', 'taxable_amount', 'cgst_amount', 'sgst_amount', 'igst_amount',
+        'payment__subscription__billing_plan_id',
+    )
+    batch = []
+    for pk, invoice_date, items, taxable_amount, cgst, sgst, igst, plan_id in rows.iterator(chunk_size=500):
+        items = items or []
+        amounts = [_money(item.get('amount', 0)) for item in items]
+        gross = sum(amounts)
+        tax_total = cgst + sgst + igst
+        taxable_left, tax_left = _money(taxable_amount), _money(tax_total)
+        for position, (item, amount) in enumerate(zip(items, amounts), 1):
+            if position == len(items):
+                taxable, tax = taxable_left, tax_left
+            else:
+                share = amount / gross if gross else Decimal('0')
+                taxable, tax = _money(taxable_amount * share), _money(tax_total * share)
+                taxable_left -= taxable
+                tax_left -= tax
+            batch.append(InvoiceLine(
+                invoice_id=pk, position=position, invoice_date=invoice_date, billing_plan_id=plan_id,
+                description=str(item.get('description', ''))[:500], hsn_sac=item.get('hsn_sac', ''),
+                quantity=Decimal(str(item.get('quantity', 1))), rate=_money(item.get('rate', 0)),
+                amount=amount, taxable_amount=taxable, tax_amount=tax,
+            ))
+        if len(batch) >= 1000:
+            InvoiceLine.objects.bulk_create(batch)
+            batch = []
+    InvoiceLine.objects.bulk_create(batch)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0009_athletesummary'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='InvoiceLine',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('position', models.PositiveSmallIntegerField()),
+                ('invoice_date', models.DateField(help_text='Copied from the invoice for date-range reports')),
+                ('description', models.CharField(max_length=500)),
+                ('hsn_sac', models.CharField(blank=True, max_length=20)),
+                ('quantity', models.DecimalField(decimal_places=2, default=1, max_digits=10)),
+                ('rate', models.DecimalField(decimal_places=2, max_digits=10)),
+                ('amount', models.DecimalField(decimal_places=2, max_digits=10)),
+                ('taxable_amount', models.DecimalField(decimal_places=2, help_text="Share of the invoice's taxable amount after discounts", max_digits=10)),
+                ('tax_amount', models.DecimalField(decimal_places=2, help_text="Share of the invoice's CGST + SGST + IGST", max_digits=10)),
+                ('billing_plan', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to='core.billingplan')),
+                ('invoice', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='lines', to='core.invoice')),
+            ],
+            options={
+                'ordering': ['invoice', 'position'],
+                'indexes': [models.Index(fields=['hsn_sac', 'invoice_date'], name='invoice_line_hsn_idx'), models.Index(fields=['invoice_date'], name='invoice_line_date_idx')],
+                'unique_together': {('invoice', 'position')},
+            },
+        ),
+        migrations.RunPython(backfill_lines, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,153 @@
+# Generated by Django 4.2.28 on 2026-10-19 11:18
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+# Every model that gains a tenant column
+TENANT_MODELS = [
+    'athlete',
+    'athletesubscription',
+    'athletesummary',
+    'billingchange',
+    'billingplan',
+    'churnriskscore',
+    'emailsettings',
+    'engagementdaily',
+    'engagementlog',
+    'invoice',
+    'invoiceline',
+    'invoicesequence',
+    'invoicetemplate',
+    'payment',
+    'paymentreminder',
+    'workout',
+    'workoutcompletion',
+]
+
+
+def assign_default_tenant(apps, schema_editor):
+    """Put all existing data (and staff) in one tenant named after the coach's invoice template"""
+    Tenant = apps.get_model('core', 'Tenant')
+    InvoiceTemplate = apps.get_model('core', 'InvoiceTemplate')
+    User = apps.get_model(*settings.AUTH_USER_MODEL.split('.'))
+    template = InvoiceTemplate.objects.filter(is_default=True).first()
+    tenant = Tenant.objects.create(name=template.company_name if template else 'TAILWIND', slug='default')
+    tenant.users.set(User.objects.filter(is_staff=True, is_superuser=False))
+    for model_name in TENANT_MODELS:
+        apps.get_model('core', model_name).objects.update(tenant_id=tenant.pk)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('core', '0010_invoiceline'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Tenant',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=200)),
+                ('slug', models.SlugField(unique=True)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+            ],
+            options={
+                'ordering': ['name'],
+            },
+        ),
+        migrations.AddField(
+            model_name='tenant',
+            name='users',
+            field=models.ManyToManyField(blank=True, help_text='Coaches and staff', related_name='tenants', to=settings.AUTH_USER_MODEL),
+        ),
+        migrations.AddField(
+            model_name='athlete',
+            name='tenant',
+            field=models.ForeignKey(db_index=False, editable=False, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='+', to='core.tenant'),
+        ),
+        migrations.AddField(
+            model_name='athletesubscription',
+            name='tenant',
+            field=models.ForeignKey(db_index=False, editable=False, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='+', to='core.tenant'),
+        ),
+        migrations.AddField(
+            model_name='athletesummary',
+            name='tenant',
+            field=models.ForeignKey(db_index=False, editable=False, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='+', to='core.tenant'),
+        ),
+        migrations.AddField(
+            model_name='billingchange',
+            name='tenant',
+            field=models.ForeignKey(db_index=False, editable=False, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='+', to='core.tenant'),
+        ),
+        migrations.AddField(
+            model_name='billingplan',
+            name='tenant',
+            field=models.ForeignKey(db_index=False, editable=False, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='+', to='core.tenant'),
+        ),
+        migrations.AddField(
+            model_name='churnriskscore',
+            name='tenant',
+            field=models.ForeignKey(db_index=False, editable=False, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='+', to='core.tenant'),
+        ),
+        migrations.AddField(
+            model_name='emailsettings',
+            name='tenant',
+            field=models.ForeignKey(db_index=False, editable=False, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='+', to='core.tenant'),
+        ),
+        migrations.AddField(
+            model_name='engagementdaily',
+            name='tenant',
+            field=models.ForeignKey(db_index=False, editable=False, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='+', to='core.tenant'),
+        ),
+        migrations.AddField(
+            model_name='engagementlog',
+            name='tenant',
+            field=models.ForeignKey(db_index=False, editable=False, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='+', to='core.tenant'),
+        ),
+        migrations.AddField(
+            model_name='invoice',
+            name='tenant',
+            field=models.ForeignKey(db_index=False, editable=False, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='+', to='core.tenant'),
+        ),
+        migrations.AddField(
+            model_name='invoiceline',
+            name='tenant',
+            field=models.ForeignKey(db_index=False, editable=False, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='+', to='core.tenant'),
+        ),
+        migrations.AddField(
+            model_name='invoicesequence',
+            name='tenant',
+            field=models.ForeignKey(db_index=False, editable=False, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='+', to='core.tenant'),
+        ),
+        migrations.AddField(
+            model_name='invoicetemplate',
+            name='tenant',
+            field=models.ForeignKey(db_index=False, editable=False, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='+', to='core.tenant'),
+        ),
+        migrations.AddField(
+            model_name='payment',
+            name='tenant',
+            field=models.ForeignKey(db_index=False, editable=False, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='+', to='core.tenant'),
+        ),
+        migrations.AddField(
+            model_name='paymentreminder',
+            name='tenant',
+            field=models.ForeignKey(db_index=False, editable=False, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='+', to='core.tenant'),
+        ),
+        migrations.AddField(
+            model_name='workout',
+            name='tenant',
+            field=models.ForeignKey(db_index=False, editable=False, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='+', to='core.tenant'),
+        ),
+        migrations.AddField(
+            model_name='workoutcompletion',
+            name='tenant',
+            field=models.ForeignKey(db_index=False, editable=False, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='+', to='core.tenant'),
+        ),
+        migrations.RunPython(assign_default_tenant, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,220 @@
+# Generated by Django 4.2.28 on 2026-10-19 11:21
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0011_tenant'),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name='athletesummary',
+            name='summary_balance_idx',
+        ),
+        migrations.RemoveIndex(
+            model_name='athletesummary',
+            name='summary_last_completed_idx',
+        ),
+        migrations.RemoveIndex(
+            model_name='athletesummary',
+            name='summary_next_workout_idx',
+        ),
+        migrations.RemoveIndex(
+            model_name='churnriskscore',
+            name='churn_score_idx',
+        ),
+        migrations.RemoveIndex(
+            model_name='invoiceline',
+            name='invoice_line_hsn_idx',
+        ),
+        migrations.RemoveIndex(
+            model_name='invoiceline',
+            name='invoice_line_date_idx',
+        ),
+        migrations.AlterUniqueTogether(
+            name='billingplan',
+            unique_together=set(),
+        ),
+        migrations.AlterUniqueTogether(
+            name='invoicesequence',
+            unique_together=set(),
+        ),
+        migrations.AlterField(
+            model_name='athlete',
+            name='tenant',
+            field=models.ForeignKey(db_index=False, editable=False, on_delete=django.db.models.deletion.CASCADE, related_name='+', to='core.tenant'),
+        ),
+        migrations.AlterField(
+            model_name='athletesubscription',
+            name='tenant',
+            field=models.ForeignKey(db_index=False, editable=False, on_delete=django.db.models.deletion.CASCADE, related_name='+', to='core.tenant'),
+        ),
+        migrations.AlterField(
+            model_name='athletesummary',
+            name='tenant',
+            field=models.ForeignKey(db_index=False, editable=False, on_delete=django.db.models.deletion.CASCADE, related_name='+', to='core.tenant'),
+        ),
+        migrations.AlterField(
+            model_name='billingchange',
+            name='tenant',
+            field=models.ForeignKey(db_index=False, editable=False, on_delete=django.db.models.deletion.CASCADE, related_name='+', to='core.tenant'),
+        ),
+        migrations.AlterField(
+            model_name='billingplan',
+            name='tenant',
+            field=models.ForeignKey(db_index=False, editable=False, on_delete=django.db.models.deletion.CASCADE, related_name='+', to='core.tenant'),
+        ),
+        migrations.AlterField(
+            model_name='churnriskscore',
+            name='tenant',
+            field=models.ForeignKey(db_index=False, editable=False, on_delete=django.db.models.deletion.CASCADE, related_name='+', to='core.tenant'),
+        ),
+        migrations.AlterField(
+            model_name='emailsettings',
+            name='tenant',
+            field=models.ForeignKey(db_index=False, editable=False, on_delete=django.db.models.deletion.CASCADE, related_name='+', to='core.tenant'),
+        ),
+        migrations.AlterField(
+            model_name='engagementdaily',
+            name='tenant',
+            field=models.ForeignKey(db_index=False, editable=False, on_delete=django.db.models.deletion.CASCADE, related_name='+', to='core.tenant'),
+        ),
+        migrations.AlterField(
+            model_name='engagementlog',
+            name='tenant',
+            field=models.ForeignKey(db_index=False, editable=False, on_delete=django.db.models.deletion.CASCADE, related_name='+', to='core.tenant'),
+        ),
+        migrations.AlterField(
+            model_name='invoice',
+            name='invoice_number',
+            field=models.CharField(editable=False, max_length=50),
+        ),
+        migrations.AlterField(
+            model_name='invoice',
+            name='tenant',
+            field=models.ForeignKey(db_index=False, editable=False, on_delete=django.db.models.deletion.CASCADE, related_name='+', to='core.tenant'),
+        ),
+        migrations.AlterField(
+            model_name='invoiceline',
+            name='tenant',
+            field=models.ForeignKey(db_index=False, editable=False, on_delete=django.db.models.deletion.CASCADE, related_name='+', to='core.tenant'),
+        ),
+        migrations.AlterField(
+            model_name='invoicesequence',
+            name='tenant',
+            field=models.ForeignKey(db_index=False, editable=False, on_delete=django.db.models.deletion.CASCADE, related_name='+', to='core.tenant'),
+        ),
+        migrations.AlterField(
+            model_name='invoicetemplate',
+            name='tenant',
+            field=models.ForeignKey(db_index=False, editable=False, on_delete=django.db.models.deletion.CASCADE, related_name='+', to='core.tenant'),
+        ),
+        migrations.AlterField(
+            model_name='payment',
+            name='tenant',
+            field=models.ForeignKey(db_index=False, editable=False, on_delete=django.db.models.deletion.CASCADE, related_name='+', to='core.tenant'),
+        ),
+        migrations.AlterField(
+            model_name='paymentreminder',
+            name='tenant',
+            field=models.ForeignKey(db_index=False, editable=False, on_delete=django.db.models.deletion.CASCADE, related_name='+', to='core.tenant'),
+        ),
+        migrations.AlterField(
+            model_name='workout',
+            name='tenant',
+            field=models.ForeignKey(db_index=False, editable=False, on_delete=django.db.models.deletion.CASCADE, related_name='+', to='core.tenant'),
+        ),
+        migrations.AlterField(
+            model_name='workoutcompletion',
+            name='tenant',
+            field=models.ForeignKey(db_index=False, editable=False, on_delete=django.db.models.deletion.CASCADE, related_name='+', to='core.tenant'),
+        ),
+        migrations.AlterUniqueTogether(
+            name='billingplan',
+            unique_together={('tenant', 'plan_type', 'service_level', 'billing_period')},
+        ),
+        migrations.AlterUniqueTogether(
+            name='invoicesequence',
+            unique_together={('tenant', 'year', 'month')},
+        ),
+        migrations.AddIndex(
+            model_name='athlete',
+            index=models.Index(fields=['tenant', 'name'], name='athlete_tenant_name_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='athletesubscription',
+            index=models.Index(fields=['tenant', 'status'], name='subscription_tenant_status_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='athletesummary',
+            index=models.Index(fields=['tenant', 'outstanding_balance'], name='summary_balance_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='athletesummary',
+            index=models.Index(fields=['tenant', 'last_completed_date'], name='summary_last_completed_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='athletesummary',
+            index=models.Index(fields=['tenant', 'next_workout_date'], name='summary_next_workout_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='billingchange',
+            index=models.Index(fields=['tenant', 'changed_at'], name='billing_change_tenant_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='churnriskscore',
+            index=models.Index(fields=['tenant', '-score'], name='churn_score_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='emailsettings',
+            index=models.Index(fields=['tenant', 'is_active'], name='email_settings_tenant_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='engagementdaily',
+            index=models.Index(fields=['tenant', 'date'], name='engagement_daily_tenant_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='engagementlog',
+            index=models.Index(fields=['tenant', 'timestamp'], name='engagement_tenant_time_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='invoice',
+            index=models.Index(fields=['tenant', 'invoice_date'], name='invoice_tenant_date_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='invoiceline',
+            index=models.Index(fields=['tenant', 'hsn_sac', 'invoice_date'], name='invoice_line_hsn_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='invoiceline',
+            index=models.Index(fields=['tenant', 'invoice_date'], name='invoice_line_date_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='invoicetemplate',
+            index=models.Index(fields=['tenant', 'is_default'], name='template_tenant_default_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='payment',
+            index=models.Index(fields=['tenant', 'status', 'due_date'], name='payment_tenant_status_due_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='paymentreminder',
+            index=models.Index(fields=['tenant', 'claimed_at'], name='reminder_tenant_claimed_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='workout',
+            index=models.Index(fields=['tenant', 'date'], name='workout_tenant_date_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='workoutcompletion',
+            index=models.Index(fields=['tenant', 'created_at'], name='completion_tenant_created_idx'),
+        ),
+        migrations.AddConstraint(
+            model_name='invoice',
+            constraint=models.UniqueConstraint(fields=('tenant', 'invoice_number'), name='invoice_number_per_tenant'),
+        ),
+    ]
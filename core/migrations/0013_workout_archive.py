@@ -0,0 +1,60 @@
+# Generated by Django 4.2.28 on 2026-10-19 11:30
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0012_tenant_required'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ArchivedWorkoutDay',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('date', models.DateField()),
+                ('workouts', models.PositiveIntegerField(default=0)),
+                ('completed', models.PositiveIntegerField(default=0)),
+                ('skipped', models.PositiveIntegerField(default=0)),
+                ('planned_distance', models.DecimalField(decimal_places=2, default=0, max_digits=8)),
+                ('actual_distance', models.DecimalField(decimal_places=2, default=0, max_digits=8)),
+                ('actual_duration', models.PositiveIntegerField(default=0, help_text='In minutes')),
+                ('actual_tss', models.PositiveIntegerField(default=0)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('athlete', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='archived_days', to='core.athlete')),
+                ('tenant', models.ForeignKey(db_index=False, editable=False, on_delete=django.db.models.deletion.CASCADE, related_name='+', to='core.tenant')),
+            ],
+            options={
+                'ordering': ['-date'],
+                'indexes': [models.Index(fields=['tenant', 'date'], name='archived_day_tenant_idx')],
+                'unique_together': {('athlete', 'date')},
+            },
+        ),
+        migrations.CreateModel(
+            name='ArchivedWorkout',
+            fields=[
+                ('id', models.PositiveBigIntegerField(primary_key=True, serialize=False)),
+                ('date', models.DateField()),
+                ('workout_type', models.CharField(choices=[('EASY', 'Easy Run'), ('TEMPO', 'Tempo Run'), ('INTERVALS', 'Intervals'), ('LONG_RUN', 'Long Run'), ('RECOVERY', 'Recovery Run'), ('SPEED_WORK', 'Speed Work'), ('HILL_REPEATS', 'Hill Repeats'), ('FARTLEK', 'Fartlek'), ('BIKE', 'Bike'), ('SWIM', 'Swim'), ('BRICK', 'Brick Workout'), ('REST', 'Rest Day'), ('CROSS_TRAINING', 'Cross Training')], max_length=50)),
+                ('title', models.CharField(max_length=200)),
+                ('status', models.CharField(choices=[('UPCOMING', 'Upcoming'), ('COMPLETED', 'Completed'), ('SKIPPED', 'Skipped'), ('RESCHEDULED', 'Rescheduled')], max_length=20)),
+                ('target_distance', models.DecimalField(blank=True, decimal_places=2, max_digits=6, null=True)),
+                ('completion_quality', models.CharField(blank=True, choices=[('EXCELLENT', 'Excellent'), ('GOOD', 'Good'), ('SATISFACTORY', 'Satisfactory'), ('STRUGGLED', 'Struggled'), ('INCOMPLETE', 'Incomplete')], help_text='Blank if the workout had no completion', max_length=20)),
+                ('actual_date', models.DateField(blank=True, null=True)),
+                ('actual_distance', models.DecimalField(blank=True, decimal_places=2, max_digits=6, null=True)),
+                ('actual_duration', models.IntegerField(blank=True, null=True)),
+                ('actual_tss', models.IntegerField(blank=True, null=True)),
+                ('data', models.BinaryField(help_text='zlib-compressed JSON of the remaining workout and completion fields')),
+                ('archived_at', models.DateTimeField(db_index=True)),
+                ('athlete', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='archived_workouts', to='core.athlete')),
+                ('tenant', models.ForeignKey(db_index=False, editable=False, on_delete=django.db.models.deletion.CASCADE, related_name='+', to='core.tenant')),
+            ],
+            options={
+                'ordering': ['-date'],
+                'indexes': [models.Index(fields=['athlete', 'date'], name='archived_workout_athlete_idx'), models.Index(fields=['tenant', 'date'], name='archived_workout_tenant_idx')],
+            },
+        ),
+    ]
@@ -0,0 +1,46 @@
+# Generated by Django 4.2.28 on 2026-10-19 11:38
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0013_workout_archive'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='athletesubscription',
+            name='paused_from',
+            field=models.DateField(blank=True, help_text='Set by the lifecycle job when a pause starts; cleared on resume', null=True),
+        ),
+        migrations.AddField(
+            model_name='athletesubscription',
+            name='renewed_through',
+            field=models.DateField(blank=True, help_text='Last day covered by generated renewal payments', null=True),
+        ),
+        migrations.AddField(
+            model_name='athletesubscription',
+            name='resume_on',
+            field=models.DateField(blank=True, help_text='Resume a paused subscription on this date', null=True),
+        ),
+        migrations.AddField(
+            model_name='payment',
+            name='period_end',
+            field=models.DateField(blank=True, help_text='Last day of the billing period covered', null=True),
+        ),
+        migrations.AddField(
+            model_name='payment',
+            name='period_start',
+            field=models.DateField(blank=True, help_text='First day of the billing period covered', null=True),
+        ),
+        migrations.AddIndex(
+            model_name='athletesubscription',
+            index=models.Index(fields=['status', 'renewed_through'], name='subscription_renewal_idx'),
+        ),
+        migrations.AddConstraint(
+            model_name='payment',
+            constraint=models.UniqueConstraint(condition=models.Q(('period_start__isnull', False)), fields=('subscription', 'period_start'), name='payment_unique_period'),
+        ),
+    ]
@@ -0,0 +1,48 @@
+# Generated by Django 4.2.28 on 2026-10-19 11:43
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0014_subscription_lifecycle'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='CohortBenchmark',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('plan_type', models.CharField(choices=[('RUNNING', 'Running'), ('TRIATHLON', 'Triathlon')], max_length=20)),
+                ('service_level', models.CharField(choices=[('FOCUS', 'Focus'), ('PERSONAL', 'Personal')], max_length=20)),
+                ('workout_type', models.CharField(blank=True, choices=[('EASY', 'Easy Run'), ('TEMPO', 'Tempo Run'), ('INTERVALS', 'Intervals'), ('LONG_RUN', 'Long Run'), ('RECOVERY', 'Recovery Run'), ('SPEED_WORK', 'Speed Work'), ('HILL_REPEATS', 'Hill Repeats'), ('FARTLEK', 'Fartlek'), ('BIKE', 'Bike'), ('SWIM', 'Swim'), ('BRICK', 'Brick Workout'), ('REST', 'Rest Day'), ('CROSS_TRAINING', 'Cross Training')], help_text='Blank for all workout types', max_length=50)),
+                ('metric', models.CharField(choices=[('VOLUME', 'Weekly volume (km)'), ('TSS', 'Weekly TSS'), ('PACE', 'Pace (min/km)'), ('ADHERENCE', 'Adherence (%)')], max_length=20)),
+                ('sample_size', models.PositiveIntegerField()),
+                ('percentiles', models.JSONField(help_text='101 values: the 0th to the 100th percentile')),
+                ('computed_at', models.DateTimeField()),
+                ('tenant', models.ForeignKey(db_index=False, editable=False, on_delete=django.db.models.deletion.CASCADE, related_name='+', to='core.tenant')),
+            ],
+            options={
+                'ordering': ['plan_type', 'service_level', 'workout_type', 'metric'],
+                'unique_together': {('tenant', 'plan_type', 'service_level', 'workout_type', 'metric')},
+            },
+        ),
+        migrations.CreateModel(
+            name='AthleteBenchmark',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('workout_type', models.CharField(blank=True, choices=[('EASY', 'Easy Run'), ('TEMPO', 'Tempo Run'), ('INTERVALS', 'Intervals'), ('LONG_RUN', 'Long Run'), ('RECOVERY', 'Recovery Run'), ('SPEED_WORK', 'Speed Work'), ('HILL_REPEATS', 'Hill Repeats'), ('FARTLEK', 'Fartlek'), ('BIKE', 'Bike'), ('SWIM', 'Swim'), ('BRICK', 'Brick Workout'), ('REST', 'Rest Day'), ('CROSS_TRAINING', 'Cross Training')], help_text='Blank for all workout types', max_length=50)),
+                ('values', models.JSONField(default=dict, help_text='{metric: value}')),
+                ('ranks', models.JSONField(default=dict, help_text='{metric: percent of the cohort this athlete is ahead of}')),
+                ('computed_at', models.DateTimeField()),
+                ('athlete', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='benchmarks', to='core.athlete')),
+                ('tenant', models.ForeignKey(db_index=False, editable=False, on_delete=django.db.models.deletion.CASCADE, related_name='+', to='core.tenant')),
+            ],
+            options={
+                'ordering': ['athlete', 'workout_type'],
+                'unique_together': {('athlete', 'workout_type')},
+            },
+        ),
+    ]
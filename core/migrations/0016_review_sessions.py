@@ -0,0 +1,41 @@
+# Generated by Django 4.2.28 on 2026-10-19 11:46
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('core', '0015_cohort_benchmarks'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ReviewSession',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('period', models.CharField(choices=[('WEEKLY', 'Weekly'), ('MONTHLY', 'Monthly')], max_length=10)),
+                ('period_start', models.DateField()),
+                ('period_end', models.DateField()),
+                ('metrics_snapshot', models.JSONField(default=dict, help_text='{metric: value} for the period')),
+                ('deltas', models.JSONField(default=dict, help_text='{metric: change since the previous period}')),
+                ('computed_at', models.DateTimeField(blank=True, null=True)),
+                ('review_date', models.DateField(blank=True, help_text='Date of the feedback call', null=True)),
+                ('discussion_notes', models.TextField(blank=True)),
+                ('action_items', models.JSONField(blank=True, default=list)),
+                ('goals_set', models.JSONField(blank=True, default=dict)),
+                ('next_review_date', models.DateField(blank=True, null=True)),
+                ('athlete', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='review_sessions', to='core.athlete')),
+                ('coach', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to=settings.AUTH_USER_MODEL)),
+                ('tenant', models.ForeignKey(db_index=False, editable=False, on_delete=django.db.models.deletion.CASCADE, related_name='+', to='core.tenant')),
+            ],
+            options={
+                'ordering': ['-period_start', 'athlete'],
+                'indexes': [models.Index(fields=['tenant', 'period', 'period_start'], name='review_session_period_idx')],
+                'unique_together': {('athlete', 'period', 'period_start')},
+            },
+        ),
+    ]
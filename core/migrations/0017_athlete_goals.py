@@ -0,0 +1,42 @@
+# Generated by Django 4.2.28 on 2026-10-19 11:51
+
+from decimal import Decimal
+import django.core.validators
+from django.db import migrations, models
+import django.db.models.deletion
+import django.utils.timezone
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0016_review_sessions'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='AthleteGoal',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('goal_type', models.CharField(choices=[('RACE', 'Race'), ('FITNESS', 'Fitness'), ('HABIT', 'Habit')], max_length=20)),
+                ('description', models.CharField(help_text='e.g., Run a half marathon in under 2 hours', max_length=300)),
+                ('progress_metric', models.CharField(choices=[('DISTANCE', 'Cumulative distance (km)'), ('LONG_RUN', 'Longest session (km)'), ('WEEKLY_TSS', 'Average weekly TSS'), ('STREAK', 'Longest streak of active days')], max_length=20)),
+                ('start_date', models.DateField(default=django.utils.timezone.localdate, help_text='Completions from this day on count')),
+                ('target_date', models.DateField(blank=True, help_text='Completions after this day do not count', null=True)),
+                ('target_value', models.DecimalField(decimal_places=2, max_digits=10, validators=[django.core.validators.MinValueValidator(Decimal('0.01'))])),
+                ('current_value', models.DecimalField(decimal_places=2, default=0, editable=False, max_digits=10)),
+                ('status', models.CharField(choices=[('ON_TRACK', 'On track'), ('AT_RISK', 'At risk'), ('ACHIEVED', 'Achieved'), ('ABANDONED', 'Abandoned')], default='ON_TRACK', help_text='Set automatically from progress unless Abandoned', max_length=20)),
+                ('total', models.DecimalField(decimal_places=2, default=0, editable=False, help_text='Distance or TSS summed over the window', max_digits=12)),
+                ('streak', models.PositiveIntegerField(default=0, editable=False, help_text='Active days in the latest run')),
+                ('streak_end', models.DateField(blank=True, editable=False, help_text='Latest active day', null=True)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('athlete', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='tracked_goals', to='core.athlete')),
+                ('tenant', models.ForeignKey(db_index=False, editable=False, on_delete=django.db.models.deletion.CASCADE, related_name='+', to='core.tenant')),
+            ],
+            options={
+                'ordering': ['athlete', 'target_date'],
+                'indexes': [models.Index(fields=['athlete', 'status'], name='athlete_goal_status_idx')],
+            },
+        ),
+    ]
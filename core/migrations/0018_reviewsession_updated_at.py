@@ -0,0 +1,18 @@
+# Generated by Django 4.2.28 on 2026-10-19 12:35
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0017_athlete_goals'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='reviewsession',
+            name='updated_at',
+            field=models.DateTimeField(auto_now=True),
+        ),
+    ]
@@ -1,11 +1,76 @@
-from django.db import models
+from django.db import models, transaction
 from django.contrib.auth.models import User
+from django.core.serializers.json import DjangoJSONEncoder
 from django.core.validators import MinValueValidator, MaxValueValidator, RegexValidator
 from django.utils import timezone
 from decimal import Decimal
 
+from .tenancy import current_tenant_id, use_tenant
 
-class Athlete(models.Model):
+
+class Tenant(models.Model):
+    """A coach or coaching organization; all core data is partitioned by tenant (see core.tenancy)"""
+    name = models.CharField(max_length=200)
+    slug = models.SlugField(unique=True)
+    users = models.ManyToManyField(User, blank=True, related_name='tenants', help_text="Coaches and staff")
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        ordering = ['name']
+
+    def __str__(self):
+        return self.name
+
+
+class TenantManager(models.Manager):
+    """Default manager of tenant models: only the current tenant's rows when one is set"""
+
+    def get_queryset(self):
+        queryset = super().get_queryset()
+        tenant_id = current_tenant_id()
+        if tenant_id is not None:
+            queryset = queryset.filter(tenant_id=tenant_id)
+        return queryset
+
+
+class TenantModel(models.Model):
+    """Base for per-tenant models; the tenant is inherited from `tenant_parent` or the current tenant"""
+    tenant = models.ForeignKey(Tenant, on_delete=models.CASCADE, related_name='+', editable=False, db_index=False)
+
+    objects = TenantManager()
+    unscoped = models.Manager()
+
+    # Name of the FK whose tenant new rows inherit (None for top-level models)
+    tenant_parent = None
+
+    class Meta:
+        abstract = True
+
+    def ensure_tenant(self):
+        if self.tenant_id is None:
+            parent = getattr(self, self.tenant_parent) if self.tenant_parent else None
+            if parent is not None:
+                self.tenant_id = parent.tenant_id
+            else:
+                from .tenancy import default_tenant_id
+                self.tenant_id = default_tenant_id()
+
+    def save(self, *args, **kwargs):
+        self.ensure_tenant()
+        super().save(*args, **kwargs)
+
+    # Unique checks go through the default manager, which only sees the
+    # current tenant; the database constraints span all tenants
+    def _perform_unique_checks(self, unique_checks):
+        with use_tenant(None):
+            return super()._perform_unique_checks(unique_checks)
+
+    def validate_constraints(self, exclude=None):
+        with use_tenant(None):
+            super().validate_constraints(exclude)
+
+
+class Athlete(TenantModel):
     """Athlete profile linked to Django User for authentication"""
     user = models.OneToOneField(User, on_delete=models.CASCADE, related_name='athlete_profile')
     name = models.CharField(max_length=200)
@@ -23,6 +88,9 @@ class Athlete(models.Model):
 
     class Meta:
         ordering = ['name']
+        indexes = [
+            models.Index(fields=['tenant', 'name'], name='athlete_tenant_name_idx'),
+        ]
 
     def __str__(self):
         return self.name
@@ -32,10 +100,17 @@ class Athlete(models.Model):
         if self.user:
             self.user.email = self.email
             self.user.save()
+        created = self._state.adding
         super().save(*args, **kwargs)
+        
+        from .search import index_instance
+        index_instance(self)
+        if created:
+            from .summary import refresh_athletes
+            refresh_athletes([self.pk])
 
 
-class BillingPlan(models.Model):
+class BillingPlan(TenantModel):
     """Billing plans with auto-generated HSN/SAC codes"""
     
     PLAN_TYPE_CHOICES = [
@@ -70,7 +145,7 @@ class BillingPlan(models.Model):
 
     class Meta:
         ordering = ['plan_type', 'service_level', 'billing_period']
-        unique_together = ['plan_type', 'service_level', 'billing_period']
+        unique_together = ['tenant', 'plan_type', 'service_level', 'billing_period']
 
     def __str__(self):
         return f"{self.name} (₹{self.base_price})"
@@ -84,7 +159,51 @@ class BillingPlan(models.Model):
         super().save(*args, **kwargs)
 
 
-class AthleteSubscription(models.Model):
+class BillingAuditMixin:
+    """Record field-level changes to billing records in BillingChange (see core.audit)"""
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        # Remember what was loaded so save() can log only the changed fields
+        instance._loaded_values = dict(zip(field_names, values))
+        return instance
+
+    def save(self, *args, **kwargs):
+        created = self._state.adding
+        super().save(*args, **kwargs)
+        
+        from .audit import record_save
+        record_save(self, created)
+
+    def delete(self, *args, **kwargs):
+        from .audit import record_delete
+        record_delete(self)
+        return super().delete(*args, **kwargs)
+
+
+class AthleteSummaryMixin:
+    """Refresh the owning athlete's AthleteSummary in the same transaction (see core.summary)"""
+
+    def summary_athlete_id(self):
+        return self.athlete_id
+
+    def save(self, *args, **kwargs):
+        from .summary import refresh_athletes
+        with transaction.atomic():
+            super().save(*args, **kwargs)
+            refresh_athletes([self.summary_athlete_id()])
+
+    def delete(self, *args, **kwargs):
+        from .summary import refresh_athletes
+        athlete_id = self.summary_athlete_id()
+        with transaction.atomic():
+            result = super().delete(*args, **kwargs)
+            refresh_athletes([athlete_id])
+        return result
+
+
+class AthleteSubscription(BillingAuditMixin, AthleteSummaryMixin, TenantModel):
     """Athlete subscription to a billing plan with custom discounts"""
     
     STATUS_CHOICES = [
@@ -118,12 +237,26 @@ class AthleteSubscription(models.Model):
     start_date = models.DateField()
     end_date = models.DateField(null=True, blank=True, help_text="Null for ongoing subscriptions")
     status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='ACTIVE')
+    paused_from = models.DateField(
+        null=True, blank=True, help_text="Set by the lifecycle job when a pause starts; cleared on resume"
+    )
+    resume_on = models.DateField(null=True, blank=True, help_text="Resume a paused subscription on this date")
+    renewed_through = models.DateField(
+        null=True, blank=True, help_text="Last day covered by generated renewal payments"
+    )
     notes = models.TextField(blank=True)
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
+    tenant_parent = 'athlete'
+
     class Meta:
         ordering = ['-start_date']
+        indexes = [
+            models.Index(fields=['tenant', 'status'], name='subscription_tenant_status_idx'),
+            # The nightly lifecycle job runs across tenants
+            models.Index(fields=['status', 'renewed_through'], name='subscription_renewal_idx'),
+        ]
 
     def __str__(self):
         return f"{self.athlete.name} - {self.billing_plan.name}"
@@ -141,7 +274,7 @@ class AthleteSubscription(models.Model):
         super().save(*args, **kwargs)
 
 
-class Payment(models.Model):
+class Payment(BillingAuditMixin, AthleteSummaryMixin, TenantModel):
     """Payment records for athlete subscriptions"""
     
     STATUS_CHOICES = [
@@ -171,16 +304,34 @@ class Payment(models.Model):
     payment_method = models.CharField(max_length=20, choices=PAYMENT_METHOD_CHOICES, blank=True)
     transaction_id = models.CharField(max_length=200, blank=True, help_text="UPI transaction ID or reference")
     months_covered = models.CharField(max_length=100, help_text="e.g., 'February 2026' or 'Jan-Mar 2026'")
+    period_start = models.DateField(null=True, blank=True, help_text="First day of the billing period covered")
+    period_end = models.DateField(null=True, blank=True, help_text="Last day of the billing period covered")
     notes = models.TextField(blank=True)
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
+    tenant_parent = 'subscription'
+
     class Meta:
         ordering = ['-due_date']
+        indexes = [
+            models.Index(fields=['status', 'due_date'], name='payment_status_due_idx'),
+            models.Index(fields=['tenant', 'status', 'due_date'], name='payment_tenant_status_due_idx'),
+        ]
+        constraints = [
+            # A billing period is charged at most once, however often renewals run
+            models.UniqueConstraint(
+                fields=['subscription', 'period_start'], condition=models.Q(period_start__isnull=False),
+                name='payment_unique_period',
+            ),
+        ]
 
     def __str__(self):
         return f"{self.subscription.athlete.name} - ₹{self.amount} ({self.status})"
 
+    def summary_athlete_id(self):
+        return self.subscription.athlete_id
+
     def is_overdue(self):
         """Check if payment is overdue"""
         if self.status == 'PENDING' and self.due_date:
@@ -188,7 +339,34 @@ class Payment(models.Model):
         return False
 
 
-class InvoiceTemplate(models.Model):
+class PaymentReminder(TenantModel):
+    """Payment due / overdue reminder email, recorded so each goes out once"""
+    
+    KIND_CHOICES = [
+        ('DUE', 'Payment Due'),
+        ('OVERDUE', 'Overdue Payment Reminder'),
+    ]
+    
+    payment = models.ForeignKey(Payment, on_delete=models.CASCADE, related_name='reminders')
+    kind = models.CharField(max_length=10, choices=KIND_CHOICES)
+    claim = models.UUIDField(editable=False, help_text="Scheduler run that claimed this reminder")
+    claimed_at = models.DateTimeField()
+    sent_at = models.DateTimeField(null=True, blank=True)
+
+    tenant_parent = 'payment'
+
+    class Meta:
+        ordering = ['-claimed_at']
+        unique_together = ['payment', 'kind']
+        indexes = [
+            models.Index(fields=['tenant', 'claimed_at'], name='reminder_tenant_claimed_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.get_kind_display()} - {self.payment}"
+
+
+class InvoiceTemplate(TenantModel):
     """Invoice template with company details and GST information"""
     
     company_name = models.CharField(max_length=200, default="TAILWIND")
@@ -232,17 +410,31 @@ class InvoiceTemplate(models.Model):
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
+    class Meta:
+        indexes = [
+            models.Index(fields=['tenant', 'is_default'], name='template_tenant_default_idx'),
+        ]
+
     def __str__(self):
         return f"{self.company_name} Template"
 
     def save(self, *args, **kwargs):
-        # Ensure only one default template
+        # Ensure only one default template per tenant
+        self.ensure_tenant()
         if self.is_default:
-            InvoiceTemplate.objects.filter(is_default=True).update(is_default=False)
+            InvoiceTemplate.unscoped.filter(tenant_id=self.tenant_id, is_default=True).update(
+                is_default=False, updated_at=timezone.now()
+            )
         super().save(*args, **kwargs)
 
 
-class Invoice(models.Model):
+# Invoice fields that InvoiceLine rows are derived from
+LINE_SOURCE_FIELDS = {
+    'payment', 'invoice_date', 'line_items', 'taxable_amount', 'cgst_amount', 'sgst_amount', 'igst_amount',
+}
+
+
+class Invoice(BillingAuditMixin, TenantModel):
     """Generated invoice for payments"""
     
     STATUS_CHOICES = [
@@ -254,7 +446,7 @@ class Invoice(models.Model):
     
     payment = models.OneToOneField(Payment, on_delete=models.CASCADE, related_name='invoice')
     template = models.ForeignKey(InvoiceTemplate, on_delete=models.PROTECT)
-    invoice_number = models.CharField(max_length=50, unique=True, editable=False)
+    invoice_number = models.CharField(max_length=50, editable=False)
     invoice_date = models.DateField()
     due_date = models.DateField(null=True, blank=True)
     
@@ -297,27 +489,89 @@ class Invoice(models.Model):
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
+    tenant_parent = 'payment'
+
     class Meta:
         ordering = ['-invoice_date']
+        constraints = [
+            models.UniqueConstraint(fields=['tenant', 'invoice_number'], name='invoice_number_per_tenant'),
+        ]
+        indexes = [
+            models.Index(fields=['tenant', 'invoice_date'], name='invoice_tenant_date_idx'),
+            # Work queues for core.invoicing.process_invoice_queue
+            models.Index(fields=['created_at'], name='invoice_pdf_pending_idx',
+                         condition=models.Q(pdf_generated_at__isnull=True)),
+            models.Index(fields=['created_at'], name='invoice_email_pending_idx',
+                         condition=models.Q(emailed_at__isnull=True)),
+        ]
 
     def __str__(self):
         return f"{self.invoice_number} - {self.customer_name}"
 
     def save(self, *args, **kwargs):
         # Auto-generate invoice number
+        self.ensure_tenant()
         if not self.invoice_number:
-            year = self.invoice_date.year
-            month = self.invoice_date.month
-            count = Invoice.objects.filter(
-                invoice_date__year=year,
-                invoice_date__month=month
-            ).count() + 1
-            self.invoice_number = f"INV-{year}-{month:02d}-{count:04d}"
+            from .invoicing import allocate_invoice_numbers
+            self.invoice_number = allocate_invoice_numbers(self.tenant_id, self.invoice_date, 1)[0]
         super().save(*args, **kwargs)
+        
+        update_fields = kwargs.get('update_fields')
+        if update_fields is None or LINE_SOURCE_FIELDS.intersection(update_fields):
+            from .invoicing import sync_invoice_lines
+            sync_invoice_lines([self])
 
 
-class EmailSettings(models.Model):
-    """Email configuration (singleton)"""
+class InvoiceLine(TenantModel):
+    """Relational copy of an invoice's line_items JSON, for reporting (see core.reports)"""
+    
+    invoice = models.ForeignKey(Invoice, on_delete=models.CASCADE, related_name='lines')
+    position = models.PositiveSmallIntegerField()
+    invoice_date = models.DateField(help_text="Copied from the invoice for date-range reports")
+    billing_plan = models.ForeignKey(
+        BillingPlan, on_delete=models.SET_NULL, null=True, blank=True, related_name='+'
+    )
+    description = models.CharField(max_length=500)
+    hsn_sac = models.CharField(max_length=20, blank=True)
+    quantity = models.DecimalField(max_digits=10, decimal_places=2, default=1)
+    rate = models.DecimalField(max_digits=10, decimal_places=2)
+    amount = models.DecimalField(max_digits=10, decimal_places=2)
+    taxable_amount = models.DecimalField(
+        max_digits=10, decimal_places=2, help_text="Share of the invoice's taxable amount after discounts"
+    )
+    tax_amount = models.DecimalField(
+        max_digits=10, decimal_places=2, help_text="Share of the invoice's CGST + SGST + IGST"
+    )
+
+    tenant_parent = 'invoice'
+
+    class Meta:
+        ordering = ['invoice', 'position']
+        unique_together = ['invoice', 'position']
+        indexes = [
+            models.Index(fields=['tenant', 'hsn_sac', 'invoice_date'], name='invoice_line_hsn_idx'),
+            models.Index(fields=['tenant', 'invoice_date'], name='invoice_line_date_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.invoice_id} #{self.position}: {self.description}"
+
+
+class InvoiceSequence(TenantModel):
+    """Last invoice number issued per tenant and month (INV-YYYY-MM-XXXX)"""
+    year = models.PositiveSmallIntegerField()
+    month = models.PositiveSmallIntegerField()
+    last_number = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        unique_together = ['tenant', 'year', 'month']
+
+    def __str__(self):
+        return f"{self.year}-{self.month:02d}: {self.last_number}"
+
+
+class EmailSettings(TenantModel):
+    """Email configuration (one active per tenant)"""
     
     PROVIDER_CHOICES = [
         ('GMAIL', 'Gmail'),
@@ -342,18 +596,24 @@ class EmailSettings(models.Model):
 
     class Meta:
         verbose_name_plural = "Email Settings"
+        indexes = [
+            models.Index(fields=['tenant', 'is_active'], name='email_settings_tenant_idx'),
+        ]
 
     def __str__(self):
         return f"Email Settings ({self.provider})"
 
     def save(self, *args, **kwargs):
-        # Ensure only one active settings
+        # Ensure only one active settings per tenant
+        self.ensure_tenant()
         if self.is_active:
-            EmailSettings.objects.filter(is_active=True).update(is_active=False)
+            EmailSettings.unscoped.filter(tenant_id=self.tenant_id, is_active=True).update(
+                is_active=False, updated_at=timezone.now()
+            )
         super().save(*args, **kwargs)
 
 
-class Workout(models.Model):
+class Workout(AthleteSummaryMixin, TenantModel):
     """Workout assigned to athlete"""
     
     STATUS_CHOICES = [
@@ -393,13 +653,24 @@ class Workout(models.Model):
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
+    tenant_parent = 'athlete'
+
     class Meta:
         ordering = ['-date']
         unique_together = ['athlete', 'date', 'workout_type']
+        indexes = [
+            models.Index(fields=['tenant', 'date'], name='workout_tenant_date_idx'),
+        ]
 
     def __str__(self):
         return f"{self.athlete.name} - {self.title} ({self.date})"
 
+    def save(self, *args, **kwargs):
+        super().save(*args, **kwargs)
+        
+        from .search import index_instance
+        index_instance(self)
+
     def is_overdue(self):
         """Check if workout is overdue (past date and not completed/skipped)"""
         if self.status == 'UPCOMING' and self.date:
@@ -407,7 +678,7 @@ class Workout(models.Model):
         return False
 
 
-class WorkoutCompletion(models.Model):
+class WorkoutCompletion(AthleteSummaryMixin, TenantModel):
     """Athlete's completion record for a workout"""
     
     COMPLETION_QUALITY_CHOICES = [
@@ -431,13 +702,440 @@ class WorkoutCompletion(models.Model):
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
+    tenant_parent = 'workout'
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['tenant', 'created_at'], name='completion_tenant_created_idx'),
+        ]
+
     def __str__(self):
         return f"{self.workout.title} - {self.completion_quality}"
 
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        # Remember what was loaded so goal progress can move by the difference (see core.goals)
+        instance._loaded_values = dict(zip(field_names, values))
+        return instance
+
+    def summary_athlete_id(self):
+        return self.workout.athlete_id
+
     def save(self, *args, **kwargs):
         # Update workout status based on completion
         if self.completion_quality != 'INCOMPLETE':
             self.workout.status = 'COMPLETED'
             self.workout.save()
+        created = self._state.adding
         super().save(*args, **kwargs)
+        
+        from .search import index_instance
+        index_instance(self)
+        from .goals import completion_saved
+        completion_saved(self, created)
+        if created:
+            from . import engagement
+            engagement.track(
+                self.workout.athlete_id, engagement.WORKOUT_SUBMIT, tenant_id=self.tenant_id, workout_id=self.workout_id,
+            )
+
+    def delete(self, *args, **kwargs):
+        from .goals import completion_deleted
+        workout = self.workout
+        with transaction.atomic():
+            result = super().delete(*args, **kwargs)
+            completion_deleted(self, workout)
+        return result
+
+
+
+class ChurnRiskScore(TenantModel):
+    """Nightly churn-risk score for an athlete (see core.churn)"""
+    
+    RISK_LEVEL_CHOICES = [
+        ('LOW', 'Low'),
+        ('MEDIUM', 'Medium'),
+        ('HIGH', 'High'),
+    ]
+    
+    athlete = models.OneToOneField(Athlete, on_delete=models.CASCADE, related_name='churn_risk')
+    score = models.FloatField(help_text="Churn probability (0-100)")
+    risk_level = models.CharField(max_length=10, choices=RISK_LEVEL_CHOICES)
+    features = models.JSONField(default=dict, help_text="Feature values used for scoring")
+    explanation = models.TextField(blank=True, help_text="Top factors contributing to the score")
+    computed_at = models.DateTimeField()
+
+    tenant_parent = 'athlete'
+
+    class Meta:
+        ordering = ['-score']
+        indexes = [
+            models.Index(fields=['tenant', '-score'], name='churn_score_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.athlete.name} - {self.score:.0f} ({self.risk_level})"
+
+
+class SearchEntry(models.Model):
+    """Full-text search document for an athlete, workout or completion (see core.search)"""
+    
+    KIND_CHOICES = [
+        ('ATHLETE', 'Athlete'),
+        ('WORKOUT', 'Workout'),
+        ('COMPLETION', 'Workout Completion'),
+    ]
+    
+    kind = models.CharField(max_length=20, choices=KIND_CHOICES)
+    object_id = models.PositiveBigIntegerField()
+    athlete = models.ForeignKey(Athlete, on_delete=models.CASCADE, related_name='+')
+    title = models.CharField(max_length=200)
+    body = models.TextField(blank=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        verbose_name_plural = "Search entries"
+        unique_together = ['kind', 'object_id']
+
+    def __str__(self):
+        return f"{self.get_kind_display()}: {self.title}"
+
+
+class BillingChange(TenantModel):
+    """Append-only change log for payments, invoices and subscriptions (see core.audit)"""
+    
+    RECORD_TYPE_CHOICES = [
+        (1, 'Payment'),
+        (2, 'Invoice'),
+        (3, 'Athlete Subscription'),
+    ]
+    
+    ACTION_CHOICES = [
+        (1, 'Created'),
+        (2, 'Updated'),
+        (3, 'Deleted'),
+        (4, 'Snapshot'),
+    ]
+    
+    record_type = models.PositiveSmallIntegerField(choices=RECORD_TYPE_CHOICES)
+    record_id = models.PositiveBigIntegerField()
+    action = models.PositiveSmallIntegerField(choices=ACTION_CHOICES)
+    changes = models.JSONField(
+        encoder=DjangoJSONEncoder,
+        help_text="Full field values for Created/Snapshot, {field: [old, new]} for Updated"
+    )
+    changed_at = models.DateTimeField(db_index=True)
+
+    class Meta:
+        ordering = ['-changed_at', '-id']
+        indexes = [
+            models.Index(fields=['record_type', 'record_id', 'changed_at'], name='billing_change_record_idx'),
+            models.Index(fields=['tenant', 'changed_at'], name='billing_change_tenant_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.get_record_type_display()} #{self.record_id} {self.get_action_display()} ({self.changed_at:%Y-%m-%d %H:%M})"
+
+
+class EngagementLog(TenantModel):
+    """Raw athlete engagement event, written in batches by core.engagement"""
+    
+    EVENT_TYPE_CHOICES = [
+        (1, 'Login'),
+        (2, 'Workout View'),
+        (3, 'Workout Submit'),
+    ]
+    
+    athlete = models.ForeignKey(Athlete, on_delete=models.CASCADE, related_name='+')
+    event_type = models.PositiveSmallIntegerField(choices=EVENT_TYPE_CHOICES)
+    timestamp = models.DateTimeField(db_index=True)
+    metadata = models.JSONField(default=dict, blank=True, encoder=DjangoJSONEncoder)
+
+    tenant_parent = 'athlete'
+
+    class Meta:
+        ordering = ['-timestamp']
+        indexes = [
+            models.Index(fields=['tenant', 'timestamp'], name='engagement_tenant_time_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.athlete_id} {self.get_event_type_display()} ({self.timestamp:%Y-%m-%d %H:%M})"
+
+
+class EngagementDaily(TenantModel):
+    """Per-athlete daily event counts rolled up from EngagementLog"""
+    
+    athlete = models.ForeignKey(Athlete, on_delete=models.CASCADE, related_name='engagement_days')
+    date = models.DateField()
+    event_type = models.PositiveSmallIntegerField(choices=EngagementLog.EVENT_TYPE_CHOICES)
+    count = models.PositiveIntegerField(default=0)
+
+    tenant_parent = 'athlete'
+
+    class Meta:
+        ordering = ['-date', 'athlete']
+        verbose_name_plural = "Engagement daily counts"
+        unique_together = ['athlete', 'date', 'event_type']
+        indexes = [
+            models.Index(fields=['tenant', 'date'], name='engagement_daily_tenant_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.athlete} - {self.date} {self.get_event_type_display()}: {self.count}"
+
+
+class AthleteSummary(TenantModel):
+    """Denormalized per-athlete roster figures, kept current by core.summary"""
+    
+    athlete = models.OneToOneField(Athlete, on_delete=models.CASCADE, primary_key=True, related_name='summary')
+    outstanding_balance = models.DecimalField(
+        max_digits=12, decimal_places=2, default=0, help_text="Total of PENDING payments"
+    )
+    pending_payments = models.PositiveIntegerField(default=0)
+    last_completed_date = models.DateField(null=True, blank=True)
+    next_workout_date = models.DateField(null=True, blank=True)
+    next_workout_title = models.CharField(max_length=200, blank=True)
+    active_subscription = models.ForeignKey(
+        AthleteSubscription, on_delete=models.SET_NULL, null=True, blank=True, related_name='+'
+    )
+    updated_at = models.DateTimeField(auto_now=True)
+
+    tenant_parent = 'athlete'
+
+    class Meta:
+        verbose_name_plural = "Athlete summaries"
+        indexes = [
+            models.Index(fields=['tenant', 'outstanding_balance'], name='summary_balance_idx'),
+            models.Index(fields=['tenant', 'last_completed_date'], name='summary_last_completed_idx'),
+            models.Index(fields=['tenant', 'next_workout_date'], name='summary_next_workout_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.athlete} summary"
+
+
+class ArchivedWorkout(TenantModel):
+    """A workout (and its completion) moved out of the live tables by core.archive"""
+    
+    # The original Workout id, kept so restored rows get their old primary key back
+    id = models.PositiveBigIntegerField(primary_key=True)
+    athlete = models.ForeignKey(Athlete, on_delete=models.CASCADE, related_name='archived_workouts')
+    date = models.DateField()
+    workout_type = models.CharField(max_length=50, choices=Workout.WORKOUT_TYPE_CHOICES)
+    title = models.CharField(max_length=200)
+    status = models.CharField(max_length=20, choices=Workout.STATUS_CHOICES)
+    target_distance = models.DecimalField(max_digits=6, decimal_places=2, null=True, blank=True)
+    completion_quality = models.CharField(
+        max_length=20, choices=WorkoutCompletion.COMPLETION_QUALITY_CHOICES, blank=True,
+        help_text="Blank if the workout had no completion"
+    )
+    actual_date = models.DateField(null=True, blank=True)
+    actual_distance = models.DecimalField(max_digits=6, decimal_places=2, null=True, blank=True)
+    actual_duration = models.IntegerField(null=True, blank=True)
+    actual_tss = models.IntegerField(null=True, blank=True)
+    data = models.BinaryField(help_text="zlib-compressed JSON of the remaining workout and completion fields")
+    archived_at = models.DateTimeField(db_index=True)
+
+    tenant_parent = 'athlete'
+
+    class Meta:
+        ordering = ['-date']
+        indexes = [
+            models.Index(fields=['athlete', 'date'], name='archived_workout_athlete_idx'),
+            models.Index(fields=['tenant', 'date'], name='archived_workout_tenant_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.athlete} - {self.title} ({self.date}, archived)"
+
+
+class ArchivedWorkoutDay(TenantModel):
+    """Per-athlete daily totals of archived workouts (see core.archive)"""
+    
+    athlete = models.ForeignKey(Athlete, on_delete=models.CASCADE, related_name='archived_days')
+    date = models.DateField()
+    workouts = models.PositiveIntegerField(default=0)
+    completed = models.PositiveIntegerField(default=0)
+    skipped = models.PositiveIntegerField(default=0)
+    planned_distance = models.DecimalField(max_digits=8, decimal_places=2, default=0)
+    actual_distance = models.DecimalField(max_digits=8, decimal_places=2, default=0)
+    actual_duration = models.PositiveIntegerField(default=0, help_text="In minutes")
+    actual_tss = models.PositiveIntegerField(default=0)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    tenant_parent = 'athlete'
 
+    class Meta:
+        ordering = ['-date']
+        unique_together = ['athlete', 'date']
+        indexes = [
+            models.Index(fields=['tenant', 'date'], name='archived_day_tenant_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.athlete} - {self.date}: {self.completed}/{self.workouts}"
+
+
+class CohortBenchmark(TenantModel):
+    """Nightly percentile table of one metric across a cohort of similar athletes (see core.cohorts)"""
+    
+    METRIC_CHOICES = [
+        ('VOLUME', 'Weekly volume (km)'),
+        ('TSS', 'Weekly TSS'),
+        ('PACE', 'Pace (min/km)'),
+        ('ADHERENCE', 'Adherence (%)'),
+    ]
+    
+    plan_type = models.CharField(max_length=20, choices=BillingPlan.PLAN_TYPE_CHOICES)
+    service_level = models.CharField(max_length=20, choices=BillingPlan.SERVICE_LEVEL_CHOICES)
+    workout_type = models.CharField(
+        max_length=50, blank=True, choices=Workout.WORKOUT_TYPE_CHOICES, help_text="Blank for all workout types"
+    )
+    metric = models.CharField(max_length=20, choices=METRIC_CHOICES)
+    sample_size = models.PositiveIntegerField()
+    percentiles = models.JSONField(help_text="101 values: the 0th to the 100th percentile")
+    computed_at = models.DateTimeField()
+
+    class Meta:
+        ordering = ['plan_type', 'service_level', 'workout_type', 'metric']
+        unique_together = ['tenant', 'plan_type', 'service_level', 'workout_type', 'metric']
+
+    def __str__(self):
+        return (
+            f"{self.get_plan_type_display()} {self.get_service_level_display()} "
+            f"{self.get_workout_type_display() or 'All workouts'} - {self.get_metric_display()}"
+        )
+
+
+class AthleteBenchmark(TenantModel):
+    """An athlete's nightly metric values and standing within their cohort (see core.cohorts)"""
+    
+    athlete = models.ForeignKey(Athlete, on_delete=models.CASCADE, related_name='benchmarks')
+    workout_type = models.CharField(
+        max_length=50, blank=True, choices=Workout.WORKOUT_TYPE_CHOICES, help_text="Blank for all workout types"
+    )
+    values = models.JSONField(default=dict, help_text="{metric: value}")
+    ranks = models.JSONField(default=dict, help_text="{metric: percent of the cohort this athlete is ahead of}")
+    computed_at = models.DateTimeField()
+
+    tenant_parent = 'athlete'
+
+    class Meta:
+        ordering = ['athlete', 'workout_type']
+        unique_together = ['athlete', 'workout_type']
+
+    def __str__(self):
+        return f"{self.athlete} - {self.get_workout_type_display() or 'All workouts'}"
+
+
+class ReviewSession(TenantModel):
+    """An athlete's weekly or monthly review: precomputed metrics plus the coach's call notes (see core.reviews)"""
+    
+    PERIOD_CHOICES = [
+        ('WEEKLY', 'Weekly'),
+        ('MONTHLY', 'Monthly'),
+    ]
+    
+    athlete = models.ForeignKey(Athlete, on_delete=models.CASCADE, related_name='review_sessions')
+    coach = models.ForeignKey(User, on_delete=models.SET_NULL, null=True, blank=True, related_name='+')
+    period = models.CharField(max_length=10, choices=PERIOD_CHOICES)
+    period_start = models.DateField()
+    period_end = models.DateField()
+    metrics_snapshot = models.JSONField(default=dict, help_text="{metric: value} for the period")
+    deltas = models.JSONField(default=dict, help_text="{metric: change since the previous period}")
+    computed_at = models.DateTimeField(null=True, blank=True)
+    review_date = models.DateField(null=True, blank=True, help_text="Date of the feedback call")
+    discussion_notes = models.TextField(blank=True)
+    action_items = models.JSONField(default=list, blank=True)
+    goals_set = models.JSONField(default=dict, blank=True)
+    next_review_date = models.DateField(null=True, blank=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    tenant_parent = 'athlete'
+
+    class Meta:
+        ordering = ['-period_start', 'athlete']
+        unique_together = ['athlete', 'period', 'period_start']
+        indexes = [
+            models.Index(fields=['tenant', 'period', 'period_start'], name='review_session_period_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.athlete} - {self.get_period_display()} review {self.period_start:%d %b %Y}"
+
+
+class AthleteGoal(TenantModel):
+    """A measurable athlete goal whose progress is kept current as completions are saved (see core.goals)"""
+    
+    GOAL_TYPE_CHOICES = [
+        ('RACE', 'Race'),
+        ('FITNESS', 'Fitness'),
+        ('HABIT', 'Habit'),
+    ]
+    
+    METRIC_CHOICES = [
+        ('DISTANCE', 'Cumulative distance (km)'),
+        ('LONG_RUN', 'Longest session (km)'),
+        ('WEEKLY_TSS', 'Average weekly TSS'),
+        ('STREAK', 'Longest streak of active days'),
+    ]
+    
+    STATUS_CHOICES = [
+        ('ON_TRACK', 'On track'),
+        ('AT_RISK', 'At risk'),
+        ('ACHIEVED', 'Achieved'),
+        ('ABANDONED', 'Abandoned'),
+    ]
+    
+    athlete = models.ForeignKey(Athlete, on_delete=models.CASCADE, related_name='tracked_goals')
+    goal_type = models.CharField(max_length=20, choices=GOAL_TYPE_CHOICES)
+    description = models.CharField(max_length=300, help_text="e.g., Run a half marathon in under 2 hours")
+    progress_metric = models.CharField(max_length=20, choices=METRIC_CHOICES)
+    start_date = models.DateField(default=timezone.localdate, help_text="Completions from this day on count")
+    target_date = models.DateField(null=True, blank=True, help_text="Completions after this day do not count")
+    target_value = models.DecimalField(max_digits=10, decimal_places=2, validators=[MinValueValidator(Decimal('0.01'))])
+    current_value = models.DecimalField(max_digits=10, decimal_places=2, default=0, editable=False)
+    status = models.CharField(
+        max_length=20, choices=STATUS_CHOICES, default='ON_TRACK',
+        help_text="Set automatically from progress unless Abandoned"
+    )
+    # Running state, moved by each completion save
+    total = models.DecimalField(
+        max_digits=12, decimal_places=2, default=0, editable=False, help_text="Distance or TSS summed over the window"
+    )
+    streak = models.PositiveIntegerField(default=0, editable=False, help_text="Active days in the latest run")
+    streak_end = models.DateField(null=True, blank=True, editable=False, help_text="Latest active day")
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    tenant_parent = 'athlete'
+
+    class Meta:
+        ordering = ['athlete', 'target_date']
+        indexes = [
+            models.Index(fields=['athlete', 'status'], name='athlete_goal_status_idx'),
+        ]
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        instance._loaded_values = dict(zip(field_names, values))
+        return instance
+
+    def __str__(self):
+        return f"{self.athlete} - {self.description}"
+
+    def save(self, *args, **kwargs):
+        from .goals import WINDOW_FIELDS, rebuild, refresh
+        loaded = getattr(self, '_loaded_values', None)
+        if loaded is None or loaded.get('status') == 'ABANDONED' or any(
+            loaded.get(name) != getattr(self, name) for name in WINDOW_FIELDS
+        ):
+            # New, reopened or re-windowed goal: start the running state from the history
+            rebuild([self])
+        else:
+            refresh(self)
+        super().save(*args, **kwargs)
+        self._loaded_values = {name: getattr(self, name) for name in (*WINDOW_FIELDS, 'status')}
@@ -0,0 +1,106 @@
+"""
+Invoice PDF rendering with ReportLab.
+"""
+from io import BytesIO
+
+from reportlab.lib import colors
+from reportlab.lib.pagesizes import A4
+from reportlab.lib.styles import getSampleStyleSheet
+from reportlab.lib.units import mm
+from reportlab.platypus import Paragraph, SimpleDocTemplate, Spacer, Table, TableStyle
+
+BRAND_BLUE = colors.HexColor('#4facfe')
+
+
+def _rupees(amount):
+    return f"Rs. {amount:,.2f}"
+
+
+def render_invoice_pdf(invoice):
+    """Render an Invoice to PDF bytes"""
+    buffer = BytesIO()
+    styles = getSampleStyleSheet()
+    doc = SimpleDocTemplate(buffer, pagesize=A4, leftMargin=18 * mm, rightMargin=18 * mm,
+                            topMargin=18 * mm, bottomMargin=18 * mm, title=invoice.invoice_number)
+
+    story = [
+        Paragraph(f'<font color="#4facfe" size="22"><b>{invoice.company_name}</b></font>', styles['Title']),
+        Paragraph("Running &amp; Triathlon Coaching", styles['Normal']),
+        Spacer(1, 8 * mm),
+    ]
+
+    company = [invoice.company_address.replace('\n', '<br/>'), f"PAN: {invoice.company_pan}"]
+    if invoice.company_gstin:
+        company.append(f"GSTIN: {invoice.company_gstin}")
+    company.append(f"{invoice.company_email} | {invoice.company_phone}")
+    header = Table([[
+        Paragraph('<br/>'.join(company), styles['Normal']),
+        Paragraph(
+            f"<b>Invoice:</b> {invoice.invoice_number}<br/>"
+            f"<b>Date:</b> {invoice.invoice_date:%d %b %Y}<br/>"
+            f"<b>Status:</b> {invoice.get_status_display()}",
+            styles['Normal'],
+        ),
+    ]], colWidths=[110 * mm, 64 * mm])
+    header.setStyle(TableStyle([('VALIGN', (0, 0), (-1, -1), 'TOP')]))
+    story += [header, Spacer(1, 6 * mm)]
+
+    story += [
+        Paragraph("<b>Bill To</b>", styles['Heading4']),
+        Paragraph(
+            f"{invoice.customer_name}<br/>{invoice.customer_address.replace(chr(10), '<br/>')}<br/>"
+            f"{invoice.customer_email} | {invoice.customer_phone}",
+            styles['Normal'],
+        ),
+        Spacer(1, 6 * mm),
+    ]
+
+    rows = [['Description', 'HSN/SAC', 'Qty', 'Rate', 'Amount']]
+    for item in invoice.line_items:
+        rows.append([
+            item.get('description', ''), item.get('hsn_sac', ''), item.get('quantity', 1),
+            _rupees(float(item.get('rate', 0))), _rupees(float(item.get('amount', 0))),
+        ])
+    totals = [('Subtotal', invoice.subtotal)]
+    if invoice.discount_amount:
+        totals.append(('Discount', -invoice.discount_amount))
+    if invoice.cgst_amount or invoice.sgst_amount:
+        totals += [
+            (f'CGST @ {invoice.cgst_rate}%', invoice.cgst_amount),
+            (f'SGST @ {invoice.sgst_rate}%', invoice.sgst_amount),
+        ]
+    if invoice.igst_amount:
+        totals.append((f'IGST @ {invoice.igst_rate}%', invoice.igst_amount))
+    totals.append(('Total', invoice.total_amount))
+    for label, amount in totals:
+        rows.append(['', '', '', label, _rupees(amount)])
+
+    items = Table(rows, colWidths=[74 * mm, 32 * mm, 12 * mm, 28 * mm, 28 * mm])
+    items.setStyle(TableStyle([
+        ('BACKGROUND', (0, 0), (-1, 0), BRAND_BLUE),
+        ('TEXTCOLOR', (0, 0), (-1, 0), colors.white),
+        ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
+        ('ALIGN', (2, 0), (-1, -1), 'RIGHT'),
+        ('LINEBELOW', (0, len(invoice.line_items)), (-1, len(invoice.line_items)), 0.5, colors.grey),
+        ('FONTNAME', (3, -1), (-1, -1), 'Helvetica-Bold'),
+    ]))
+    story += [items, Spacer(1, 4 * mm), Paragraph(f"<i>{invoice.amount_in_words}</i>", styles['Normal'])]
+
+    template = invoice.template
+    payment_lines = []
+    if template.bank_upi_id:
+        payment_lines.append(f"<b>UPI:</b> {template.bank_upi_id}")
+    if template.bank_account_number:
+        payment_lines.append(
+            f"<b>Bank:</b> {template.bank_name} | A/C {template.bank_account_number} | "
+            f"IFSC {template.bank_ifsc} | {template.bank_account_holder}"
+        )
+    if payment_lines:
+        story += [Spacer(1, 6 * mm), Paragraph("<b>Payment Details</b>", styles['Heading4']),
+                  Paragraph('<br/>'.join(payment_lines), styles['Normal'])]
+    if invoice.payment_terms:
+        story += [Spacer(1, 4 * mm), Paragraph(invoice.payment_terms.replace('\n', '<br/>'), styles['Normal'])]
+    story += [Spacer(1, 8 * mm), Paragraph(template.footer_note, styles['Italic'])]
+
+    doc.build(story)
+    return buffer.getvalue()
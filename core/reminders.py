@@ -0,0 +1,139 @@
+"""
+Payment due and overdue reminder emails.
+
+Each run finds every pending payment that needs a reminder with one query on
+the (status, due_date) index, claims the reminders by inserting
+PaymentReminder rows (unique per payment and kind, so overlapping runs can't
+claim the same one), renders the emails from layouts compiled once per
+template version (see core.emails) and sends them over one connection per
+tenant, using that tenant's email settings and company details.
+Messages go out one at a time over that connection and each is marked sent
+as soon as it is delivered, so a failure part-way never sends one twice.
+Reminders that fail to send are released so the next run retries them, and
+a claim left unsent for CLAIM_TIMEOUT (a run that died before it could
+release it) can be claimed again.
+"""
+import uuid
+from collections import defaultdict
+from datetime import timedelta
+
+from django.db.models import Exists, OuterRef, Q
+from django.utils import timezone
+
+from .emails import email_message, payment_reminder_fields
+from .invoicing import active_email_settings, email_connection
+from .models import InvoiceTemplate, Payment, PaymentReminder
+
+# Send the "Payment Due" email this many days before the due date
+DUE_LEAD_DAYS = 3
+# Send the "Overdue" email once the payment is this many days late
+OVERDUE_AFTER_DAYS = 1
+# A claim still unsent after this long belongs to a run that died; it can be claimed again
+CLAIM_TIMEOUT = timedelta(hours=1)
+
+EMAIL_KINDS = {
+    'DUE': 'PAYMENT_DUE',
+    'OVERDUE': 'PAYMENT_OVERDUE',
+}
+
+
+def pending_reminders(today=None, lead_days=DUE_LEAD_DAYS, overdue_after=OVERDUE_AFTER_DAYS):
+    """Return [(payment, kind)] for reminders that are due and not yet sent"""
+    today = today or timezone.now().date()
+    overdue_before = today - timedelta(days=overdue_after)
+    sent = PaymentReminder.objects.filter(
+        Q(sent_at__isnull=False) | Q(claimed_at__gte=timezone.now() - CLAIM_TIMEOUT), payment=OuterRef('pk'),
+    )
+    payments = Payment.objects.filter(
+        Q(due_date__gte=today, due_date__lte=today + timedelta(days=lead_days)) | Q(due_date__lte=overdue_before),
+        status='PENDING',
+    ).annotate(
+        due_sent=Exists(sent.filter(kind='DUE')),
+        overdue_sent=Exists(sent.filter(kind='OVERDUE')),
+    ).select_related('subscription__athlete', 'subscription__billing_plan', 'invoice').order_by('due_date', 'pk')
+
+    reminders = []
+    for payment in payments:
+        if payment.due_date >= today:
+            if not payment.due_sent:
+                reminders.append((payment, 'DUE'))
+        elif not payment.overdue_sent:
+            reminders.append((payment, 'OVERDUE'))
+    return reminders
+
+
+def claim(reminders):
+    """Record reminders as claimed by this run; returns the ones this run now owns"""
+    token = uuid.uuid4()
+    now = timezone.now()
+    # Take over stale claims; the unique (payment, kind) still lets only one run win each reminder
+    PaymentReminder.objects.filter(
+        sent_at__isnull=True, claimed_at__lt=now - CLAIM_TIMEOUT, payment__in=[payment for payment, _ in reminders],
+    ).delete()
+    PaymentReminder.objects.bulk_create(
+        [
+            PaymentReminder(tenant_id=payment.tenant_id, payment=payment, kind=kind, claim=token, claimed_at=now)
+            for payment, kind in reminders
+        ],
+        batch_size=500,
+        ignore_conflicts=True,
+    )
+    owned = dict(
+        ((payment_id, kind), pk)
+        for pk, payment_id, kind in PaymentReminder.objects.filter(claim=token).values_list('pk', 'payment_id', 'kind')
+    )
+    return [(payment, kind, owned[payment.pk, kind]) for payment, kind in reminders if (payment.pk, kind) in owned]
+
+
+def build_message(payment, kind, company, settings, today):
+    fields = payment_reminder_fields(payment, today)
+    return email_message(
+        EMAIL_KINDS[kind], company, settings, payment.subscription.athlete.email,
+        has_invoice=bool(fields['invoice_number']), **fields,
+    )
+
+
+def send_payment_reminders(today=None, lead_days=DUE_LEAD_DAYS, overdue_after=OVERDUE_AFTER_DAYS,
+                           batch_size=100, dry_run=False):
+    """Send all due reminders; returns the number of emails sent (or that would be sent)"""
+    today = today or timezone.now().date()
+    reminders = pending_reminders(today, lead_days, overdue_after)
+    if dry_run or not reminders:
+        return len(reminders)
+
+    settings_by_tenant = active_email_settings()
+    reminders = [(payment, kind) for payment, kind in reminders if payment.tenant_id in settings_by_tenant]
+    if not reminders:
+        return 0
+    companies = {
+        template.tenant_id: template
+        for template in InvoiceTemplate.objects.filter(is_default=True, tenant_id__in=settings_by_tenant)
+    }
+
+    by_tenant = defaultdict(list)
+    for reminder in claim(reminders):
+        by_tenant[reminder[0].tenant_id].append(reminder)
+
+    sent = 0
+    unsent = {pk for claimed in by_tenant.values() for _, _, pk in claimed}
+    try:
+        for tenant_id, claimed in by_tenant.items():
+            settings, company = settings_by_tenant[tenant_id], companies.get(tenant_id)
+            with email_connection(settings) as connection:
+                for start in range(0, len(claimed), batch_size):
+                    delivered = []
+                    try:
+                        for payment, kind, pk in claimed[start:start + batch_size]:
+                            connection.send_messages([build_message(payment, kind, company, settings, today)])
+                            delivered.append(pk)
+                    finally:
+                        # Record what went out, even when a later message in the batch failed
+                        if delivered:
+                            PaymentReminder.objects.filter(pk__in=delivered).update(sent_at=timezone.now())
+                            unsent.difference_update(delivered)
+                            sent += len(delivered)
+    except Exception:
+        # Release the undelivered claims (this tenant's and later ones) so a later run retries them
+        PaymentReminder.objects.filter(pk__in=unsent).delete()
+        raise
+    return sent
@@ -0,0 +1,48 @@
+"""
+Revenue and tax reports over InvoiceLine.
+
+Each report is a single GROUP BY over the invoice-line table restricted by
+invoice date (indexed), instead of decoding every invoice's line_items JSON.
+Cancelled invoices are excluded. Reports read from the replica when one is
+configured and healthy (see core.routing).
+"""
+from django.db.models import Count, Sum
+from django.db.models.functions import TruncMonth
+
+from .models import InvoiceLine
+from .routing import use_replica
+
+TOTALS = {
+    'invoices': Count('invoice', distinct=True),
+    'quantity': Sum('quantity'),
+    'gross': Sum('amount'),
+    'taxable': Sum('taxable_amount'),
+    'tax': Sum('tax_amount'),
+}
+
+
+def _lines(start, end):
+    """Lines of non-cancelled invoices dated start..end (inclusive)"""
+    return InvoiceLine.objects.filter(invoice_date__range=(start, end)).exclude(invoice__status='CANCELLED')
+
+
+@use_replica()
+def revenue_by_hsn(start, end):
+    """HSN/SAC-wise summary (as needed for GST returns)"""
+    return list(_lines(start, end).values('hsn_sac').annotate(**TOTALS).order_by('hsn_sac'))
+
+
+@use_replica()
+def revenue_by_plan(start, end):
+    return list(
+        _lines(start, end).values('billing_plan', 'billing_plan__name').annotate(**TOTALS)
+        .order_by('-gross')
+    )
+
+
+@use_replica()
+def revenue_by_month(start, end):
+    return list(
+        _lines(start, end).annotate(month=TruncMonth('invoice_date')).values('month')
+        .annotate(**TOTALS).order_by('month')
+    )
@@ -0,0 +1,213 @@
+"""
+Review snapshots ("Athlete Review Dashboard").
+
+Before a weekly or monthly feedback call the coach needs the same dozen
+figures for the period under review, each compared with the period before
+it. `update_snapshots(period)` computes them for every athlete at once and
+stores one ReviewSession row per athlete and period. The row holds:
+
+- metrics_snapshot: workouts planned / completed / skipped / missed and the
+  completion rate (rest days excluded), distance, duration, TSS, longest
+  session, pace, active days and completions per workout type, plus the
+  amounts billed and paid in the period and what is still outstanding;
+- deltas: the change of each figure since the previous period.
+
+Both periods are read together: one grouped query each over Workout,
+WorkoutCompletion and Payment, with a CASE bucketing rows into the current
+or previous period, whatever the number of athletes. Figures with no
+data (a pace without any timed distance, say) are left out to keep the
+JSON small. Re-running only refreshes the figures; the coach's notes,
+action items and goals on an existing row are left alone.
+
+Weeks run Monday to Sunday, months are calendar months. The scheduled job
+snapshots the period containing yesterday, so each night brings the
+current period up to date and the first run after it ends finalises it.
+"""
+from collections import defaultdict
+from datetime import timedelta
+
+from django.db import transaction
+from django.db.models import Case, Count, IntegerField, Max, Q, Sum, Value, When
+from django.utils import timezone
+
+from .lifecycle import add_months
+from .models import Athlete, Payment, ReviewSession, Workout, WorkoutCompletion
+from .routing import use_replica
+
+CURRENT, PREVIOUS = 1, 0
+
+# Display order and labels of the snapshot figures
+LABELS = {
+    'planned': "Workouts planned",
+    'completed': "Workouts completed",
+    'completion_rate': "Completion rate (%)",
+    'skipped': "Skipped",
+    'missed': "Missed",
+    'active_days': "Active days",
+    'distance': "Distance (km)",
+    'duration': "Duration (min)",
+    'tss': "Total TSS",
+    'long_run': "Longest session (km)",
+    'pace': "Pace (min/km)",
+    'billed': "Billed (₹)",
+    'paid': "Paid (₹)",
+    'outstanding': "Outstanding (₹)",
+}
+
+# Point-in-time figures that have no meaningful previous-period value
+NO_DELTA = {'outstanding', 'types'}
+
+
+def period_bounds(period, day):
+    """(first day, last day) of the WEEKLY or MONTHLY period containing `day`"""
+    if period == 'WEEKLY':
+        start = day - timedelta(days=day.weekday())
+        return start, start + timedelta(days=6)
+    start = day.replace(day=1)
+    return start, add_months(start, 1) - timedelta(days=1)
+
+
+def _bucket(field, current_start):
+    return Case(
+        When(**{f'{field}__gte': current_start}, then=Value(CURRENT)),
+        default=Value(PREVIOUS), output_field=IntegerField(),
+    )
+
+
+def _number(value, places=2):
+    value = round(float(value), places)
+    return int(value) if value.is_integer() else value
+
+
+def _snapshot(totals):
+    snapshot = {
+        'planned': totals['planned'],
+        'completed': totals['done'],
+        'skipped': totals['skipped'],
+        'missed': totals['missed'],
+        'active_days': totals['active_days'],
+        'distance': _number(totals['distance']),
+        'duration': totals['duration'],
+        'tss': totals['tss'],
+        'billed': _number(totals['billed']),
+        'paid': _number(totals['paid']),
+    }
+    if totals['planned']:
+        snapshot['completion_rate'] = _number(100 * totals['done'] / totals['planned'], 1)
+    if totals['long_run']:
+        snapshot['long_run'] = _number(totals['long_run'])
+    if totals['paced_distance']:
+        snapshot['pace'] = _number(totals['paced_minutes'] / float(totals['paced_distance']))
+    if totals['outstanding']:
+        snapshot['outstanding'] = _number(totals['outstanding'])
+    if totals['types']:
+        snapshot['types'] = dict(sorted(totals['types'].items()))
+    return snapshot
+
+
+def deltas(current, previous):
+    """{metric: current - previous} for the figures present in both snapshots"""
+    return {
+        name: _number(value - previous[name])
+        for name, value in current.items()
+        if name not in NO_DELTA and name in previous
+    }
+
+
+@use_replica()
+def compute_snapshots(period, day):
+    """
+    ({athlete_id: tenant_id}, {athlete_id: snapshot}, {athlete_id: previous snapshot})
+    for the period containing `day`, in three grouped queries plus the roster
+    """
+    current_start, current_end = period_bounds(period, day)
+    previous_start, previous_end = period_bounds(period, current_start - timedelta(days=1))
+    window = (previous_start, current_end)
+    today = timezone.localdate()
+
+    totals = defaultdict(lambda: {
+        'planned': 0, 'done': 0, 'skipped': 0, 'missed': 0, 'active_days': 0, 'distance': 0, 'duration': 0,
+        'tss': 0, 'long_run': 0, 'paced_minutes': 0, 'paced_distance': 0, 'billed': 0, 'paid': 0,
+        'outstanding': 0, 'types': {},
+    })
+    tenants = dict(Athlete.objects.filter(summary__active_subscription__isnull=False).values_list('pk', 'tenant_id'))
+
+    workouts = Workout.objects.filter(date__range=window).exclude(workout_type='REST').values(
+        'athlete_id', 'tenant_id', 'workout_type', bucket=_bucket('date', current_start),
+    ).annotate(
+        planned=Count('pk'),
+        done=Count('pk', filter=Q(status='COMPLETED')),
+        skipped=Count('pk', filter=Q(status='SKIPPED')),
+        missed=Count('pk', filter=Q(status='UPCOMING', date__lt=today)),
+    ).order_by()
+    for row in workouts:
+        tenants[row['athlete_id']] = row['tenant_id']
+        entry = totals[row['athlete_id'], row['bucket']]
+        for name in ('planned', 'done', 'skipped', 'missed'):
+            entry[name] += row[name]
+        if row['done']:
+            entry['types'][row['workout_type']] = row['done']
+
+    paced = Q(actual_distance__gt=0, actual_duration__isnull=False)
+    completions = WorkoutCompletion.objects.filter(workout__date__range=window).exclude(
+        workout__workout_type='REST',
+    ).values('workout__athlete_id', 'tenant_id', bucket=_bucket('workout__date', current_start)).annotate(
+        active_days=Count('workout__date', distinct=True),
+        distance=Sum('actual_distance'),
+        duration=Sum('actual_duration'),
+        tss=Sum('actual_tss'),
+        long_run=Max('actual_distance'),
+        paced_minutes=Sum('actual_duration', filter=paced),
+        paced_distance=Sum('actual_distance', filter=paced),
+    ).order_by()
+    for row in completions:
+        tenants[row['workout__athlete_id']] = row['tenant_id']
+        entry = totals[row['workout__athlete_id'], row['bucket']]
+        for name in ('active_days', 'distance', 'duration', 'tss', 'long_run', 'paced_minutes', 'paced_distance'):
+            entry[name] = row[name] or 0
+
+    payments = Payment.objects.filter(
+        Q(due_date__range=window) | Q(payment_date__range=window) | Q(status='PENDING', due_date__lte=current_end),
+    ).values('subscription__athlete_id', 'tenant_id').annotate(
+        billed_current=Sum('amount', filter=Q(due_date__range=(current_start, current_end))),
+        billed_previous=Sum('amount', filter=Q(due_date__range=(previous_start, previous_end))),
+        paid_current=Sum('amount', filter=Q(status='PAID', payment_date__range=(current_start, current_end))),
+        paid_previous=Sum('amount', filter=Q(status='PAID', payment_date__range=(previous_start, previous_end))),
+        outstanding=Sum('amount', filter=Q(status='PENDING', due_date__lte=current_end)),
+    ).order_by()
+    for row in payments:
+        athlete_id = row['subscription__athlete_id']
+        tenants[athlete_id] = row['tenant_id']
+        current, previous = totals[athlete_id, CURRENT], totals[athlete_id, PREVIOUS]
+        current['billed'], previous['billed'] = row['billed_current'] or 0, row['billed_previous'] or 0
+        current['paid'], previous['paid'] = row['paid_current'] or 0, row['paid_previous'] or 0
+        current['outstanding'] = row['outstanding'] or 0
+
+    return (
+        tenants,
+        {athlete_id: _snapshot(totals[athlete_id, CURRENT]) for athlete_id in tenants},
+        {athlete_id: _snapshot(totals[athlete_id, PREVIOUS]) for athlete_id in tenants},
+    )
+
+
+def update_snapshots(period, day=None, batch_size=1000):
+    """Store the snapshot of the period containing `day` (default yesterday) for every athlete; returns rows written"""
+    day = day or timezone.localdate() - timedelta(days=1)
+    period_start, period_end = period_bounds(period, day)
+    tenants, current, previous = compute_snapshots(period, day)
+    now = timezone.now()
+    sessions = [
+        ReviewSession(
+            tenant_id=tenant_id, athlete_id=athlete_id, period=period, period_start=period_start,
+            period_end=period_end, metrics_snapshot=current[athlete_id],
+            deltas=deltas(current[athlete_id], previous[athlete_id]), computed_at=now,
+        )
+        for athlete_id, tenant_id in tenants.items()
+    ]
+    with transaction.atomic():
+        ReviewSession.objects.bulk_create(
+            sessions, batch_size=batch_size, update_conflicts=True,
+            unique_fields=['athlete', 'period', 'period_start'],
+            update_fields=['period_end', 'metrics_snapshot', 'deltas', 'computed_at', 'updated_at'],
+        )
+    return len(sessions)
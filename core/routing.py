@@ -0,0 +1,175 @@
+"""
+Read-replica routing for analytics and reporting.
+
+Reads go to the primary unless the code opts in with `use_replica()` (as the
+reports, churn feature extraction and the read-only admin changelists do),
+and even then only when:
+
+- a `replica` database is configured (REPLICA_DATABASE_URL),
+- its last health check passed: it answered, and on PostgreSQL its replay
+  lag was under REPLICA_MAX_LAG_SECONDS (checked at most every
+  REPLICA_HEALTH_CHECK_SECONDS),
+- no transaction is open on the primary, and
+- nothing was written recently. A request that writes pins itself, and the
+  client via a short-lived cookie, to the primary for
+  READ_YOUR_WRITES_SECONDS so the redirect after a save never shows stale
+  data; outside requests the pin is per process.
+
+Writes always go to the primary. To try it locally, point
+REPLICA_DATABASE_URL at a second database (e.g. sqlite:///replica.sqlite3)
+and `manage.py migrate --database replica`, or at a PostgreSQL standby.
+"""
+import contextvars
+import logging
+import threading
+import time
+from contextlib import ContextDecorator
+
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS, connections
+
+logger = logging.getLogger(__name__)
+
+REPLICA_ALIAS = 'replica'
+PIN_COOKIE = 'primary_pin'
+
+_use_replica = contextvars.ContextVar('use_replica', default=False)
+# Per-request {'pinned': bool, 'wrote': bool}; None outside requests
+_request = contextvars.ContextVar('replica_request', default=None)
+_last_write = 0.0
+
+# PostgreSQL standby lag in seconds; 0 when fully replayed or not a standby
+LAG_SQL = (
+    "SELECT CASE WHEN pg_last_wal_receive_lsn() = pg_last_wal_replay_lsn() THEN 0 "
+    "ELSE COALESCE(EXTRACT(EPOCH FROM now() - pg_last_xact_replay_timestamp()), 0) END"
+)
+
+
+def _setting(name, default):
+    return getattr(settings, name, default)
+
+
+def replica_configured():
+    return REPLICA_ALIAS in settings.DATABASES
+
+
+class use_replica(ContextDecorator):
+    """Allow reads inside the block (or decorated function) to be served by the replica"""
+
+    def _recreate_cm(self):
+        # A fresh instance per decorated call, so concurrent calls don't share a token
+        return type(self)()
+
+    def __enter__(self):
+        self._token = _use_replica.set(True)
+
+    def __exit__(self, *exc):
+        _use_replica.reset(self._token)
+
+
+class ReplicaHealth:
+    """Periodic, cached health check of the replica connection"""
+
+    def __init__(self, alias=REPLICA_ALIAS):
+        self.alias = alias
+        self._healthy = False
+        self._checked_at = None
+        self._lock = threading.Lock()
+
+    def is_healthy(self):
+        interval = _setting('REPLICA_HEALTH_CHECK_SECONDS', 30.0)
+        with self._lock:
+            if self._checked_at is not None and time.monotonic() - self._checked_at < interval:
+                return self._healthy
+            # Claim this check so concurrent callers keep the previous answer meanwhile
+            self._checked_at = time.monotonic()
+        healthy = self.check()
+        with self._lock:
+            self._healthy = healthy
+        return healthy
+
+    def check(self):
+        """Probe the replica now; False (and log why) if it is down or lagging"""
+        connection = connections[self.alias]
+        try:
+            with connection.cursor() as cursor:
+                if connection.vendor == 'postgresql':
+                    cursor.execute(LAG_SQL)
+                    lag = float(cursor.fetchone()[0] or 0)
+                else:
+                    cursor.execute("SELECT 1")
+                    lag = 0.0
+        except Exception as exc:
+            logger.warning("Replica %r unavailable, reading from primary: %s", self.alias, exc)
+            connection.close()
+            return False
+        max_lag = _setting('REPLICA_MAX_LAG_SECONDS', 30.0)
+        if lag > max_lag:
+            logger.warning("Replica %r is %.1fs behind, reading from primary", self.alias, lag)
+            return False
+        return True
+
+    def reset(self):
+        with self._lock:
+            self._checked_at = None
+
+
+health = ReplicaHealth()
+
+
+def pinned_to_primary():
+    state = _request.get()
+    if state is not None:
+        return state['pinned'] or state['wrote']
+    return time.monotonic() - _last_write < _setting('READ_YOUR_WRITES_SECONDS', 10.0)
+
+
+def record_write():
+    global _last_write
+    state = _request.get()
+    if state is not None:
+        state['wrote'] = True
+    else:
+        _last_write = time.monotonic()
+
+
+class ReplicaRouter:
+    """Send opted-in reads to the replica when it is safe to; everything else to the primary"""
+
+    def db_for_read(self, model, **hints):
+        if not _use_replica.get() or not replica_configured():
+            return None
+        if connections[DEFAULT_DB_ALIAS].in_atomic_block or pinned_to_primary():
+            return DEFAULT_DB_ALIAS
+        return REPLICA_ALIAS if health.is_healthy() else DEFAULT_DB_ALIAS
+
+    def db_for_write(self, model, **hints):
+        # Session bookkeeping is never read through the replica
+        if model._meta.app_label != 'sessions':
+            record_write()
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        aliases = {DEFAULT_DB_ALIAS, REPLICA_ALIAS}
+        if obj1._state.db in aliases and obj2._state.db in aliases:
+            return True
+        return None
+
+
+class ReadYourWritesMiddleware:
+    """Keep a client on the primary for a short while after any request of theirs wrote"""
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        state = {'pinned': PIN_COOKIE in request.COOKIES, 'wrote': False}
+        token = _request.set(state)
+        try:
+            response = self.get_response(request)
+        finally:
+            _request.reset(token)
+        if state['wrote'] and replica_configured():
+            seconds = _setting('READ_YOUR_WRITES_SECONDS', 10.0)
+            response.set_cookie(PIN_COOKIE, '1', max_age=max(int(seconds), 1), httponly=True, samesite='Lax')
+        return response
@@ -0,0 +1,115 @@
+"""
+Bulk workout rescheduling.
+
+Shifting a block of an athlete's plan is done with set-based UPDATEs so an
+injury break that pushes back months of workouts costs a few queries
+regardless of how many rows move.
+"""
+from datetime import timedelta
+
+from django.core.exceptions import ValidationError
+from django.db import transaction
+from django.db.models import DateField, ExpressionWrapper, F, Min
+from django.db.models.functions import Coalesce
+from django.utils import timezone
+
+from .models import Workout
+from .summary import refresh_athletes
+
+# Only workouts that have not happened yet are moved by default
+MOVABLE_STATUSES = ['UPCOMING', 'RESCHEDULED']
+
+
+def _shifted(expression, days):
+    return ExpressionWrapper(expression + timedelta(days=days), output_field=DateField())
+
+
+def reschedule_workouts(athlete, start_date, days, end_date=None, workout_ids=None,
+                        statuses=MOVABLE_STATUSES, on_conflict='error'):
+    """
+    Shift an athlete's workouts dated start_date..end_date (inclusive, open-ended
+    when end_date is None) by `days` days.
+
+    Moved workouts are marked RESCHEDULED and keep the date they were first
+    planned for in original_date. A moved workout whose new date clashes with a
+    workout that is not moving (same athlete, date and workout_type) is a
+    conflict: on_conflict='error' raises ValidationError listing them,
+    on_conflict='skip' leaves those workouts where they are.
+
+    Returns (moved, skipped) as counts.
+    """
+    if on_conflict not in ('error', 'skip'):
+        raise ValueError("on_conflict must be 'error' or 'skip'")
+    if not days:
+        return 0, 0
+
+    with transaction.atomic():
+        athlete_workouts = Workout.objects.filter(athlete=athlete)
+        moving = athlete_workouts.filter(date__gte=start_date)
+        if end_date is not None:
+            moving = moving.filter(date__lte=end_date)
+        if workout_ids is not None:
+            moving = moving.filter(pk__in=workout_ids)
+        if statuses:
+            moving = moving.filter(status__in=statuses)
+        moving = moving.select_for_update()
+
+        rows = list(moving.order_by('date', 'pk').values_list('pk', 'date', 'workout_type'))
+        if not rows:
+            return 0, 0
+        moving_ids = {pk for pk, _, _ in rows}
+
+        # Slots on the target dates held by workouts that are not moving
+        occupied = {
+            (date, workout_type)
+            for pk, date, workout_type in athlete_workouts.filter(
+                date__gte=rows[0][1] + timedelta(days=days),
+                date__lte=rows[-1][1] + timedelta(days=days),
+            ).values_list('pk', 'date', 'workout_type')
+            if pk not in moving_ids
+        }
+        conflicts = [
+            (date, workout_type) for _, date, workout_type in rows
+            if (date + timedelta(days=days), workout_type) in occupied
+        ]
+        if conflicts and on_conflict == 'error':
+            raise ValidationError(
+                "Rescheduling would clash with existing workouts: %s" % ', '.join(
+                    f"{workout_type} on {date + timedelta(days=days)}"
+                    for date, workout_type in conflicts
+                )
+            )
+
+        # A skipped workout stays put and may in turn block the workout that
+        # would have moved onto its date, so resolve from the leading edge of
+        # the shift backwards.
+        skipped = 0
+        if conflicts:
+            for pk, date, workout_type in sorted(rows, key=lambda row: row[1], reverse=days > 0):
+                if (date + timedelta(days=days), workout_type) in occupied:
+                    occupied.add((date, workout_type))
+                    moving_ids.discard(pk)
+                    skipped += 1
+            if not moving_ids:
+                return 0, skipped
+
+        # The unique (athlete, date, workout_type) constraint is checked row by
+        # row, so moved workouts can collide with each other mid-UPDATE. Park
+        # the block before the athlete's earliest workout first, then move it
+        # to its final dates. Parking further back than the shift keeps every
+        # final date clear of the rows still parked.
+        block = Workout.objects.filter(pk__in=moving_ids)
+        earliest = athlete_workouts.aggregate(first=Min('date'))['first']
+        parking = (rows[-1][1] - earliest).days + abs(days) + 1
+
+        block.update(
+            original_date=Coalesce('original_date', 'date'),
+            date=_shifted(F('date'), -parking),
+        )
+        moved = block.update(
+            date=_shifted(F('date'), parking + days),
+            status='RESCHEDULED',
+            updated_at=timezone.now(),
+        )
+        refresh_athletes([athlete.pk])
+    return moved, skipped
@@ -0,0 +1,161 @@
+"""
+Full-text search over athlete profiles, workouts and completion notes.
+
+Searchable text is copied into SearchEntry rows when the source object is
+saved. The database does the indexing:
+
+- PostgreSQL: a generated, weighted tsvector column with a GIN index
+- SQLite: an external-content FTS5 table kept in sync by triggers
+
+Both are created by migration 0004. Other backends fall back to icontains.
+Entries left behind by deleted workouts/completions are ignored when hits
+are resolved and are purged by `manage.py rebuild_search_index`.
+
+SearchEntry has no tenant column of its own (adding one would rebuild the
+table under the FTS triggers); searches are limited to the current tenant's
+athletes instead.
+"""
+import re
+from collections import namedtuple
+
+from django.db import connection
+
+from .models import Athlete, SearchEntry, Workout, WorkoutCompletion
+from .tenancy import current_tenant_id
+
+SearchHit = namedtuple('SearchHit', ['kind', 'object_id', 'athlete_id', 'rank'])
+
+FTS_TABLE = 'core_searchentry_fts'
+
+# Relative weight of the title column against the body in ranking
+TITLE_WEIGHT = 10.0
+
+
+def _join(*parts):
+    return '\n'.join(part for part in parts if part)
+
+
+def entry_for(instance):
+    """Build the (unsaved) SearchEntry for an Athlete, Workout or WorkoutCompletion"""
+    if isinstance(instance, Athlete):
+        return SearchEntry(
+            kind='ATHLETE', object_id=instance.pk, athlete_id=instance.pk,
+            title=instance.name, body=_join(instance.profile, instance.goals),
+        )
+    if isinstance(instance, Workout):
+        return SearchEntry(
+            kind='WORKOUT', object_id=instance.pk, athlete_id=instance.athlete_id,
+            title=instance.title, body=_join(instance.description, instance.coach_notes),
+        )
+    if isinstance(instance, WorkoutCompletion):
+        return SearchEntry(
+            kind='COMPLETION', object_id=instance.pk, athlete_id=instance.workout.athlete_id,
+            title=instance.workout.title, body=_join(instance.athlete_comments, instance.coach_feedback),
+        )
+    raise TypeError(f"{type(instance).__name__} is not searchable")
+
+
+def index_entries(entries, batch_size=500):
+    """Insert or refresh search entries with a single upsert per batch"""
+    SearchEntry.objects.bulk_create(
+        entries,
+        batch_size=batch_size,
+        update_conflicts=True,
+        unique_fields=['kind', 'object_id'],
+        update_fields=['athlete', 'title', 'body', 'updated_at'],
+    )
+
+
+def index_instance(instance):
+    index_entries([entry_for(instance)])
+
+
+def rebuild_index(chunk_size=2000):
+    """Re-index everything from scratch; returns the number of entries written"""
+    SearchEntry.objects.all().delete()
+    sources = [
+        Athlete.unscoped.only('name', 'profile', 'goals'),
+        Workout.unscoped.only('athlete', 'title', 'description', 'coach_notes'),
+        WorkoutCompletion.unscoped.select_related('workout').only(
+            'workout__athlete', 'workout__title', 'athlete_comments', 'coach_feedback'
+        ),
+    ]
+    total = 0
+    for queryset in sources:
+        batch = []
+        for instance in queryset.iterator(chunk_size=chunk_size):
+            batch.append(entry_for(instance))
+            if len(batch) >= chunk_size:
+                index_entries(batch)
+                total += len(batch)
+                batch = []
+        index_entries(batch)
+        total += len(batch)
+    return total
+
+
+def _fts5_query(query):
+    """Turn free text into an FTS5 prefix query that cannot raise syntax errors"""
+    return ' '.join('"%s"*' % token.replace('"', '""') for token in re.findall(r'\w+', query))
+
+
+def _kind_filter(kinds, column):
+    if not kinds:
+        return '', []
+    return f" AND {column} IN ({', '.join(['%s'] * len(kinds))})", list(kinds)
+
+
+def _tenant_filter(column):
+    tenant_id = current_tenant_id()
+    if tenant_id is None:
+        return '', []
+    return f" AND {column} IN (SELECT id FROM core_athlete WHERE tenant_id = %s)", [tenant_id]
+
+
+def search(query, kinds=None, limit=100):
+    """Return up to `limit` SearchHits for `query`, best match first"""
+    if not query or not query.strip():
+        return []
+
+    if connection.vendor == 'postgresql':
+        kind_sql, kind_params = _kind_filter(kinds, 'kind')
+        tenant_sql, tenant_params = _tenant_filter('athlete_id')
+        sql = (
+            "SELECT kind, object_id, athlete_id, ts_rank(search_vector, query) AS rank "
+            "FROM core_searchentry, websearch_to_tsquery('english', %s) query "
+            "WHERE search_vector @@ query" + kind_sql + tenant_sql +
+            " ORDER BY rank DESC LIMIT %s"
+        )
+        params = [query, *kind_params, *tenant_params, limit]
+    elif connection.vendor == 'sqlite':
+        match = _fts5_query(query)
+        if not match:
+            return []
+        kind_sql, kind_params = _kind_filter(kinds, 'e.kind')
+        tenant_sql, tenant_params = _tenant_filter('e.athlete_id')
+        sql = (
+            f"SELECT e.kind, e.object_id, e.athlete_id, -bm25({FTS_TABLE}, {TITLE_WEIGHT}, 1.0) AS rank "
+            f"FROM {FTS_TABLE} JOIN core_searchentry e ON e.id = {FTS_TABLE}.rowid "
+            f"WHERE {FTS_TABLE} MATCH %s" + kind_sql + tenant_sql +
+            " ORDER BY rank DESC LIMIT %s"
+        )
+        params = [match, *kind_params, *tenant_params, limit]
+    else:
+        entries = SearchEntry.objects.filter(body__icontains=query) | SearchEntry.objects.filter(title__icontains=query)
+        if kinds:
+            entries = entries.filter(kind__in=kinds)
+        if current_tenant_id() is not None:
+            entries = entries.filter(athlete__tenant_id=current_tenant_id())
+        return [
+            SearchHit(kind, object_id, athlete_id, 0.0)
+            for kind, object_id, athlete_id in entries.values_list('kind', 'object_id', 'athlete_id')[:limit]
+        ]
+
+    with connection.cursor() as cursor:
+        cursor.execute(sql, params)
+        return [SearchHit(*row) for row in cursor.fetchall()]
+
+
+def search_ids(query, kind, limit=1000):
+    """Primary keys of the best-matching objects of one kind"""
+    return [hit.object_id for hit in search(query, kinds=[kind], limit=limit)]
@@ -0,0 +1,512 @@
+"""
+Build pipeline for the docs/ marketing site.
+
+`build()` reads the hand-edited site in the source directory and writes a
+deployable copy to the output directory (docs/dist by default):
+
+- every <img> becomes a <picture> with AVIF and WebP sources and a JPEG
+  fallback, each in several widths with srcset/sizes and intrinsic
+  width/height. A fixed `sizes="80px"` on the source <img> yields 1x/2x/3x
+  variants; otherwise a breakpoint ladder up to the original width is used.
+  Images below the fold are lazy-loaded;
+- local stylesheets and scripts are minified and fingerprinted
+  (style.<hash>.css), so they can be served with far-future cache headers;
+- the CSS rules that apply to the header and first section (the above-the-fold
+  content) are inlined, and the full stylesheet is loaded without blocking
+  render.
+
+Builds are incremental: .build-manifest.json in the output directory records
+each asset's source hash and outputs, and unchanged assets are not
+re-encoded. Outputs no longer referenced are removed.
+"""
+import hashlib
+import html
+import json
+import re
+from collections import namedtuple
+from io import BytesIO
+from pathlib import Path
+
+from django.core.exceptions import ValidationError
+from PIL import Image, ImageOps, features
+
+# Bump to invalidate every cached asset when the encoders or their settings change
+BUILD_VERSION = 1
+MANIFEST_NAME = '.build-manifest.json'
+
+# Widths tried for images without a fixed display size
+BREAKPOINT_WIDTHS = (320, 480, 640, 960, 1280, 1600, 1920)
+IMAGE_FORMATS = (
+    # (extension, Pillow format, MIME type, save options)
+    ('avif', 'AVIF', 'image/avif', {'quality': 50, 'speed': 6}),
+    ('webp', 'WEBP', 'image/webp', {'quality': 75, 'method': 6}),
+    ('jpg', 'JPEG', 'image/jpeg', {'quality': 80, 'optimize': True, 'progressive': True}),
+)
+FALLBACK_EXTENSION = 'jpg'
+
+AssetReport = namedtuple('AssetReport', ['name', 'original_bytes', 'output_bytes', 'status', 'note'])
+
+_STRING = r'"(?:\\.|[^"\\\n])*"|\'(?:\\.|[^\'\\\n])*\''
+_ATTRIBUTE = re.compile(r'([\w:-]+)(?:\s*=\s*("[^"]*"|\'[^\']*\'|[^\s>]+))?')
+
+
+def _digest(data, length=10):
+    return hashlib.sha256(data).hexdigest()[:length]
+
+
+def _is_local(url):
+    return bool(url) and not re.match(r'^([a-z][a-z0-9+.-]*:|//|#)', url, re.I)
+
+
+# CSS
+
+def minify_css(css):
+    """CSS without comments and insignificant whitespace; strings are left untouched"""
+    css = re.sub(r'(%s)|/\*.*?\*/' % _STRING, lambda match: match.group(1) or '', css, flags=re.S)
+    parts = re.split(r'(%s)' % _STRING, css)
+    for index in range(0, len(parts), 2):
+        part = re.sub(r'\s+', ' ', parts[index])
+        part = re.sub(r'\s*([{};,>~])\s*', r'\1', part)
+        parts[index] = re.sub(r':\s+', ':', part)
+    return re.sub(r';+}', '}', ''.join(parts)).strip()
+
+
+def _skip_string(text, index):
+    """Index just past the string literal (or template literal) opening at `index`"""
+    quote, index = text[index], index + 1
+    while index < len(text):
+        if text[index] == '\\':
+            index += 2
+            continue
+        if text[index] == quote:
+            return index + 1
+        index += 1
+    return index
+
+
+def _block_end(css, index):
+    """Index of the '}' closing the block opened at `index`"""
+    depth = 0
+    while index < len(css):
+        char = css[index]
+        if char in '"\'':
+            index = _skip_string(css, index)
+            continue
+        if char == '{':
+            depth += 1
+        elif char == '}':
+            depth -= 1
+            if depth == 0:
+                return index
+        index += 1
+    return index
+
+
+def _parse_css(css, index=0):
+    """
+    Minified CSS as nodes: ('rule', prelude, body), ('group', prelude,
+    children) for @media/@supports, and ('statement', text) for @import etc.
+    Returns (nodes, index of the closing '}' or end).
+    """
+    nodes, start = [], index
+    while index < len(css):
+        char = css[index]
+        if char in '"\'':
+            index = _skip_string(css, index)
+            continue
+        if char == ';':
+            nodes.append(('statement', css[start:index + 1]))
+        elif char == '{':
+            prelude = css[start:index].strip()
+            if prelude.startswith(('@media', '@supports')):
+                children, index = _parse_css(css, index + 1)
+                nodes.append(('group', prelude, children))
+            else:
+                end = _block_end(css, index)
+                nodes.append(('rule', prelude, css[index + 1:end]))
+                index = end
+        elif char == '}':
+            return nodes, index
+        else:
+            index += 1
+            continue
+        index += 1
+        start = index
+    return nodes, index
+
+
+def _serialize(nodes):
+    out = []
+    for node in nodes:
+        if node[0] == 'group':
+            inner = _serialize(node[2])
+            if inner:
+                out.append(f'{node[1]}{{{inner}}}')
+        elif node[0] == 'rule':
+            out.append(f'{node[1]}{{{node[2]}}}')
+        else:
+            out.append(node[1])
+    return ''.join(out)
+
+
+def _split_selectors(prelude):
+    """Top-level comma-separated selectors (commas inside :is(), :not() etc. don't split)"""
+    selectors, depth, start = [], 0, 0
+    for index, char in enumerate(prelude):
+        if char in '([':
+            depth += 1
+        elif char in ')]':
+            depth -= 1
+        elif char == ',' and depth == 0:
+            selectors.append(prelude[start:index])
+            start = index + 1
+    selectors.append(prelude[start:])
+    return [selector.strip() for selector in selectors if selector.strip()]
+
+
+def _selector_matches(selector, tags, classes, ids):
+    """True if every tag, class and id the selector names occurs in the fragment"""
+    selector = re.sub(r'\[[^\]]*\]', '', selector)
+    selector = re.sub(r'::?[\w-]+(\((?:[^()]|\([^()]*\))*\))?', '', selector)
+    for compound in re.split(r'[\s>+~]+', selector):
+        tag = re.match(r'[a-zA-Z][\w-]*', compound)
+        if tag and tag.group().lower() not in tags:
+            return False
+        if not set(re.findall(r'\.([\w-]+)', compound)) <= classes:
+            return False
+        if not set(re.findall(r'#([\w-]+)', compound)) <= ids:
+            return False
+    return True
+
+
+def _html_tokens(fragment):
+    tags = {tag.lower() for tag in re.findall(r'<([a-zA-Z][\w-]*)', fragment)} | {'html', 'body'}
+    classes = {name for value in re.findall(r'\bclass\s*=\s*["\']([^"\']*)', fragment) for name in value.split()}
+    ids = set(re.findall(r'\bid\s*=\s*["\']([^"\']*)', fragment))
+    return tags, classes, ids
+
+
+def critical_css(css, fragment):
+    """
+    The rules of (minified) `css` whose selectors only use tags, classes and
+    ids present in the HTML `fragment`, plus the @keyframes they animate with
+    """
+    tags, classes, ids = _html_tokens(fragment)
+    nodes, _ = _parse_css(css)
+    keyframes = {}
+
+    def select(nodes):
+        kept = []
+        for node in nodes:
+            if node[0] == 'group':
+                kept.append(('group', node[1], select(node[2])))
+            elif node[0] == 'rule' and re.match(r'@(-\w+-)?keyframes\s', node[1]):
+                keyframes[node[1].split()[-1]] = node
+            elif node[0] == 'rule' and not node[1].startswith('@'):
+                selectors = [
+                    selector for selector in _split_selectors(node[1])
+                    if _selector_matches(selector, tags, classes, ids)
+                ]
+                if selectors:
+                    kept.append(('rule', ','.join(selectors), node[2]))
+        return kept
+
+    kept = select(nodes)
+    animated = set(re.findall(r'animation(?:-name)?:([^;}]*)', _serialize(kept)))
+    names = {word for value in animated for word in re.findall(r'[\w-]+', value)}
+    kept += [node for name, node in keyframes.items() if name in names]
+    return _serialize(kept)
+
+
+# JavaScript
+
+_REGEX_PRECEDERS = set('(,=:[!&|?{};+-*%<>~^')
+_WORD = re.compile(r'[\w$]')
+
+
+def minify_js(source):
+    """
+    Conservative JS minification: drop comments and indentation, collapse
+    whitespace. Line breaks are kept where they may end a statement, so
+    automatic semicolon insertion behaves as before.
+    """
+    out, index, length = [], 0, len(source)
+
+    def last():
+        return out[-1][-1] if out and out[-1] else ''
+
+    while index < length:
+        char = source[index]
+        if char in '"\'`':
+            end = _skip_string(source, index)
+            out.append(source[index:end])
+            index = end
+        elif source.startswith('//', index):
+            end = source.find('\n', index)
+            index = length if end == -1 else end
+        elif source.startswith('/*', index):
+            end = source.find('*/', index + 2)
+            index = length if end == -1 else end + 2
+            out.append(' ')
+        elif char == '/' and (not out or last() in _REGEX_PRECEDERS or last() == '\n'):
+            end, in_class = index + 1, False
+            while end < length and (source[end] != '/' or in_class) and source[end] != '\n':
+                if source[end] == '\\':
+                    end += 1
+                elif source[end] in '[]':
+                    in_class = source[end] == '['
+                end += 1
+            out.append(source[index:end + 1])
+            index = end + 1
+        elif char.isspace():
+            end = index
+            while end < length and source[end].isspace():
+                end += 1
+            following = source[end:end + 1]
+            previous = last()
+            if previous and following:
+                if '\n' in source[index:end] and previous not in '{;,([\n':
+                    out.append('\n')
+                elif (_WORD.match(previous) and _WORD.match(following)) or (previous in '+-' and following in '+-'):
+                    out.append(' ')
+            index = end
+        else:
+            out.append(char)
+            index += 1
+    return ''.join(out).strip() + '\n'
+
+
+# Images
+
+def _target_widths(sizes, original_width):
+    """Widths to render for an image shown at `sizes`, never upscaled"""
+    fixed = re.fullmatch(r'\s*(\d+)px\s*', sizes or '')
+    targets = [int(fixed.group(1)) * density for density in (1, 2, 3)] if fixed else BREAKPOINT_WIDTHS
+    widths = [width for width in targets if width < original_width]
+    if len(widths) < len(targets):
+        widths.append(original_width)
+    return widths
+
+
+def _formats():
+    return [fmt for fmt in IMAGE_FORMATS if fmt[1] == 'JPEG' or features.check(fmt[0])]
+
+
+def render_image(path, widths):
+    """{extension: [(width, height, filename, bytes)]} for every width and format"""
+    with Image.open(path) as image:
+        image = ImageOps.exif_transpose(image)
+        image = image.convert('RGBA' if image.mode in ('RGBA', 'LA', 'P') else 'RGB')
+        source_hash = _digest(path.read_bytes(), 8)
+        variants = {}
+        for extension, pil_format, _, options in _formats():
+            variants[extension] = []
+            for width in widths:
+                height = round(image.height * width / image.width)
+                resized = image if width == image.width else image.resize((width, height), Image.LANCZOS)
+                if pil_format == 'JPEG' and resized.mode == 'RGBA':
+                    resized = resized.convert('RGB')
+                buffer = BytesIO()
+                resized.save(buffer, pil_format, **options)
+                name = f'{path.stem}.{source_hash}-{width}.{extension}'
+                variants[extension].append((width, height, name, buffer.getvalue()))
+    return variants
+
+
+def _picture(attributes, variants, sizes, lazy):
+    """<picture> markup for a parsed <img> and its {extension: [(width, height, filename)]} variants"""
+    def srcset(extension):
+        return ', '.join(f'{name} {width}w' for width, _, name in variants[extension])
+
+    fallback = variants[FALLBACK_EXTENSION]
+    width, height, src = fallback[-1]
+    attributes = dict(attributes, src=src, srcset=srcset(FALLBACK_EXTENSION), sizes=sizes,
+                      width=str(width), height=str(height), decoding='async')
+    if lazy:
+        attributes.setdefault('loading', 'lazy')
+    sources = ''.join(
+        f'<source type="{mime}" srcset="{srcset(extension)}" sizes="{html.escape(sizes)}">'
+        for extension, _, mime, _ in IMAGE_FORMATS if extension != FALLBACK_EXTENSION and extension in variants
+    )
+    img = ' '.join(['<img'] + [
+        name if value is None else f'{name}="{html.escape(value)}"' for name, value in attributes.items()
+    ]) + '>'
+    return f'<picture>{sources}{img}</picture>'
+
+
+def _attributes(tag):
+    return {
+        name.lower(): None if value is None else html.unescape(value.strip('"\''))
+        for name, value in _ATTRIBUTE.findall(re.sub(r'^<\w+', '', tag)[:-1])
+    }
+
+
+# Build
+
+class SiteBuilder:
+    """One build of a source directory into an output directory"""
+
+    def __init__(self, source_dir, output_dir, force=False):
+        self.source_dir = Path(source_dir)
+        self.output_dir = Path(output_dir)
+        self.force = force
+        self.previous = {} if force else self._load_manifest()
+        self.assets = {}
+        self.written = set()
+        self.reports = []
+
+    def _load_manifest(self):
+        path = self.output_dir / MANIFEST_NAME
+        try:
+            manifest = json.loads(path.read_text())
+        except (FileNotFoundError, ValueError):
+            return {}
+        return manifest['assets'] if manifest.get('version') == BUILD_VERSION else {}
+
+    def _cached(self, key, source_hash, **options):
+        entry = self.previous.get(key)
+        if not entry or entry['source'] != source_hash or entry['options'] != options:
+            return None
+        if not all((self.output_dir / name).exists() for name in entry['files']):
+            return None
+        return entry
+
+    def _write(self, name, data):
+        path = self.output_dir / name
+        if not path.exists() or path.read_bytes() != data:
+            path.write_bytes(data)
+        self.written.add(name)
+
+    def _source(self, url):
+        path = (self.source_dir / url.split('?')[0].split('#')[0]).resolve()
+        if self.source_dir.resolve() not in path.parents or not path.is_file():
+            raise ValidationError(f"{url} is referenced by the page but is not a file in {self.source_dir}.")
+        return path
+
+    def text_asset(self, url, minify):
+        """Fingerprinted filename of a minified stylesheet or script, and its minified text"""
+        path = self._source(url)
+        data = path.read_bytes()
+        key, source_hash = str(path.relative_to(self.source_dir.resolve())), _digest(data, 16)
+        entry = self._cached(key, source_hash)
+        status = 'unchanged'
+        if entry is None:
+            minified = minify(data.decode('utf-8')).encode('utf-8')
+            name = f'{path.stem}.{_digest(minified)}{path.suffix}'
+            self._write(name, minified)
+            entry = {'source': source_hash, 'options': {}, 'files': [name]}
+            status = 'built'
+        name = entry['files'][0]
+        self.written.add(name)
+        self.assets[key] = entry
+        output = self.output_dir / name
+        self.reports.append(AssetReport(key, len(data), output.stat().st_size, status, ''))
+        return name, output.read_text('utf-8')
+
+    def image_asset(self, url, sizes):
+        """{extension: [(width, height, filename)]} for an image shown at `sizes`"""
+        path = self._source(url)
+        data = path.read_bytes()
+        key, source_hash = str(path.relative_to(self.source_dir.resolve())), _digest(data, 16)
+        with Image.open(path) as image:
+            original_width = ImageOps.exif_transpose(image).width
+        widths = _target_widths(sizes, original_width)
+        formats = [fmt[0] for fmt in _formats()]
+        entry = self._cached(key, source_hash, widths=widths, formats=formats)
+        status = 'unchanged'
+        if entry is None:
+            variants = {}
+            for extension, rendered in render_image(path, widths).items():
+                variants[extension] = []
+                for width, height, name, image_bytes in rendered:
+                    self._write(name, image_bytes)
+                    variants[extension].append((width, height, name))
+            entry = {
+                'source': source_hash, 'options': {'widths': widths, 'formats': formats},
+                'files': [name for rendered in variants.values() for _, _, name in rendered],
+                'variants': variants,
+            }
+            status = 'built'
+        self.written.update(entry['files'])
+        self.assets[key] = entry
+        # What a modern browser at the highest density downloads instead of the original
+        best = formats[0]
+        width, _, name = entry['variants'][best][-1]
+        output_bytes = (self.output_dir / name).stat().st_size
+        smallest = (self.output_dir / entry['variants'][best][0][2]).stat().st_size
+        note = f'{best} @{width}w, {smallest:,} B @{entry["variants"][best][0][0]}w'
+        self.reports.append(AssetReport(key, len(data), output_bytes, status, note))
+        return {extension: [tuple(variant) for variant in rendered] for extension, rendered in entry['variants'].items()}
+
+    def page(self, name):
+        """Rewrite one HTML page, building every local asset it references"""
+        source = (self.source_dir / name).read_text('utf-8')
+        page = re.sub(r'<!--(?!\[if).*?-->', '', source, flags=re.S)
+        body = re.search(r'<body\b', page, re.I)
+        fold = re.search(r'</section>', page[body.start():] if body else page, re.I)
+        fold_end = (body.start() if body else 0) + fold.end() if fold else len(page)
+        above_fold = page[body.start() if body else 0:fold_end]
+        critical = []
+
+        def stylesheet(match):
+            attributes = _attributes(match.group())
+            href = attributes.get('href')
+            if 'stylesheet' not in (attributes.get('rel') or '').split() or not _is_local(href):
+                return match.group()
+            filename, css = self.text_asset(href, minify_css)
+            critical.append(critical_css(css, above_fold))
+            return (
+                f'<link rel="preload" href="{filename}" as="style" '
+                "onload=\"this.onload=null;this.rel='stylesheet'\">"
+                f'<noscript><link rel="stylesheet" href="{filename}"></noscript>'
+            )
+
+        def script(match):
+            src = match.group(2)
+            if not _is_local(src):
+                return match.group()
+            filename, _ = self.text_asset(src, minify_js)
+            return f'{match.group(1)}{filename}{match.group(3)}'
+
+        def image(match):
+            attributes = _attributes(match.group())
+            if not _is_local(attributes.get('src')):
+                return match.group()
+            sizes = attributes.pop('sizes', None) or '100vw'
+            variants = self.image_asset(attributes['src'], sizes)
+            for attribute in ('src', 'srcset', 'width', 'height'):
+                attributes.pop(attribute, None)
+            return _picture(attributes, variants, sizes, lazy=match.start() >= fold_end)
+
+        page = re.sub(r'<img\b[^>]*>', image, page, flags=re.I)
+        page = re.sub(r'<link\b[^>]*>', stylesheet, page, flags=re.I)
+        page = re.sub(r'(<script\b[^>]*\bsrc=["\'])([^"\']+)(["\'])', script, page, flags=re.I)
+        if critical:
+            inline = '<style>%s</style>' % ''.join(critical)
+            page = re.sub(r'(<link rel="preload"[^>]*as="style")', lambda match: inline + match.group(1), page, count=1)
+        data = page.encode('utf-8')
+        existed = (self.output_dir / name).exists() and (self.output_dir / name).read_bytes() == data
+        self._write(name, data)
+        inline_bytes = len('\n'.join(critical).encode('utf-8'))
+        self.reports.append(AssetReport(
+            name, len(source.encode('utf-8')), len(data), 'unchanged' if existed else 'built',
+            f'{inline_bytes:,} B critical CSS inlined',
+        ))
+
+    def build(self):
+        self.output_dir.mkdir(parents=True, exist_ok=True)
+        for page in sorted(self.source_dir.glob('*.html')):
+            self.page(page.name)
+        for path in self.output_dir.iterdir():
+            if path.is_file() and path.name != MANIFEST_NAME and path.name not in self.written:
+                path.unlink()
+                self.reports.append(AssetReport(path.name, 0, 0, 'removed', ''))
+        (self.output_dir / MANIFEST_NAME).write_text(json.dumps(
+            {'version': BUILD_VERSION, 'assets': self.assets}, indent=2, sort_keys=True,
+        ))
+        return self.reports
+
+
+def build(source_dir, output_dir, force=False):
+    """Build the site; returns an AssetReport per page, stylesheet, script and image"""
+    return SiteBuilder(source_dir, output_dir, force).build()
@@ -0,0 +1,205 @@
+"""
+Fingerprinted, precompressed static files served by the app itself.
+
+`collectstatic` (through CompressedManifestStaticFilesStorage) writes every
+file under a content-hashed name (admin/css/base.<hash>.css) and stores
+gzip and Brotli copies next to each compressible file, so nothing is
+compressed per request.
+
+StaticFilesMiddleware answers requests under STATIC_URL from STATIC_ROOT
+before the rest of the stack runs. It picks the smallest encoding the client
+accepts, and sends `Cache-Control: immutable` with a one-year max-age for
+hashed names. Because a file's URL changes whenever its content does,
+browsers never revalidate them, and a repeat visit makes no static requests.
+Unhashed names get STATIC_MAX_AGE and ETag/Last-Modified revalidation.
+
+In production the file index is built once at startup; with DEBUG on, files
+are looked up per request so a fresh `collectstatic` is picked up without a
+restart (anything not collected falls through to runserver's finders).
+"""
+import gzip
+import json
+import mimetypes
+import os
+import posixpath
+from collections import namedtuple
+from pathlib import Path
+
+import brotli
+from django.conf import settings
+from django.contrib.staticfiles.storage import ManifestStaticFilesStorage
+from django.core.exceptions import MiddlewareNotUsed
+from django.http import FileResponse, HttpResponseNotModified
+from django.utils.http import http_date, parse_http_date_safe
+
+COMPRESSIBLE_TYPES = (
+    'text/', 'application/javascript', 'application/json', 'application/xml', 'image/svg+xml',
+    'application/manifest+json', 'font/ttf', 'font/otf', 'application/vnd.ms-fontobject', 'image/x-icon',
+    'image/vnd.microsoft.icon',
+)
+# Below this, compression headers cost more than they save
+MIN_COMPRESS_BYTES = 256
+# Compressed copies are only kept if at least this much smaller
+MAX_COMPRESSED_RATIO = 0.95
+
+IMMUTABLE_CACHE_CONTROL = 'public, max-age=31536000, immutable'
+
+# (Content-Encoding, file suffix), in order of preference
+ENCODINGS = (('br', '.br'), ('gzip', '.gz'))
+
+StaticVariant = namedtuple('StaticVariant', ['path', 'size', 'etag', 'mtime'])
+StaticFile = namedtuple('StaticFile', ['content_type', 'immutable', 'variants'])
+
+
+def _content_type(name):
+    return mimetypes.guess_type(name)[0] or 'application/octet-stream'
+
+
+def compressible(name):
+    return _content_type(name).startswith(COMPRESSIBLE_TYPES)
+
+
+def _compress(path):
+    """Write (or refresh) .gz and .br copies of a file; returns the suffixes written"""
+    data = path.read_bytes()
+    mtime = path.stat().st_mtime
+    written = []
+    for suffix, encode in (
+        ('.gz', lambda raw: gzip.compress(raw, compresslevel=9, mtime=0)),
+        ('.br', lambda raw: brotli.compress(raw, quality=11)),
+    ):
+        target = path.with_name(path.name + suffix)
+        if target.exists() and target.stat().st_mtime >= mtime:
+            continue
+        compressed = encode(data)
+        if len(compressed) <= len(data) * MAX_COMPRESSED_RATIO:
+            target.write_bytes(compressed)
+            written.append(suffix)
+        elif target.exists():
+            target.unlink()
+    return written
+
+
+class CompressedManifestStaticFilesStorage(ManifestStaticFilesStorage):
+    """Hashed names plus gzip/Brotli copies of compressible files, written at collectstatic time"""
+
+    def post_process(self, paths, dry_run=False, **options):
+        yield from super().post_process(paths, dry_run, **options)
+        if dry_run:
+            return
+        names = set(paths) | set(self.hashed_files.values())
+        for name in sorted(names):
+            path = Path(self.path(name))
+            if compressible(name) and path.exists() and path.stat().st_size >= MIN_COMPRESS_BYTES:
+                for suffix in _compress(path):
+                    yield name, name + suffix, True
+
+
+def _accepted_encodings(header):
+    accepted = set()
+    for part in header.split(','):
+        coding, _, params = part.strip().partition(';')
+        quality = params.strip()
+        if quality.startswith('q='):
+            try:
+                if float(quality[2:]) == 0:
+                    continue
+            except ValueError:
+                continue
+        accepted.add(coding.strip().lower())
+    return accepted
+
+
+class StaticFilesMiddleware:
+    """Serve collected static files with content negotiation and far-future caching for hashed names"""
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if not settings.STATIC_URL or '//' in settings.STATIC_URL:
+            # Served from another origin (CDN): nothing to do here
+            raise MiddlewareNotUsed
+        self.prefix = '/' + settings.STATIC_URL.strip('/') + '/'
+        self.root = Path(settings.STATIC_ROOT).resolve()
+        self.files = None if settings.DEBUG else self._scan()
+
+    def _hashed_names(self):
+        try:
+            manifest = json.loads((self.root / ManifestStaticFilesStorage.manifest_name).read_text())
+        except (FileNotFoundError, ValueError):
+            return set()
+        return set(manifest.get('paths', {}).values())
+
+    def _variant(self, path):
+        stat = path.stat()
+        return StaticVariant(str(path), stat.st_size, f'"{int(stat.st_mtime):x}-{stat.st_size:x}"', stat.st_mtime)
+
+    def _entry(self, name, path, hashed_names):
+        variants = {None: self._variant(path)}
+        for encoding, suffix in ENCODINGS:
+            compressed = path.with_name(path.name + suffix)
+            if compressed.is_file():
+                variants[encoding] = self._variant(compressed)
+        return StaticFile(_content_type(name), name in hashed_names, variants)
+
+    def _scan(self):
+        if not self.root.is_dir():
+            return {}
+        hashed_names = self._hashed_names()
+        suffixes = tuple(suffix for _, suffix in ENCODINGS)
+        files = {}
+        for directory, _, filenames in os.walk(self.root):
+            for filename in filenames:
+                path = Path(directory, filename)
+                name = path.relative_to(self.root).as_posix()
+                if name.endswith(suffixes) and path.with_suffix('').is_file():
+                    continue
+                files[name] = self._entry(name, path, hashed_names)
+        return files
+
+    def lookup(self, name):
+        if self.files is not None:
+            return self.files.get(name)
+        name = posixpath.normpath(name).lstrip('/')
+        path = (self.root / name).resolve()
+        if self.root not in path.parents or not path.is_file():
+            return None
+        return self._entry(name, path, self._hashed_names())
+
+    def __call__(self, request):
+        if request.method in ('GET', 'HEAD') and request.path_info.startswith(self.prefix):
+            static_file = self.lookup(request.path_info[len(self.prefix):])
+            if static_file is not None:
+                return self.serve(request, static_file)
+        return self.get_response(request)
+
+    def serve(self, request, static_file):
+        accepted = _accepted_encodings(request.META.get('HTTP_ACCEPT_ENCODING', ''))
+        encoding = next(
+            (encoding for encoding, _ in ENCODINGS if encoding in accepted and encoding in static_file.variants), None
+        )
+        variant = static_file.variants[encoding]
+        headers = {
+            'ETag': variant.etag,
+            'Last-Modified': http_date(variant.mtime),
+            'Cache-Control': (
+                IMMUTABLE_CACHE_CONTROL if static_file.immutable
+                else f"public, max-age={getattr(settings, 'STATIC_MAX_AGE', 60)}"
+            ),
+        }
+        if len(static_file.variants) > 1:
+            headers['Vary'] = 'Accept-Encoding'
+
+        if_none_match = request.META.get('HTTP_IF_NONE_MATCH')
+        modified_since = parse_http_date_safe(request.META.get('HTTP_IF_MODIFIED_SINCE', ''))
+        if (if_none_match and variant.etag in if_none_match) or (
+            not if_none_match and modified_since and int(variant.mtime) <= modified_since
+        ):
+            response = HttpResponseNotModified()
+        else:
+            response = FileResponse(open(variant.path, 'rb'), content_type=static_file.content_type)
+            response.headers.pop('Content-Disposition', None)
+            if encoding:
+                response.headers['Content-Encoding'] = encoding
+        for header, value in headers.items():
+            response.headers[header] = value
+        return response
@@ -0,0 +1,103 @@
+"""
+Denormalized per-athlete summary (AthleteSummary).
+
+The roster figures - outstanding balance, last completed workout, next
+workout and active subscription - are recomputed for the affected athlete in
+the same transaction as every save of a Payment, AthleteSubscription, Workout
+or WorkoutCompletion, and by the set-based billing and scheduling helpers.
+Each refresh is one SELECT with indexed per-athlete subqueries plus one
+upsert, for any number of athletes.
+
+"Next workout" moves on as days pass without any write, and bulk deletes
+bypass the hooks, so `manage.py rebuild_athlete_summaries` should also run
+nightly.
+"""
+from django.db.models import Count, DecimalField, OuterRef, Subquery, Sum, Value
+from django.db.models.functions import Coalesce
+from django.utils import timezone
+
+from .models import ArchivedWorkout, Athlete, AthleteSubscription, AthleteSummary, Payment, Workout
+
+UPCOMING_STATUSES = ['UPCOMING', 'RESCHEDULED']
+
+
+def _summaries(athlete_ids, today):
+    pending = Payment.objects.filter(
+        subscription__athlete=OuterRef('pk'), status='PENDING'
+    ).order_by().values('subscription__athlete')
+    completed = Workout.objects.filter(
+        athlete=OuterRef('pk'), status='COMPLETED'
+    ).annotate(
+        done_on=Coalesce('completion__actual_date', 'date')
+    ).order_by('-done_on')
+    archived_completed = ArchivedWorkout.objects.filter(
+        athlete=OuterRef('pk'), status='COMPLETED'
+    ).annotate(
+        done_on=Coalesce('actual_date', 'date')
+    ).order_by('-done_on')
+    upcoming = Workout.objects.filter(
+        athlete=OuterRef('pk'), status__in=UPCOMING_STATUSES, date__gte=today
+    ).order_by('date', 'pk')
+    active = AthleteSubscription.objects.filter(
+        athlete=OuterRef('pk'), status='ACTIVE'
+    ).order_by('-start_date', '-pk')
+
+    rows = Athlete.objects.filter(pk__in=athlete_ids).annotate(
+        balance=Coalesce(
+            Subquery(pending.annotate(total=Sum('amount')).values('total')),
+            Value(0), output_field=DecimalField(max_digits=12, decimal_places=2),
+        ),
+        pending_count=Coalesce(Subquery(pending.annotate(count=Count('pk')).values('count')), Value(0)),
+        last_completed=Coalesce(
+            Subquery(completed.values('done_on')[:1]), Subquery(archived_completed.values('done_on')[:1]),
+        ),
+        next_date=Subquery(upcoming.values('date')[:1]),
+        next_title=Subquery(upcoming.values('title')[:1]),
+        subscription_id=Subquery(active.values('pk')[:1]),
+    ).values_list(
+        'pk', 'tenant_id', 'balance', 'pending_count', 'last_completed', 'next_date', 'next_title', 'subscription_id'
+    ).order_by()
+    return [
+        AthleteSummary(
+            tenant_id=tenant_id,
+            athlete_id=pk,
+            outstanding_balance=balance,
+            pending_payments=pending_count,
+            last_completed_date=last_completed,
+            next_workout_date=next_date,
+            next_workout_title=next_title or '',
+            active_subscription_id=subscription_id,
+        )
+        for pk, tenant_id, balance, pending_count, last_completed, next_date, next_title, subscription_id in rows
+    ]
+
+
+def refresh_athletes(athlete_ids, today=None):
+    """Recompute and upsert the summaries of the given athletes; returns the number written"""
+    athlete_ids = {pk for pk in athlete_ids if pk is not None}
+    if not athlete_ids:
+        return 0
+    summaries = _summaries(athlete_ids, today or timezone.localdate())
+    AthleteSummary.objects.bulk_create(
+        summaries,
+        batch_size=500,
+        update_conflicts=True,
+        unique_fields=['athlete'],
+        update_fields=[
+            'outstanding_balance', 'pending_payments', 'last_completed_date',
+            'next_workout_date', 'next_workout_title', 'active_subscription', 'updated_at',
+        ],
+    )
+    return len(summaries)
+
+
+def rebuild(chunk_size=1000):
+    """Recompute every athlete's summary; returns the number written"""
+    total = 0
+    chunk = []
+    for pk in Athlete.objects.values_list('pk', flat=True).iterator(chunk_size=chunk_size):
+        chunk.append(pk)
+        if len(chunk) >= chunk_size:
+            total += refresh_athletes(chunk)
+            chunk = []
+    return total + refresh_athletes(chunk)
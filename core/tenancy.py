@@ -0,0 +1,87 @@
+"""
+Multi-coach tenancy.
+
+Every core row belongs to a Tenant (a coach or coaching organization). The
+tenant of the current request or job lives in a context variable; the default
+`objects` manager of tenant models filters on it, so views, the admin and
+services only ever see the current tenant's rows. With no tenant set
+(superusers, nightly jobs) querysets span all tenants; `Model.unscoped` is
+always unfiltered.
+
+Composite indexes on tenant models lead with the tenant column, so one
+tenant's queries never scan another tenant's rows.
+"""
+import contextvars
+from contextlib import contextmanager
+
+from django.core.exceptions import PermissionDenied, ValidationError
+from django.urls import reverse
+
+_current = contextvars.ContextVar('current_tenant', default=None)
+
+
+def current_tenant_id():
+    return _current.get()
+
+
+@contextmanager
+def use_tenant(tenant):
+    """Scope tenant models to `tenant` (a Tenant, its id, or None for all tenants) inside the block"""
+    token = _current.set(getattr(tenant, 'pk', tenant))
+    try:
+        yield
+    finally:
+        _current.reset(token)
+
+
+def cache_key(*parts, tenant_id=None):
+    """Cache key namespaced by tenant, so tenants never share or evict each other's entries by key"""
+    tenant_id = tenant_id if tenant_id is not None else current_tenant_id()
+    return ':'.join(['t%s' % (tenant_id or 0)] + [str(part) for part in parts])
+
+
+def default_tenant_id():
+    """The tenant for a new row with no tenant set: the current one, else the only one"""
+    from .models import Tenant
+
+    tenant_id = current_tenant_id()
+    if tenant_id is not None:
+        return tenant_id
+    tenant_ids = list(Tenant.objects.values_list('pk', flat=True)[:2])
+    if len(tenant_ids) == 1:
+        return tenant_ids[0]
+    raise ValidationError("No tenant selected; the record cannot be assigned to a coach.")
+
+
+def tenant_for_user(user):
+    """Tenant id for a signed-in user: a coach's tenant, or the tenant an athlete belongs to"""
+    from .models import Athlete, Tenant
+
+    if not user.is_authenticated:
+        return None
+    tenant_id = Tenant.objects.filter(users=user).order_by('pk').values_list('pk', flat=True).first()
+    if tenant_id is None:
+        tenant_id = Athlete.unscoped.filter(user=user).values_list('tenant_id', flat=True).first()
+    return tenant_id
+
+
+class TenantMiddleware:
+    """
+    Run each request scoped to the signed-in user's tenant. It is looked up
+    on every request, so membership changes apply at once. Only superusers
+    run unscoped: anyone else without a tenant is refused (but may sign out)
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        tenant_id = tenant_for_user(request.user)
+        if (
+            tenant_id is None and request.user.is_authenticated and not request.user.is_superuser
+            and request.path != reverse('admin:logout')
+        ):
+            raise PermissionDenied("Your account is not linked to a coach.")
+        request.tenant_id = tenant_id
+        with use_tenant(tenant_id):
+            return self.get_response(request)
@@ -1,3 +1,402 @@
-from django.test import TestCase
+import tempfile
+from datetime import date, timedelta
+from decimal import Decimal
+from smtplib import SMTPException
+from unittest import mock, skipUnless
 
-# Create your tests here.
+from django.contrib.auth.models import Permission, User
+from django.core import mail
+from django.core.exceptions import ValidationError
+from django.core.mail.backends.locmem import EmailBackend
+from django.db import connection, transaction
+from django.test import TestCase, TransactionTestCase, override_settings
+from django.utils import timezone
+
+from . import backup, engagement, lifecycle, reminders
+from .models import (
+    Athlete, AthleteSubscription, BillingPlan, EmailSettings, EngagementLog, InvoiceTemplate, Payment,
+    PaymentReminder, ReviewSession, Tenant, Workout, WorkoutCompletion,
+)
+from .scheduling import reschedule_workouts
+from .tenancy import use_tenant
+
+
+def make_athlete(username='runner'):
+    user = User.objects.create_user(username, f'{username}@example.com', 'pw')
+    return Athlete.objects.create(
+        user=user, name=username.title(), email=f'{username}@example.com', contact_number='9876543210', address="x",
+    )
+
+
+def make_plan(base_price='3000.00', billing_period='MONTHLY'):
+    return BillingPlan.objects.create(
+        name=f"Run Focus {billing_period}", plan_type='RUNNING', service_level='FOCUS',
+        billing_period=billing_period, base_price=Decimal(base_price), description="d",
+    )
+
+
+def make_subscription(athlete, plan, start_date, **fields):
+    return AthleteSubscription.objects.create(
+        athlete=athlete, billing_plan=plan, start_date=start_date,
+        custom_discount_percent=Decimal('0'), custom_discount_amount=Decimal('0'), **fields,
+    )
+
+
+class RescheduleWorkoutsTests(TestCase):
+    def setUp(self):
+        self.athlete = make_athlete()
+        self.start = date(2026, 3, 2)
+
+    def plan(self, days, workout_type='EASY'):
+        return [
+            Workout.objects.create(
+                athlete=self.athlete, date=self.start + timedelta(days=offset), workout_type=workout_type,
+                title=f"{workout_type} {offset}", description="d",
+            )
+            for offset in days
+        ]
+
+    def dates(self, workouts):
+        return [Workout.objects.get(pk=workout.pk).date for workout in workouts]
+
+    def test_shift_forward_within_block(self):
+        workouts = self.plan(range(3))
+        self.assertEqual(reschedule_workouts(self.athlete, self.start, 1), (3, 0))
+        self.assertEqual(self.dates(workouts), [self.start + timedelta(days=offset) for offset in (1, 2, 3)])
+
+    def test_shift_back_by_less_than_block_span(self):
+        for days in (-1, -2):
+            with self.subTest(days=days):
+                Workout.objects.all().delete()
+                workouts = self.plan(range(3))
+                self.assertEqual(reschedule_workouts(self.athlete, self.start, days), (3, 0))
+                self.assertEqual(
+                    self.dates(workouts), [self.start + timedelta(days=offset + days) for offset in range(3)],
+                )
+
+    def test_shift_back_keeps_original_date_and_marks_rescheduled(self):
+        workouts = self.plan(range(3))
+        reschedule_workouts(self.athlete, self.start, -1)
+        for workout, offset in zip(workouts, range(3)):
+            workout.refresh_from_db()
+            self.assertEqual(workout.original_date, self.start + timedelta(days=offset))
+            self.assertEqual(workout.status, 'RESCHEDULED')
+
+    def test_shift_back_past_earlier_workouts(self):
+        earlier = self.plan([-5, -4])
+        workouts = self.plan(range(4))
+        self.assertEqual(reschedule_workouts(self.athlete, self.start, -3), (4, 0))
+        self.assertEqual(self.dates(workouts), [self.start + timedelta(days=offset - 3) for offset in range(4)])
+        self.assertEqual(self.dates(earlier), [self.start - timedelta(days=5), self.start - timedelta(days=4)])
+
+    def test_conflict_is_skipped_on_negative_shift(self):
+        blocker = self.plan([-1])[0]
+        blocker.status = 'COMPLETED'
+        blocker.save()
+        workouts = self.plan(range(3))
+        moved, skipped = reschedule_workouts(self.athlete, self.start, -1, on_conflict='skip')
+        self.assertEqual((moved, skipped), (0, 3))
+        self.assertEqual(self.dates(workouts), [self.start + timedelta(days=offset) for offset in range(3)])
+
+
+class SubscriptionLifecycleTests(TestCase):
+    def setUp(self):
+        self.athlete = make_athlete()
+        self.plan = make_plan()
+
+    def subscribe(self, start_date, **fields):
+        return make_subscription(self.athlete, self.plan, start_date, **fields)
+
+    def periods(self, subscription):
+        return list(Payment.objects.filter(subscription=subscription).order_by('due_date').values_list(
+            'period_start', 'period_end', 'amount',
+        ))
+
+    def test_renews_within_lead_days_once(self):
+        subscription = self.subscribe(date(2026, 1, 1))
+        # January was charged at sign-up, February is not due yet
+        self.assertEqual(lifecycle.run(today=date(2026, 1, 20), lead_days=7).payments, 0)
+        self.assertEqual(lifecycle.run(today=date(2026, 1, 25), lead_days=7).payments, 1)
+        self.assertEqual(lifecycle.run(today=date(2026, 1, 25), lead_days=7).payments, 0)
+        self.assertEqual(self.periods(subscription), [(date(2026, 2, 1), date(2026, 2, 28), Decimal('3000.00'))])
+        payment = Payment.objects.get(subscription=subscription)
+        self.assertEqual((payment.status, payment.due_date, payment.months_covered), ('PENDING', date(2026, 2, 1), "February 2026"))
+        subscription.refresh_from_db()
+        self.assertEqual(subscription.renewed_through, date(2026, 2, 28))
+
+    def test_quarterly_periods(self):
+        self.plan = make_plan(base_price='8000.00', billing_period='QUARTERLY')
+        subscription = self.subscribe(date(2026, 1, 1))
+        lifecycle.run(today=date(2026, 3, 28), lead_days=7)
+        payment = Payment.objects.get(subscription=subscription)
+        self.assertEqual((payment.period_start, payment.period_end), (date(2026, 4, 1), date(2026, 6, 30)))
+        self.assertEqual((payment.amount, payment.months_covered), (Decimal('8000.00'), "Apr-Jun 2026"))
+
+    def test_last_period_is_prorated_to_end_date(self):
+        subscription = self.subscribe(date(2026, 1, 1), end_date=date(2026, 2, 14))
+        lifecycle.run(today=date(2026, 1, 25), lead_days=7)
+        self.assertEqual(self.periods(subscription), [(date(2026, 2, 1), date(2026, 2, 14), Decimal('1500.00'))])
+        self.assertEqual(Payment.objects.get(subscription=subscription).notes, "Prorated: 14 of 28 days")
+
+        self.assertEqual(lifecycle.run(today=date(2026, 2, 10), lead_days=7).payments, 0)
+        self.assertEqual(lifecycle.run(today=date(2026, 2, 15), lead_days=7).expired, 1)
+        subscription.refresh_from_db()
+        self.assertEqual(subscription.status, 'CANCELLED')
+
+    def pause(self, subscription, paused_on, resume_on):
+        subscription.status, subscription.resume_on = 'PAUSED', resume_on
+        subscription.save()
+        self.assertEqual(lifecycle.run(today=paused_on, lead_days=7).paused, 1)
+        self.assertEqual(lifecycle.run(today=resume_on, lead_days=7).resumed, 1)
+        subscription.refresh_from_db()
+        self.assertEqual((subscription.status, subscription.paused_from), ('ACTIVE', None))
+
+    def test_pause_credits_unused_days_of_signup_period(self):
+        subscription = self.subscribe(date(2026, 1, 1))
+        self.pause(subscription, date(2026, 1, 10), date(2026, 1, 20))
+        # 22 paid days (Jan 10-31) restart on Jan 20
+        self.assertEqual(subscription.renewed_through, date(2026, 2, 10))
+        lifecycle.run(today=date(2026, 2, 5), lead_days=7)
+        self.assertEqual(self.periods(subscription), [(date(2026, 2, 11), date(2026, 3, 10), Decimal('3000.00'))])
+
+    def test_pause_credits_unused_days_of_renewed_period(self):
+        subscription = self.subscribe(date(2026, 1, 1))
+        lifecycle.run(today=date(2026, 1, 25), lead_days=7)
+        self.pause(subscription, date(2026, 2, 20), date(2026, 3, 5))
+        # 9 paid days (Feb 20-28) restart on Mar 5
+        self.assertEqual(subscription.renewed_through, date(2026, 3, 13))
+        lifecycle.run(today=date(2026, 3, 10), lead_days=7)
+        self.assertEqual(self.periods(subscription)[-1], (date(2026, 3, 14), date(2026, 4, 13), Decimal('3000.00')))
+        # Re-running the resume day credits nothing twice
+        lifecycle.run(today=date(2026, 3, 5), lead_days=7)
+        subscription.refresh_from_db()
+        self.assertEqual(subscription.renewed_through, date(2026, 4, 13))
+
+    def test_payment_entered_by_hand_bills_its_period(self):
+        subscription = self.subscribe(date(2026, 10, 1))
+        Payment.objects.create(
+            subscription=subscription, amount=Decimal('3000.00'), due_date=date(2026, 11, 1), months_covered="November",
+        )
+        lifecycle.run(today=date(2026, 10, 26))
+        self.assertEqual(Payment.objects.filter(subscription=subscription).count(), 1)
+        subscription.refresh_from_db()
+        self.assertEqual(subscription.renewed_through, date(2026, 11, 30))
+        # The period after it is billed as usual
+        lifecycle.run(today=date(2026, 11, 26))
+        self.assertEqual(self.periods(subscription)[-1], (date(2026, 12, 1), date(2026, 12, 31), Decimal('3000.00')))
+
+
+class FlakyBackend(EmailBackend):
+    """In-memory mail backend that refuses to connect, or fails after delivering `deliver` messages"""
+    refuse = False
+    deliver = None
+
+    def open(self):
+        if self.refuse:
+            raise ConnectionRefusedError("SMTP server is down")
+
+    def send_messages(self, messages):
+        if self.deliver is not None and len(mail.outbox) >= self.deliver:
+            raise SMTPException("Connection lost")
+        return super().send_messages(messages)
+
+
+class PaymentReminderTests(TestCase):
+    def setUp(self):
+        self.today = date(2026, 10, 19)
+        InvoiceTemplate.objects.create(
+            company_address="x", company_pan='ABCDE1234F', company_email='coach@example.com', company_phone='1',
+            is_default=True,
+        )
+        EmailSettings.objects.create(smtp_username='coach', smtp_password='pw', is_active=True)
+        plan = make_plan()
+        self.payments = []
+        for number in range(3):
+            subscription = make_subscription(make_athlete(f'runner{number}'), plan, date(2026, 1, 1))
+            self.payments.append(Payment.objects.create(
+                subscription=subscription, amount=Decimal('3000.00'), due_date=self.today + timedelta(days=1),
+                months_covered="October",
+            ))
+
+    def send(self, **backend):
+        with mock.patch.object(reminders, 'email_connection', lambda settings: type(
+            'Backend', (FlakyBackend,), backend,
+        )()):
+            return reminders.send_payment_reminders(today=self.today)
+
+    def recipients(self):
+        return sorted(address for message in mail.outbox for address in message.to)
+
+    def test_refused_connection_releases_claims(self):
+        with self.assertRaises(ConnectionRefusedError):
+            self.send(refuse=True)
+        self.assertFalse(PaymentReminder.objects.exists())
+        self.assertEqual(self.send(), 3)
+        self.assertEqual(len(mail.outbox), 3)
+
+    def test_failure_part_way_marks_delivered_and_releases_the_rest(self):
+        with self.assertRaises(SMTPException):
+            self.send(deliver=1)
+        self.assertEqual(PaymentReminder.objects.filter(sent_at__isnull=False).count(), 1)
+        self.assertEqual(PaymentReminder.objects.filter(sent_at__isnull=True).count(), 0)
+        self.assertEqual(self.send(), 2)
+        # Every athlete got exactly one reminder across both runs
+        self.assertEqual(self.recipients(), sorted(f'runner{number}@example.com' for number in range(3)))
+
+    def test_stale_claim_is_claimed_again(self):
+        PaymentReminder.objects.create(
+            payment=self.payments[0], kind='DUE', claim='00000000-0000-0000-0000-000000000000',
+            claimed_at=timezone.now() - reminders.CLAIM_TIMEOUT - timedelta(minutes=1),
+        )
+        PaymentReminder.objects.create(
+            payment=self.payments[1], kind='DUE', claim='00000000-0000-0000-0000-000000000001',
+            claimed_at=timezone.now(),
+        )
+        # The fresh claim may still be in flight in another run; the stale one is taken over
+        self.assertEqual(self.send(), 2)
+        self.assertEqual(self.recipients(), ['runner0@example.com', 'runner2@example.com'])
+
+
+class BackupRestoreTests(TransactionTestCase):
+    def setUp(self):
+        self.output = tempfile.TemporaryDirectory()
+        self.addCleanup(self.output.cleanup)
+        # TransactionTestCase flushes the tenant the migrations seed
+        Tenant.objects.get_or_create(slug='default', defaults={'name': "Default"})
+        # Write the completion's engagement event before the tables are flushed
+        self.addCleanup(engagement.flush)
+        self.athlete = make_athlete()
+        self.start = date(2026, 3, 2)
+        self.workouts = [
+            Workout.objects.create(
+                athlete=self.athlete, date=self.start + timedelta(days=offset), workout_type='EASY',
+                title=f"Easy {offset}", description="d",
+            )
+            for offset in range(5)
+        ]
+        WorkoutCompletion.objects.create(
+            workout=self.workouts[0], completion_quality='GOOD', actual_distance=Decimal('5'), actual_duration=30,
+        )
+
+    def empty_database(self):
+        models = backup.backup_models()
+        backup._clear(backup.dependency_levels(models), {'core.tenant': list(Tenant.objects.all())})
+
+    def dates(self):
+        return list(Workout.objects.order_by('pk').values_list('date', flat=True))
+
+    def test_incremental_after_block_reschedule(self):
+        backup.backup(self.output.name)
+        reschedule_workouts(self.athlete, self.start, 1)
+        expected = self.dates()
+        incremental = backup.backup(self.output.name, incremental=True)
+        self.empty_database()
+
+        backup.restore(f"{self.output.name}/{incremental['name']}", workers=1)
+        self.assertEqual(self.dates(), expected)
+        self.assertEqual(WorkoutCompletion.objects.get().workout_id, self.workouts[0].pk)
+
+    def test_incremental_drops_deleted_rows_before_reusing_their_slot(self):
+        backup.backup(self.output.name)
+        self.workouts[-1].delete()
+        Workout.objects.create(
+            athlete=self.athlete, date=self.start + timedelta(days=4), workout_type='EASY', title="New", description="d",
+        )
+        expected = self.dates()
+        incremental = backup.backup(self.output.name, incremental=True)
+        self.empty_database()
+
+        backup.restore(f"{self.output.name}/{incremental['name']}", workers=1)
+        self.assertEqual(self.dates(), expected)
+
+    def test_incremental_keeps_coach_edits_to_reviews(self):
+        review = ReviewSession.objects.create(
+            athlete=self.athlete, period='WEEKLY', period_start=self.start, period_end=self.start + timedelta(days=6),
+            computed_at=timezone.now() - timedelta(days=1),
+        )
+        backup.backup(self.output.name)
+        review.discussion_notes = "Hold the long run at 90 minutes"
+        review.save()
+        incremental = backup.backup(self.output.name, incremental=True)
+        self.empty_database()
+
+        backup.restore(f"{self.output.name}/{incremental['name']}", workers=1)
+        self.assertEqual(ReviewSession.objects.get().discussion_notes, "Hold the long run at 90 minutes")
+
+    def test_failed_restore_leaves_the_database_empty(self):
+        full = backup.backup(self.output.name)
+        self.empty_database()
+        tenants = list(Tenant.objects.values_list('pk', 'slug'))
+        load_model = backup.load_model
+
+        def failing(model, *args):
+            if model is Workout:
+                raise RuntimeError("disk full")
+            return load_model(model, *args)
+
+        with mock.patch.object(backup, 'load_model', failing), self.assertRaises(RuntimeError):
+            backup.restore(f"{self.output.name}/{full['name']}", workers=1)
+        self.assertFalse(Athlete.objects.exists())
+        self.assertEqual(list(Tenant.objects.values_list('pk', 'slug')), tenants)
+        # ...so the restore can simply be run again
+        backup.restore(f"{self.output.name}/{full['name']}", workers=1)
+        self.assertEqual(Workout.objects.count(), 5)
+
+
+@override_settings(STORAGES={
+    'default': {'BACKEND': 'django.core.files.storage.FileSystemStorage'},
+    'staticfiles': {'BACKEND': 'django.contrib.staticfiles.storage.StaticFilesStorage'},
+})
+class TenancyTests(TestCase):
+    def setUp(self):
+        self.athlete = make_athlete()
+        self.other = Tenant.objects.create(name="Second coach", slug='second')
+
+    def test_unique_checks_span_tenants(self):
+        athlete = self.athlete
+        with use_tenant(self.other):
+            duplicate = Athlete(
+                user=athlete.user, name="Copy", email=athlete.email, contact_number='9876543210', address="x",
+            )
+            with self.assertRaises(ValidationError) as raised:
+                duplicate.full_clean()
+        self.assertEqual(set(raised.exception.message_dict), {'user', 'email'})
+
+    def test_staff_without_tenant_is_refused(self):
+        staff = User.objects.create_user('staff', 'staff@example.com', 'pw', is_staff=True)
+        staff.user_permissions.set(Permission.objects.filter(codename='view_athlete'))
+        self.client.force_login(staff)
+        self.assertEqual(self.client.get('/admin/core/athlete/', secure=True).status_code, 403)
+
+        # Memberships apply (and are revoked) on the next request
+        self.other.users.add(staff)
+        self.assertEqual(self.client.get('/admin/core/athlete/', secure=True).status_code, 200)
+        self.other.users.remove(staff)
+        self.assertEqual(self.client.get('/admin/core/athlete/', secure=True).status_code, 403)
+
+    def test_superuser_picks_tenant_for_new_records(self):
+        self.client.force_login(User.objects.create_superuser('admin', 'admin@example.com', 'pw'))
+        user = User.objects.create_user('new', 'new@example.com', 'pw')
+        data = {'user': user.pk, 'name': "New", 'email': 'new@example.com', 'contact_number': '9876543210', 'address': "x"}
+        response = self.client.post('/admin/core/athlete/add/', data, secure=True)
+        self.assertEqual(response.status_code, 200)
+        self.assertIn('tenant', response.context['adminform'].form.errors)
+
+        response = self.client.post('/admin/core/athlete/add/', dict(data, tenant=self.other.pk), secure=True)
+        self.assertEqual(response.status_code, 302)
+        self.assertEqual(Athlete.unscoped.get(email='new@example.com').tenant_id, self.other.pk)
+
+
+@skipUnless(connection.vendor == 'sqlite', "SQLite-only flushing")
+class EngagementBufferSQLiteTests(TestCase):
+    def test_full_batch_waits_for_commit_without_a_thread(self):
+        athlete = make_athlete()
+        events = engagement.EventBuffer(max_size=2)
+        with self.captureOnCommitCallbacks(execute=True):
+            with transaction.atomic():
+                for _ in range(2):
+                    events.add(EngagementLog(athlete=athlete, event_type=engagement.LOGIN, timestamp=timezone.now()))
+                self.assertFalse(EngagementLog.objects.exists())
+        self.assertIsNone(events._flusher)
+        self.assertEqual(EngagementLog.objects.count(), 2)
+        self.assertEqual(len(events), 0)
@@ -0,0 +1,7 @@
+from django.urls import path
+
+from . import views
+
+urlpatterns = [
+    path('calendar/<str:token>.ics', views.workout_feed, name='workout-feed'),
+]
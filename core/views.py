@@ -1,3 +1,37 @@
-from django.shortcuts import render
+from django.http import Http404, HttpResponse
+from django.utils.cache import get_conditional_response, patch_response_headers
+from django.utils.http import http_date, quote_etag
+from django.views.decorators.http import require_safe
 
-# Create your views here.
+from . import ics
+from .tenancy import use_tenant
+
+
+@require_safe
+def workout_feed(request, token):
+    """Signed, cacheable iCalendar feed of an athlete's workouts"""
+    ids = ics.athlete_for_token(token)
+    if ids is None:
+        raise Http404("Unknown calendar feed")
+    tenant_id, athlete_id = ids
+    with use_tenant(tenant_id):
+        return _workout_feed(request, athlete_id)
+
+
+def _workout_feed(request, athlete_id):
+    start, end = ics.window()
+    version, last_modified = ics.feed_version(athlete_id, start, end)
+    etag = quote_etag(version)
+    last_modified = int(last_modified.timestamp()) if last_modified else None
+    response = get_conditional_response(request, etag=etag, last_modified=last_modified)
+    if response is None:
+        feed = ics.cached_feed(athlete_id, start, end, version)
+        if feed is None:
+            raise Http404("Unknown calendar feed")
+        response = HttpResponse(feed, content_type='text/calendar; charset=utf-8')
+        response['Content-Disposition'] = 'inline; filename="workouts.ics"'
+    response['ETag'] = etag
+    if last_modified:
+        response['Last-Modified'] = http_date(last_modified)
+    patch_response_headers(response, cache_timeout=60 * 60)
+    return response